@@ -1,8 +1,12 @@
 from src.metrics_calc import compute_metrics
 from src.kg_rep import ClassRep, PropertyRep
 from rdflib import Graph, BNode
+from rdflib.util import guess_format
 import argparse
+import gzip
 import json
+import lzma
+import os
 import numpy as np
 
 class_query = """
@@ -198,9 +202,43 @@ def get_prop_reps_from_graph(g):
     return prop_dict
 
 
-def convert_ttl_to_kg_rep(ttl_path):
+def open_compressed_input(path):
+    """Open a .gz, .xz or .zst file as a binary stream decompressed as it is read,
+    or return None if the file is not compressed. zstd requires the zstandard package.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gz":
+        return gzip.open(path, "rb")
+    if extension == ".xz":
+        return lzma.open(path, "rb")
+    if extension == ".zst":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), closefd=True
+        )
+    return None
+
+
+def parse_ontology(ttl_path):
+    """Parse an ontology file, or a compressed one, e.g. ontology.ttl.gz, in the format
+    given by the extension before the compression extension
+    """
     g = Graph()
-    g.parse(ttl_path)
+    stream = open_compressed_input(ttl_path)
+    if stream is None:
+        g.parse(ttl_path)
+        return g
+    with stream:
+        g.parse(
+            source=stream,
+            format=guess_format(os.path.splitext(ttl_path)[0]) or "turtle",
+        )
+    return g
+
+
+def convert_ttl_to_kg_rep(ttl_path):
+    g = parse_ontology(ttl_path)
     class_dict = get_class_reps_from_graph(g)
     prop_dict = get_prop_reps_from_graph(g)
     return compute_metrics(class_dict, prop_dict)
@@ -212,7 +250,7 @@ def get_args():
         "-p",
         "--ttl_path",
         type=str,
-        help="Path to a .ttl ontology, or other RDFLib-supported ontology file",
+        help="Path to a .ttl ontology, or other RDFLib-supported ontology file, optionally compressed (.gz, .xz or .zst)",
     )
     parser.add_argument(
         "-o",
@@ -0,0 +1,104 @@
+from src.binary_rdf import BinaryRDFView, pack_triples
+from rdflib import Graph
+import argparse
+import os
+import random
+import time
+
+# Triple patterns to time, with ? for an unbound term
+PATTERNS = ["s??", "sp?", "?p?", "?po", "??o", "s?o", "spo"]
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="Compare size and lookup latency of binary RDF against a TTL file parsed with rdflib",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--ttl",
+        required=False,
+        type=str,
+        default="ttl/OSDU.ttl",
+        help="TTL file to benchmark",
+    )
+    parser.add_argument(
+        "--dest",
+        required=False,
+        type=str,
+        default="osdu_benchmark.rdfb",
+        help="Filepath to write the binary RDF version of the TTL file to",
+    )
+    parser.add_argument(
+        "--lookups",
+        required=False,
+        type=int,
+        default=1000,
+        help="Number of lookups per triple pattern",
+    )
+    return parser
+
+
+def bind_pattern(triple: tuple, pattern_name: str) -> tuple:
+    return tuple(
+        term if char != "?" else None for term, char in zip(triple, pattern_name)
+    )
+
+
+def time_lookups(lookup, patterns: list) -> tuple:
+    """Mean time of a lookup over a list of patterns in microseconds, and the number of results"""
+    num_results = 0
+    start = time.perf_counter()
+    for pattern in patterns:
+        for _ in lookup(*pattern):
+            num_results += 1
+    return (time.perf_counter() - start) / len(patterns) * 1e6, num_results
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+
+    start = time.perf_counter()
+    graph = Graph()
+    graph.parse(args.ttl, format="turtle")
+    parse_time = time.perf_counter() - start
+
+    # Blank nodes keep their rdflib labels, so that the same patterns can be run on both
+    rdflib_triples = list(graph)
+    triples = [tuple(term.n3() for term in triple) for triple in rdflib_triples]
+    with open(args.dest, "wb") as f:
+        f.write(pack_triples(triples))
+
+    start = time.perf_counter()
+    view = BinaryRDFView.open(args.dest)
+    open_time = time.perf_counter() - start
+
+    print("Triples: {} in TTL, {} in binary RDF".format(len(graph), len(view)))
+    print(
+        "Size: {:,} bytes TTL, {:,} bytes binary RDF".format(
+            os.path.getsize(args.ttl), os.path.getsize(args.dest)
+        )
+    )
+    print(
+        "Load: {:.3f} s rdflib parse, {:.6f} s binary RDF open".format(
+            parse_time, open_time
+        )
+    )
+
+    random.seed(0)
+    sample_idxs = random.choices(range(len(triples)), k=args.lookups)
+    print("Mean lookup latency in microseconds, over {} lookups:".format(args.lookups))
+    print("{:<9}{:>10}{:>10}".format("pattern", "rdflib", "binary"))
+    for pattern_name in PATTERNS:
+        rdflib_time, rdflib_results = time_lookups(
+            lambda *pattern: graph.triples(pattern),
+            [bind_pattern(rdflib_triples[i], pattern_name) for i in sample_idxs],
+        )
+        binary_time, binary_results = time_lookups(
+            view.triples,
+            [bind_pattern(triples[i], pattern_name) for i in sample_idxs],
+        )
+        if rdflib_results != binary_results:
+            print("Result counts differ for", pattern_name)
+        print("{:<9}{:>10.1f}{:>10.1f}".format(pattern_name, rdflib_time, binary_time))
+
+    view.close()
@@ -0,0 +1,69 @@
+from create_ontology import build_ontology, get_parser
+from rdflib import Graph
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+# Layouts of the ttl file, by the options writing them
+LAYOUTS = {
+    "default": [],
+    "compact": ["--compact"],
+    "compact, shared comments": ["--compact", "--shared-comments"],
+}
+
+
+def get_bench_parser():
+    parser = argparse.ArgumentParser(
+        description="Compare size and rdflib parse time of the ttl layouts",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-s",
+        "--src",
+        required=True,
+        help="Source location for schema files",
+    )
+    parser.add_argument(
+        "--repeat",
+        required=False,
+        type=int,
+        default=3,
+        help="Number of parses per layout, of which the fastest is reported",
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_bench_parser().parse_args()
+
+    print(
+        "{:<28}{:>12}{:>10}{:>10}{:>14}".format(
+            "layout", "bytes", "ratio", "triples", "parse (s)"
+        )
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        default_size = None
+        for layout, options in LAYOUTS.items():
+            build_args = get_parser().parse_args(
+                ["--src", args.src, "--dest", tmp_dir + "/"] + options
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                build_ontology(build_args)
+            filepath = os.path.join(tmp_dir, "osdu_draft.ttl")
+
+            parse_time = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                graph = Graph().parse(filepath, format="turtle")
+                parse_time = min(parse_time, time.perf_counter() - start)
+
+            size = os.path.getsize(filepath)
+            default_size = default_size or size
+            print(
+                "{:<28}{:>12,}{:>10.2f}{:>10,}{:>14.4f}".format(
+                    layout, size, default_size / size, len(graph), parse_time
+                )
+            )
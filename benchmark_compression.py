@@ -0,0 +1,81 @@
+from src.compress_utils import open_compressed, open_output
+import argparse
+import os
+import tempfile
+import time
+
+# Codecs, by file extension, and the compression levels to time for each
+CODEC_LEVELS = {"": [None], ".gz": [1, 6, 9], ".xz": [0, 6, 9], ".zst": [1, 3, 10, 19]}
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="Compare size, compression time and decompression time of the output codecs",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--ttl",
+        required=False,
+        type=str,
+        default="ttl/OSDU.ttl",
+        help="TTL file to compress",
+    )
+    parser.add_argument(
+        "--repeat",
+        required=False,
+        type=int,
+        default=3,
+        help="Number of runs per codec and level, of which the fastest is reported",
+    )
+    return parser
+
+
+def split_blocks(text: str) -> list:
+    """Blocks of a ttl file, written one at a time as by the ttl writer"""
+    blocks = [block + "\n\n" for block in text.split("\n\n")]
+    blocks[-1] = blocks[-1][:-2]
+    return blocks
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    with open(args.ttl, "r") as f:
+        blocks = split_blocks(f.read())
+
+    print(
+        "{:<8}{:>6}{:>12}{:>8}{:>12}{:>12}".format(
+            "codec", "level", "bytes", "ratio", "write (s)", "read (s)"
+        )
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain_size = None
+        for extension, levels in CODEC_LEVELS.items():
+            for level in levels:
+                filepath = os.path.join(tmp_dir, "osdu_draft.ttl" + extension)
+                write_time = read_time = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    with open_output(filepath, level) as f:
+                        for block in blocks:
+                            f.write(block)
+                    write_time = min(write_time, time.perf_counter() - start)
+
+                    start = time.perf_counter()
+                    with (
+                        open_compressed(filepath) if extension else open(filepath, "rb")
+                    ) as f:
+                        f.read()
+                    read_time = min(read_time, time.perf_counter() - start)
+
+                size = os.path.getsize(filepath)
+                plain_size = plain_size or size
+                print(
+                    "{:<8}{:>6}{:>12,}{:>8.2f}{:>12.4f}{:>12.4f}".format(
+                        extension or "none",
+                        "-" if level is None else level,
+                        size,
+                        plain_size / size,
+                        write_time,
+                        read_time,
+                    )
+                )
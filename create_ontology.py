@@ -1,10 +1,36 @@
 import argparse
+import json
+import multiprocessing
 import os
+import sys
 from src.json_utils import *
-from src.ttl_utils import assemble_ttl
+from src.ttl_utils import assemble_ttl, finalize_ontology, emit_ontology
 from src.kg_rep import *
 from src.str_utils import *
 from src.metrics_calc import *
+from src.align_suggest import suggest_alignments, write_alignment_suggestions
+from src.module_extract import extract_module
+from src.domain_modules import write_domain_modules
+from src.nt_utils import NTriplesSink
+from src.jsonld_utils import JsonLdSink
+from src.binary_rdf import BinaryRDFSink
+from src.sqlite_store import SqliteSink
+from src.graph_export import export_graphs
+from src.compress_utils import compression_codec
+from src.ontology_diff import SNAPSHOT_FILENAME, load_snapshot, write_ontology_diff
+from src.shared_ont import write_shared_ontology
+from src.fingerprint import (
+    FINGERPRINT_FILENAME,
+    FingerprintSink,
+    compute_fingerprint,
+    read_fingerprint,
+    write_fingerprint,
+)
+from src.dedup_utils import (
+    find_duplicate_classes,
+    merge_duplicate_classes,
+    print_duplicate_clusters,
+)
 import numpy as np
 from pathlib import Path
 
@@ -13,14 +39,15 @@ from pathlib import Path
 CLASS_ONTOLOGY_DICT (dict): Dictionary mapping explored OSDU class names to ClassRep objects.
 PROP_ONTOLOGY_DICT (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
 URL_TO_CLASSNAME_DICT (dict): Dictionary mapping explored filename keys to OSDU class names.
+ARRAY_PROPERTIES_DICT (RestrictionStore): Cardinality restrictions on explored OSDU classes, indexed by class name.
 """
 CLASS_ONTOLOGY_DICT = {}
 PROP_ONTOLOGY_DICT = {}
 URL_TO_CLASSNAME_DICT = {}
-ARRAY_PROPERTIES_DICT = {}
+ARRAY_PROPERTIES_DICT = RestrictionStore()
 
 
-def __main__():
+def get_parser() -> argparse.ArgumentParser:
     curr_path = os.path.dirname(os.path.abspath(__file__))
 
     parser = argparse.ArgumentParser(
@@ -38,7 +65,8 @@ def __main__():
         "--dest",
         required=False,
         default=curr_path + "/",
-        help="Destination location for output ttl",
+        help="Destination location for output ttl, or a ttl filepath ending in .gz, .xz or .zst "
+        "to compress the output files with that codec as they are written",
     )
     parser.add_argument(
         "-o",
@@ -58,11 +86,375 @@ def __main__():
     parser.add_argument(
         "-m", "--report_metrics", required=False, default=False, action="store_true"
     )
+    parser.add_argument(
+        "--open-ont-config",
+        required=False,
+        default=None,
+        help="JSON or YAML file of alignments to open ontologies (defaults to src/open_ont_config.json)",
+    )
+    parser.add_argument(
+        "--suggest-alignments",
+        required=False,
+        default=None,
+        help="Vocabulary file to propose open ontology alignments from, written to open_ont_suggestions.json",
+    )
+    parser.add_argument(
+        "--report-duplicates",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Report clusters of classes with near-identical properties",
+    )
+    parser.add_argument(
+        "--merge-duplicates",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Link near-duplicate classes with owl:equivalentClass",
+    )
+    parser.add_argument(
+        "--duplicate-threshold",
+        required=False,
+        type=float,
+        default=0.9,
+        help="Minimum Jaccard similarity of the properties of near-duplicate classes",
+    )
+    parser.add_argument(
+        "--format",
+        required=False,
+        nargs="+",
+        choices=["ttl", "nt", "nq", "jsonld", "rdfb", "sqlite"],
+        default=["ttl"],
+        help="Output formats, written in one traversal of the ontology: Turtle, N-Triples, N-Quads, "
+        "JSON-LD, dictionary-encoded binary RDF or an indexed SQLite store",
+    )
+    parser.add_argument(
+        "--compress-level",
+        required=False,
+        type=int,
+        default=None,
+        help="Compression level of output files, when --dest is a compressed ttl filepath. "
+        "Defaults to the codec's default level",
+    )
+    parser.add_argument(
+        "--compact",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Write the ttl file in a compact layout: one line per class or property, "
+        "without banners or indentation",
+    )
+    parser.add_argument(
+        "--shared-comments",
+        required=False,
+        default=False,
+        action="store_true",
+        help="With --compact, write long comments repeated across classes and properties once, "
+        "as shared annotation resources",
+    )
+    parser.add_argument(
+        "--max-memory",
+        required=False,
+        type=int,
+        default=None,
+        help="Memory budget for sorting the blocks of the ttl file, in MB. Blocks beyond it are "
+        "sorted in runs on disk and merged into the file",
+    )
+    parser.add_argument(
+        "--fingerprint-only",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Only compute the canonical fingerprint of the ontology, and compare it with the one saved "
+        "in osdu_draft.fingerprint by the last build. Exits with status 1 if it changed, as git diff "
+        "--exit-code does",
+    )
+    parser.add_argument(
+        "--snapshot",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Also save the class, property and restriction dictionaries to osdu_draft.snapshot, "
+        "to compare later builds with",
+    )
+    parser.add_argument(
+        "--diff",
+        required=False,
+        default=None,
+        help="Schema directory of an earlier release, or a snapshot saved by --snapshot, to compare "
+        "the ontology with. Writes a report of the changes to osdu_diff.txt and a SPARQL Update "
+        "request applying them to osdu_diff.rq",
+    )
+    parser.add_argument(
+        "--stats",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Print counts of the classes, properties and axioms, gathered while writing the output",
+    )
+    parser.add_argument(
+        "--export-graphs",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Also save the inheritance and property graphs used for metrics as sparse CSR "
+        "adjacency matrices, to osdu_inheritance_graph.npz and osdu_property_graph.npz",
+    )
+    parser.add_argument(
+        "--gzip",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Write JSON-LD output as a gzip stream, to osdu_draft.jsonld.gz",
+    )
+    parser.add_argument(
+        "--shards",
+        required=False,
+        type=int,
+        default=1,
+        help="Number of files to split N-Triples or N-Quads output into",
+    )
+    parser.add_argument(
+        "--incremental",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Reuse unchanged blocks of the previous ttl file, using its block index",
+    )
+    parser.add_argument(
+        "--extract-module",
+        required=False,
+        nargs="+",
+        default=None,
+        help="Seed classes of a self-contained module, written to osdu_module.ttl",
+    )
+    parser.add_argument(
+        "--split-modules",
+        required=False,
+        default=False,
+        action="store_true",
+        help="Also write one ttl module per organizing superclass (master data, reference data, "
+        "work product components, datasets and abstract classes), linked by owl:imports",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        required=False,
+        default=None,
+        help="JSON manifest of (src, dest, options) jobs to build in one process",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        required=False,
+        type=int,
+        default=1,
+        help="Number of worker processes, for batch jobs or else for rendering the ttl file",
+    )
+    return parser
 
+
+def __main__():
+    parser = get_parser()
     args = parser.parse_args()
 
+    if args.batch is not None:
+        run_batch(args.batch, parser, jobs=args.jobs)
+    else:
+        metrics_dict = build_ontology(args)
+        if metrics_dict.get("Fingerprint changed", False):
+            sys.exit(1)
+
+
+def build_ontology(args: argparse.Namespace) -> dict:
+    """Builds the ontology for one schema directory, and writes the output files or reports metrics.
+        Module-level dictionaries are reset, so that several ontologies can be built in one process.
+
+    Args:
+        args (argparse.Namespace): Parsed command line options, as defined by get_parser.
+
+    Returns:
+        dict: Dictionary of metrics if args.report_metrics is set, and of stats if args.stats is set,
+            otherwise an empty dictionary. With args.fingerprint_only, the fingerprint and whether
+            it differs from the saved one.
+    """
+    # Build an earlier release to compare with if desired, before the module-level dictionaries
+    # are reset for this one
+    old_dicts = None
+    if args.diff is not None:
+        if os.path.isdir(args.diff):
+            print("Building earlier ontology from", args.diff)
+            build_ontology_dicts(args.diff, args)
+            old_dicts = (CLASS_ONTOLOGY_DICT, PROP_ONTOLOGY_DICT, ARRAY_PROPERTIES_DICT)
+        else:
+            old_dicts = load_snapshot(args.diff)
+
+    open_ont_dict = build_ontology_dicts(args.src, args)
+
+    dest, ttl_filename, compress_suffix = split_dest(args.dest)
+
+    # Compare the fingerprint with that of the last build, without writing anything
+    if args.fingerprint_only:
+        fingerprint = compute_fingerprint(
+            CLASS_ONTOLOGY_DICT,
+            PROP_ONTOLOGY_DICT,
+            ARRAY_PROPERTIES_DICT,
+            open_ont_dict,
+        )
+        saved_fingerprint = read_fingerprint(dest + FINGERPRINT_FILENAME)
+        print("Fingerprint:", fingerprint)
+        if saved_fingerprint is None:
+            print("No saved fingerprint in", dest + FINGERPRINT_FILENAME)
+        else:
+            print(
+                "Ontology changed"
+                if fingerprint != saved_fingerprint
+                else "Ontology unchanged"
+            )
+        return {
+            "Fingerprint": fingerprint,
+            "Fingerprint changed": fingerprint != saved_fingerprint,
+        }
+
+    # Write the ontology in each output format, its fingerprint, and gather stats if desired,
+    # in one traversal of the ontology dictionaries
+    output_formats = [args.format] if isinstance(args.format, str) else args.format
+    sinks = []
+    fingerprint_sink = None
+    if not args.report_metrics:
+        sinks = create_output_sinks(output_formats, args, dest, compress_suffix)
+        fingerprint_sink = FingerprintSink()
+        sinks.append(fingerprint_sink)
+    stats_sink = StatsSink() if args.stats else None
+    if stats_sink is not None:
+        sinks.append(stats_sink)
+
+    if "ttl" in output_formats:
+        assemble_ttl(
+            CLASS_ONTOLOGY_DICT,
+            PROP_ONTOLOGY_DICT,
+            URL_TO_CLASSNAME_DICT,
+            ARRAY_PROPERTIES_DICT,
+            dest_filepath=dest,
+            write_file=(not args.report_metrics),
+            open_ont_config=args.open_ont_config,
+            finalize=False,
+            filename=ttl_filename,
+            jobs=args.jobs,
+            incremental=args.incremental,
+            sinks=sinks,
+            compress_level=args.compress_level,
+            compact=args.compact,
+            shared_comments=args.shared_comments,
+            max_memory=(
+                None if args.max_memory is None else args.max_memory * (1 << 20)
+            ),
+        )
+    elif sinks:
+        emit_ontology(
+            CLASS_ONTOLOGY_DICT,
+            PROP_ONTOLOGY_DICT,
+            ARRAY_PROPERTIES_DICT,
+            open_ont_dict,
+            sinks,
+        )
+
+    if fingerprint_sink is not None:
+        write_fingerprint(fingerprint_sink.fingerprint, dest + FINGERPRINT_FILENAME)
+
+    # Assemble module for a set of seed classes if desired
+    if args.extract_module is not None:
+        module_dicts = extract_module(
+            args.extract_module,
+            CLASS_ONTOLOGY_DICT,
+            PROP_ONTOLOGY_DICT,
+            ARRAY_PROPERTIES_DICT,
+        )
+        assemble_ttl(
+            module_dicts[0],
+            module_dicts[1],
+            URL_TO_CLASSNAME_DICT,
+            module_dicts[2],
+            dest_filepath=dest,
+            open_ont_config=args.open_ont_config,
+            finalize=False,
+            filename="osdu_module.ttl" + compress_suffix,
+            jobs=args.jobs,
+            compress_level=args.compress_level,
+        )
+
+    # Split the ontology into modules linked by owl:imports if desired
+    if args.split_modules:
+        write_domain_modules(
+            CLASS_ONTOLOGY_DICT,
+            PROP_ONTOLOGY_DICT,
+            ARRAY_PROPERTIES_DICT,
+            open_ont_dict,
+            dest,
+            jobs=args.jobs,
+            compress_suffix=compress_suffix,
+            compress_level=args.compress_level,
+        )
+
+    # Save a snapshot of the ontology, and compare it with an earlier one, if desired
+    if args.snapshot:
+        write_shared_ontology(
+            CLASS_ONTOLOGY_DICT,
+            PROP_ONTOLOGY_DICT,
+            ARRAY_PROPERTIES_DICT,
+            dest + SNAPSHOT_FILENAME,
+        )
+    if old_dicts is not None:
+        write_ontology_diff(
+            old_dicts,
+            (CLASS_ONTOLOGY_DICT, PROP_ONTOLOGY_DICT, ARRAY_PROPERTIES_DICT),
+            open_ont_dict,
+            dest,
+        )
+
+    # Propose alignments to a local open vocabulary if desired
+    if args.suggest_alignments is not None:
+        proposals = suggest_alignments(
+            CLASS_ONTOLOGY_DICT,
+            PROP_ONTOLOGY_DICT,
+            args.suggest_alignments,
+            open_ont_dict=open_ont_dict,
+        )
+        write_alignment_suggestions(proposals, dest + "open_ont_suggestions.json")
+
+    # Save the graphs used for metrics if desired
+    if args.export_graphs:
+        export_graphs(CLASS_ONTOLOGY_DICT, PROP_ONTOLOGY_DICT, dest)
+
+    # Report metrics if desired
+    metrics_dict = {}
+    if args.report_metrics:
+        metrics_dict = compute_metrics(CLASS_ONTOLOGY_DICT, PROP_ONTOLOGY_DICT)
+        for key, metric in metrics_dict.items():
+            print(key + ":", metric)
+
+    # Report stats gathered while writing the output
+    if stats_sink is not None:
+        for key, count in stats_sink.stats.items():
+            print(key + ":", count)
+        metrics_dict.update(stats_sink.stats)
+
+    return metrics_dict
+
+
+def build_ontology_dicts(src: str, args: argparse.Namespace) -> dict:
+    """Builds the class, property and restriction dictionaries of the ontology for one schema directory,
+        in the module-level dictionaries, which are reset first.
+
+    Args:
+        src (str): Schema directory.
+        args (argparse.Namespace): Parsed command line options, as defined by get_parser.
+
+    Returns:
+        dict: Dictionary of open ontology alignments that were linked, keyed by ontology prefix.
+    """
     # Load dictionary of schemas via local storage, with updated versions
-    schema_dict = load_schemas(args.src)
+    schema_dict = load_schemas(src)
 
     # Dictionary to contain classes and predicates
     global CLASS_ONTOLOGY_DICT, PROP_ONTOLOGY_DICT, URL_TO_CLASSNAME_DICT, ARRAY_PROPERTIES_DICT
@@ -72,6 +464,9 @@ def __main__():
     # Dictionaries for backwards definition of hierarchy
     URL_TO_CLASSNAME_DICT = {}
 
+    # Cardinality restrictions, merged per class and property
+    ARRAY_PROPERTIES_DICT = RestrictionStore()
+
     # For each schema file, create and populate a class and its properties
     for key, schema in schema_dict.items():
         if "AbstractPersistableReference" in key:
@@ -84,21 +479,156 @@ def __main__():
     add_array_property_restriction("System", "acl", min_card=1)
     add_array_property_restriction("System", "legal", min_card=1)
 
-    # Assemble ttl file using ontology dictionary
-    assemble_ttl(
+    # Add System and ACL classes, and link open ontologies
+    open_ont_dict = finalize_ontology(
         CLASS_ONTOLOGY_DICT,
         PROP_ONTOLOGY_DICT,
-        URL_TO_CLASSNAME_DICT,
         ARRAY_PROPERTIES_DICT,
-        dest_filepath=args.dest,
-        write_file=(not args.report_metrics),
+        open_ont_config=args.open_ont_config,
     )
 
-    # Report metrics if desired
-    if args.report_metrics:
-        metrics_dict = compute_metrics(CLASS_ONTOLOGY_DICT, PROP_ONTOLOGY_DICT)
-        for key, metric in metrics_dict.items():
-            print(key + ":", metric)
+    # Report, and merge if desired, near-duplicate classes
+    if args.report_duplicates or args.merge_duplicates:
+        clusters = find_duplicate_classes(
+            CLASS_ONTOLOGY_DICT,
+            PROP_ONTOLOGY_DICT,
+            threshold=args.duplicate_threshold,
+        )
+        print_duplicate_clusters(clusters, args.duplicate_threshold)
+        if args.merge_duplicates:
+            merge_duplicate_classes(CLASS_ONTOLOGY_DICT, clusters)
+
+    return open_ont_dict
+
+
+def split_dest(dest: str) -> tuple:
+    """Split the --dest option into the destination location and the ttl filename.
+        A dest ending in .gz, .xz or .zst is the filepath of a compressed ttl file,
+        and its extension is also appended to the other text output files.
+
+    Args:
+        dest (str): Value of the --dest option.
+
+    Returns:
+        tuple: (destination location, ttl filename, compression extension or '').
+    """
+    if compression_codec(dest) is None:
+        return dest, "osdu_draft.ttl", ""
+    dest_dir, ttl_filename = os.path.split(dest)
+    return os.path.join(dest_dir, ""), ttl_filename, os.path.splitext(dest)[1]
+
+
+def create_output_sinks(
+    output_formats: list,
+    args: argparse.Namespace,
+    dest: str,
+    compress_suffix: str = "",
+) -> list:
+    """Sinks writing the ontology in each output format other than ttl, which is written by assemble_ttl
+
+    Args:
+        output_formats (list): Output formats, as given by the --format option.
+        args (argparse.Namespace): Parsed command line options, as defined by get_parser.
+        dest (str): Destination location of the output files.
+        compress_suffix (str, optional): Extension of the compression codec of text output files.
+            Defaults to '', for uncompressed files.
+
+    Returns:
+        list: OntologySink objects, one per format.
+    """
+    sinks = []
+    for output_format in dict.fromkeys(output_formats):
+        if output_format in ["nt", "nq"]:
+            sinks.append(
+                NTriplesSink(
+                    dest + "osdu_draft",
+                    1 + len(CLASS_ONTOLOGY_DICT) + len(PROP_ONTOLOGY_DICT),
+                    output_format=output_format,
+                    num_shards=args.shards,
+                    compress_suffix=compress_suffix,
+                    compress_level=args.compress_level,
+                )
+            )
+        elif output_format == "jsonld":
+            sinks.append(
+                JsonLdSink(
+                    dest
+                    + "osdu_draft.jsonld"
+                    + (".gz" if args.gzip else compress_suffix),
+                    compress_level=args.compress_level,
+                )
+            )
+        elif output_format == "rdfb":
+            # Left uncompressed, to be memory-mapped
+            sinks.append(BinaryRDFSink(dest + "osdu_draft.rdfb"))
+        elif output_format == "sqlite":
+            # Left uncompressed, to be opened in place
+            sinks.append(SqliteSink(dest + "osdu_draft.sqlite"))
+    return sinks
+
+
+def load_batch_manifest(manifest_path: str, parser: argparse.ArgumentParser) -> list:
+    """Reads a batch manifest: a JSON list of jobs, each a dictionary with keys
+        "src", "dest" and optionally "options". Options use the names of the
+        command line arguments, e.g. {"report_metrics": true}, and take their
+        command line defaults when not given.
+
+    Args:
+        manifest_path (str): Filepath to the JSON manifest.
+        parser (argparse.ArgumentParser): Command line parser, used for option defaults.
+
+    Returns:
+        list: argparse.Namespace options for each job.
+    """
+    with open(manifest_path, "r", encoding="utf-8") as fp:
+        manifest = json.load(fp)
+
+    job_args_list = []
+    for job in manifest:
+        job_args = parser.parse_args([])
+        for option, value in job.get("options", {}).items():
+            option = option.replace("-", "_")
+            if not hasattr(job_args, option):
+                raise ValueError("Unknown option in batch manifest: " + option)
+            setattr(job_args, option, value)
+        job_args.src = job["src"]
+        job_args.dest = job["dest"]
+        job_args.batch = None
+        job_args_list.append(job_args)
+    return job_args_list
+
+
+def _run_batch_job(job_args: argparse.Namespace) -> dict:
+    print("Building ontology:", job_args.src, "->", job_args.dest)
+    return build_ontology(job_args)
+
+
+def run_batch(
+    manifest_path: str, parser: argparse.ArgumentParser, jobs: int = 1
+) -> list:
+    """Builds every job of a batch manifest in this process, or in a pool of worker processes.
+        Decoded schema files and normalized names are cached per process,
+        so jobs sharing schemas (e.g. the abstract/ folder) do not decode or normalize them again.
+
+    Args:
+        manifest_path (str): Filepath to the JSON manifest, see load_batch_manifest.
+        parser (argparse.ArgumentParser): Command line parser, used for option defaults.
+        jobs (int, optional): Number of worker processes. Defaults to 1, to run all jobs in this process.
+            With more than one worker, the jobs option of each job is ignored.
+
+    Returns:
+        list: Dictionary of metrics for each job, in manifest order.
+    """
+    job_args_list = load_batch_manifest(manifest_path, parser)
+
+    if (jobs > 1) and (len(job_args_list) > 1):
+        # Pool workers cannot start their own pools, so each job renders in its worker
+        for job_args in job_args_list:
+            job_args.jobs = 1
+        with multiprocessing.Pool(min(jobs, len(job_args_list))) as pool:
+            return pool.map(_run_batch_job, job_args_list, chunksize=1)
+
+    return [_run_batch_job(job_args) for job_args in job_args_list]
 
 
 def add_class_from_schema_dict(key: str, schema: dict, verbose: bool = False):
@@ -372,19 +902,31 @@ def add_property_from_schema_dict(
         if ("type" in property_dict) and (
             (property_dict["type"] == "array") or ("items" in property_dict)
         ):
-            if "minItems" in property_dict:
-                if property_dict["items"]["type"] == "object":
+            if ("minItems" in property_dict) or ("maxItems" in property_dict):
+                min_card = property_dict.get("minItems")
+                max_card = property_dict.get("maxItems")
+                if "$ref" in property_dict["items"]:
                     add_array_property_restriction(
                         class_name,
                         property_name,
-                        min_card=property_dict["minItems"],
+                        min_card=min_card,
+                        max_card=max_card,
+                        on_class=property_dict["items"]["$ref"],
+                    )
+                elif property_dict["items"].get("type") == "object":
+                    add_array_property_restriction(
+                        class_name,
+                        property_name,
+                        min_card=min_card,
+                        max_card=max_card,
                         on_class=property_dict["items"]["title"],
                     )
-                elif property_dict["items"]["type"] != "array":
+                elif property_dict["items"].get("type") != "array":
                     add_array_property_restriction(
                         class_name,
                         property_name,
-                        min_card=property_dict["minItems"],
+                        min_card=min_card,
+                        max_card=max_card,
                         on_class=property_dict["items"]["type"],
                     )
                 else:
@@ -415,7 +957,8 @@ def add_property_from_schema_dict(
                     add_array_property_restriction(
                         class_name,
                         property_name,
-                        min_card=property_dict["minItems"],
+                        min_card=min_card,
+                        max_card=max_card,
                         on_class=new_class_name,
                     )
 
@@ -580,16 +1123,31 @@ def add_property_from_schema_dict(
 
 
 def add_array_property_restriction(
-    class_name: str, property_name: str, on_class: str = "", min_card: int = 1
+    class_name: str,
+    property_name: str,
+    on_class: str = "",
+    min_card: int = 1,
+    max_card: int = None,
 ):
+    """Add a cardinality restriction on a property of a class.
+        Repeated restrictions on the same class, property and onClass are merged,
+        keeping the strongest bounds.
+
+    Args:
+        class_name (str): Extracted OSDU name for the restricted class.
+        property_name (str): Extracted OSDU name for the restricted property.
+        on_class (str, optional): Class or literal type for a qualified restriction. Defaults to ''.
+        min_card (int, optional): Minimum cardinality, e.g. from "required" or "minItems". Defaults to 1.
+        max_card (int, optional): Maximum cardinality, e.g. from "maxItems". Defaults to None.
+    """
     global ARRAY_PROPERTIES_DICT
-    array_prop = {"prop_name": process_prop_name(property_name), "min_card": min_card}
-    if on_class != "":
-        array_prop["on_class"] = process_range(on_class)
-    if class_name not in ARRAY_PROPERTIES_DICT:
-        ARRAY_PROPERTIES_DICT[class_name] = [array_prop]
-    else:
-        ARRAY_PROPERTIES_DICT[class_name].append(array_prop)
+    ARRAY_PROPERTIES_DICT.add_restriction(
+        class_name,
+        process_prop_name(property_name),
+        on_class=process_range(on_class) if on_class != "" else "",
+        min_card=min_card,
+        max_card=max_card,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,366 @@
+import json
+import numpy as np
+import regex as re
+from .kg_rep import *
+
+# Weights of the features describing a class, property or vocabulary term
+NAME_TOKEN_WEIGHT = 1.0
+NAME_NGRAM_WEIGHT = 0.5
+TEXT_TOKEN_WEIGHT = 0.25
+
+# Length of the character n-grams taken from name tokens, to match spelling variants
+NGRAM_SIZE = 3
+
+NON_WORD_PATTERN = re.compile(r"[\W_]")
+TEXT_TOKEN_PATTERN = re.compile(r"[A-Za-z]{3,}")
+
+# Features are only left out of candidate generation if found in more vocabulary rows than this,
+# so that vocabularies of up to this many terms are always scored on every feature
+MIN_PRUNED_DF = 1000
+
+# Candidates generated per requested match, before rescoring them on every feature
+CANDIDATES_PER_MATCH = 32
+
+
+def tokenize_name(name: str) -> list:
+    """Split a class, property or vocabulary name into lowercase words
+
+    Args:
+        name (str): camelCase or CamelCase name, optionally prefixed, e.g. "time:DateTimeDescription"
+
+    Returns:
+        list: lowercase word tokens
+    """
+    name = name.split(":")[-1]
+    return [
+        token.lower()
+        for token in split_camelcase(NON_WORD_PATTERN.sub("", name))
+        if token != ""
+    ]
+
+
+def tokenize_text(text: str) -> list:
+    """Split a comment or pattern into lowercase alphabetic words"""
+    return [token.lower() for token in TEXT_TOKEN_PATTERN.findall(text)]
+
+
+def extract_features(name: str, texts: list = []) -> dict:
+    """Bag of weighted features for a name and its descriptive texts:
+        name words, character n-grams of the name words, and words of the texts
+
+    Args:
+        name (str): Name of a class, property or vocabulary term.
+        texts (list, optional): Comments or patterns describing the name. Defaults to [].
+
+    Returns:
+        dict: feature string to weight
+    """
+    features = {}
+    for token in tokenize_name(name):
+        features["w:" + token] = features.get("w:" + token, 0) + NAME_TOKEN_WEIGHT
+        padded = "<" + token + ">"
+        for i in range(len(padded) - NGRAM_SIZE + 1):
+            ngram = "g:" + padded[i : i + NGRAM_SIZE]
+            features[ngram] = features.get(ngram, 0) + NAME_NGRAM_WEIGHT
+    for text in texts:
+        for token in tokenize_text(text):
+            features["w:" + token] = features.get("w:" + token, 0) + TEXT_TOKEN_WEIGHT
+    return features
+
+
+class FeatureMatrix:
+    def __init__(self, feature_dicts: list, feature_ids: dict):
+        """Sparse matrix of feature weights in CSR layout, one row per document.
+            Features are numbered through the shared feature_ids dictionary.
+
+        Args:
+            feature_dicts (list): feature string to weight dictionary for each document
+            feature_ids (dict): feature string to column number, extended with unseen features
+        """
+        indptr = np.zeros(len(feature_dicts) + 1, dtype=np.int64)
+        indices = []
+        data = []
+        for i, features in enumerate(feature_dicts):
+            for feature, weight in features.items():
+                indices.append(feature_ids.setdefault(feature, len(feature_ids)))
+                data.append(weight)
+            indptr[i + 1] = len(indices)
+        self.indptr = indptr
+        self.indices = np.array(indices, dtype=np.int64)
+        self.data = np.array(data, dtype=np.float64)
+        self.num_rows = len(feature_dicts)
+
+    def row_ids(self) -> np.ndarray:
+        return np.repeat(np.arange(self.num_rows), np.diff(self.indptr))
+
+    def document_frequencies(self, num_features: int) -> np.ndarray:
+        return np.bincount(self.indices, minlength=num_features)
+
+    def apply_tfidf(self, idf: np.ndarray) -> None:
+        """Scale weights by inverse document frequency, then L2-normalize each row"""
+        self.data = self.data * idf[self.indices]
+        norms = np.sqrt(np.bincount(self.row_ids(), self.data**2, self.num_rows))
+        self.data = self.data / np.maximum(norms, 1e-12)[self.row_ids()]
+
+
+def top_matches(
+    queries: FeatureMatrix,
+    vocab: FeatureMatrix,
+    num_features: int,
+    top_k: int = 3,
+    max_df: float = 0.02,
+    max_postings: int = 1 << 22,
+) -> (np.ndarray, np.ndarray):
+    """Find the vocabulary rows with the highest cosine similarity to each query row.
+        The vocabulary is inverted into per-feature posting lists once; each batch of queries
+        then gathers the postings of its features and accumulates scores with np.bincount.
+        Features found in more than a max_df fraction of the vocabulary, and in more than
+        MIN_PRUNED_DF rows, are left out of the posting lists, which bounds the work per query.
+        The best candidates found without them are then rescored on every feature, so that
+        returned similarities are exact.
+
+    Args:
+        queries (FeatureMatrix): tf-idf weighted, normalized query rows.
+        vocab (FeatureMatrix): tf-idf weighted, normalized vocabulary rows.
+        num_features (int): Number of feature columns shared by both matrices.
+        top_k (int, optional): Number of matches kept per query. Defaults to 3.
+        max_df (float, optional): Largest fraction of vocabulary rows a feature may occur in to generate
+            candidates, in vocabularies with more than MIN_PRUNED_DF rows per feature. Defaults to 0.02.
+        max_postings (int, optional): Bound on score accumulator size per batch. Defaults to 2**22.
+
+    Returns:
+        np.ndarray: (num queries, top_k) vocabulary row indices, best first.
+        np.ndarray: (num queries, top_k) cosine similarities.
+    """
+    top_k = min(top_k, vocab.num_rows)
+    match_idxs = np.zeros((queries.num_rows, top_k), dtype=np.int64)
+    match_scores = np.zeros((queries.num_rows, top_k))
+    if top_k == 0:
+        return match_idxs, match_scores
+
+    # Posting lists: vocabulary rows and weights, grouped by feature
+    order = np.argsort(vocab.indices, kind="stable")
+    posting_rows = vocab.row_ids()[order]
+    posting_weights = vocab.data[order]
+    posting_counts = np.bincount(vocab.indices, minlength=num_features)
+    posting_ptr = np.zeros(num_features + 1, dtype=np.int64)
+    posting_ptr[1:] = np.cumsum(posting_counts)
+    scored = posting_counts <= max(MIN_PRUNED_DF, max_df * vocab.num_rows)
+    pruned = not np.all(scored)
+
+    # Vocabulary entries sorted by (row, feature), to look up the weights of candidates
+    vocab_keys = vocab.row_ids() * num_features + vocab.indices
+    vocab_order = np.argsort(vocab_keys, kind="stable")
+    vocab_keys = vocab_keys[vocab_order]
+    vocab_weights = vocab.data[vocab_order]
+
+    num_candidates = (
+        min(top_k * CANDIDATES_PER_MATCH, vocab.num_rows) if pruned else top_k
+    )
+    query_rows = queries.row_ids()
+    batch_size = max(1, max_postings // vocab.num_rows)
+    for start in range(0, queries.num_rows, batch_size):
+        stop = min(start + batch_size, queries.num_rows)
+        entries = slice(queries.indptr[start], queries.indptr[stop])
+        features = queries.indices[entries]
+        batch_rows = query_rows[entries] - start
+        starts = posting_ptr[features]
+        counts = np.where(scored[features], posting_ptr[features + 1] - starts, 0)
+
+        # Expand every (query entry, posting) pair of the batch
+        entry_idx = np.repeat(np.arange(len(features)), counts)
+        offsets = np.arange(len(entry_idx)) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        postings = starts[entry_idx] + offsets
+        keys = batch_rows[entry_idx] * vocab.num_rows + posting_rows[postings]
+        weights = queries.data[entries][entry_idx] * posting_weights[postings]
+
+        scores = np.bincount(
+            keys, weights, minlength=(stop - start) * vocab.num_rows
+        ).reshape(stop - start, vocab.num_rows)
+        best = np.argpartition(-scores, num_candidates - 1, axis=1)[:, :num_candidates]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+
+        if pruned:
+            # Rescore the candidates of each query on every feature of the query
+            entry_pairs = np.repeat(np.arange(len(features)), num_candidates)
+            slots = np.tile(np.arange(num_candidates), len(features))
+            candidate_rows = best[batch_rows[entry_pairs], slots]
+            lookup = candidate_rows * num_features + features[entry_pairs]
+            found = np.minimum(np.searchsorted(vocab_keys, lookup), len(vocab_keys) - 1)
+            pair_weights = np.where(
+                vocab_keys[found] == lookup,
+                queries.data[entries][entry_pairs] * vocab_weights[found],
+                0,
+            )
+            best_scores = np.bincount(
+                batch_rows[entry_pairs] * num_candidates + slots,
+                pair_weights,
+                minlength=(stop - start) * num_candidates,
+            ).reshape(stop - start, num_candidates)
+
+        ranking = np.argsort(-best_scores, axis=1, kind="stable")[:, :top_k]
+        match_idxs[start:stop] = np.take_along_axis(best, ranking, axis=1)
+        match_scores[start:stop] = np.take_along_axis(best_scores, ranking, axis=1)
+
+    return match_idxs, match_scores
+
+
+def load_vocabulary(vocab_filepath: str) -> (dict, list):
+    """Load a local vocabulary file. Lines are tab-separated:
+            prefix:Identifier <TAB> class|property <TAB> optional label or comment
+        Lines of the form "@prefix prefix: <namespace> ." declare namespaces, and lines starting with # are ignored.
+
+    Args:
+        vocab_filepath (str): Filepath to the vocabulary.
+
+    Returns:
+        dict: Prefix to namespace IRI.
+        list: (identifier, kind, text) for each vocabulary term.
+    """
+    namespaces = {}
+    terms = []
+    with open(vocab_filepath, "r", encoding="utf-8") as fp:
+        for line in fp:
+            line = line.rstrip("\n")
+            if line.startswith("@prefix"):
+                prefix_match = re.match(r"@prefix\s+(\w*):\s*<([^>]*)>", line)
+                namespaces[prefix_match.group(1)] = prefix_match.group(2)
+                continue
+            if (line.strip() == "") or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            if (len(fields) < 2) or (":" not in fields[0]):
+                raise ValueError("Malformed vocabulary line: " + line)
+            terms.append(
+                (
+                    fields[0],
+                    fields[1].strip().lower(),
+                    fields[2] if len(fields) > 2 else "",
+                )
+            )
+    return namespaces, terms
+
+
+def suggest_alignments(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    vocab_filepath: str,
+    min_score: float = 0.5,
+    sameas_score: float = 0.8,
+    top_k: int = 3,
+    open_ont_dict: dict = None,
+) -> dict:
+    """Propose open ontology alignments by scoring OSDU class and property names,
+        comments and patterns against the terms of a local vocabulary with tf-idf vectors.
+            OSDU properties matching a vocabulary class are proposed for ranges_dict,
+            OSDU properties matching a vocabulary property are proposed for sameas_dict,
+            OSDU classes matching a vocabulary class are proposed for sameas_dict if the score
+                is at least sameas_score, and for subclass_dict otherwise.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        vocab_filepath (str): Filepath to a vocabulary file, see load_vocabulary.
+        min_score (float, optional): Minimum cosine similarity of a proposal. Defaults to 0.5.
+        sameas_score (float, optional): Minimum cosine similarity for a class owl:sameAs proposal. Defaults to 0.8.
+        top_k (int, optional): Maximum number of proposals per OSDU name and kind of term. Defaults to 3.
+        open_ont_dict (dict, optional): Current alignments, whose OSDU targets are not proposed again.
+            Defaults to None.
+
+    Returns:
+        dict: Proposals in the open ontology config format, keyed by prefix. Lists are ordered by
+            decreasing score, and each prefix also lists its scored proposals under "suggestions".
+    """
+    namespaces, terms = load_vocabulary(vocab_filepath)
+
+    aligned = set()
+    for ont_links_dict in (open_ont_dict or {}).values():
+        for links_dict in [
+            ont_links_dict["ranges_dict"],
+            ont_links_dict["subclass_dict"],
+            ont_links_dict["sameas_dict"],
+        ]:
+            for target_list in links_dict.values():
+                aligned.update(target_list)
+
+    class_keys = [key for key in class_ontology_dict if key not in aligned]
+    prop_keys = [key for key in prop_ontology_dict if key not in aligned]
+    class_features = [
+        extract_features(key, class_ontology_dict[key].comments) for key in class_keys
+    ]
+    prop_features = [
+        extract_features(
+            key, prop_ontology_dict[key].comments + prop_ontology_dict[key].patterns
+        )
+        for key in prop_keys
+    ]
+
+    feature_ids = {}
+    vocab_by_kind = {}
+    for kind in ["class", "property"]:
+        kind_terms = [term for term in terms if term[1] == kind]
+        vocab_by_kind[kind] = (
+            kind_terms,
+            FeatureMatrix(
+                [extract_features(term[0], [term[2]]) for term in kind_terms],
+                feature_ids,
+            ),
+        )
+    class_matrix = FeatureMatrix(class_features, feature_ids)
+    prop_matrix = FeatureMatrix(prop_features, feature_ids)
+
+    # Inverse document frequency over every document, OSDU and vocabulary alike
+    num_features = len(feature_ids)
+    matrices = [class_matrix, prop_matrix] + [m for _, m in vocab_by_kind.values()]
+    df = np.sum([m.document_frequencies(num_features) for m in matrices], axis=0)
+    num_docs = sum(m.num_rows for m in matrices)
+    idf = np.log((1 + num_docs) / (1 + df)) + 1
+    for matrix in matrices:
+        matrix.apply_tfidf(idf)
+
+    suggestions = []
+    for query_kind, query_keys, query_matrix, term_kind in [
+        ("property", prop_keys, prop_matrix, "class"),
+        ("property", prop_keys, prop_matrix, "property"),
+        ("class", class_keys, class_matrix, "class"),
+    ]:
+        kind_terms, vocab_matrix = vocab_by_kind[term_kind]
+        match_idxs, match_scores = top_matches(
+            query_matrix, vocab_matrix, num_features, top_k=top_k
+        )
+        for i, key in enumerate(query_keys):
+            for term_idx, score in zip(match_idxs[i], match_scores[i]):
+                if score < min_score:
+                    continue
+                if query_kind == "property":
+                    link = "ranges_dict" if term_kind == "class" else "sameas_dict"
+                else:
+                    link = "sameas_dict" if score >= sameas_score else "subclass_dict"
+                suggestions.append((float(score), link, kind_terms[term_idx][0], key))
+
+    suggestions.sort(
+        key=lambda suggestion: (-suggestion[0], suggestion[2], suggestion[3])
+    )
+    proposals = {}
+    for score, link, identifier, key in suggestions:
+        prefix, ont_identifier = identifier.split(":", 1)
+        if prefix not in proposals:
+            proposals[prefix] = {
+                "namespace": namespaces.get(prefix, ""),
+                "ranges_dict": {},
+                "subclass_dict": {},
+                "sameas_dict": {},
+                "suggestions": [],
+            }
+        proposals[prefix][link].setdefault(ont_identifier, []).append(key)
+        proposals[prefix]["suggestions"].append(
+            {"link": link, "term": identifier, "target": key, "score": round(score, 4)}
+        )
+    return proposals
+
+
+def write_alignment_suggestions(proposals: dict, filepath: str) -> None:
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(proposals, f, indent=4)
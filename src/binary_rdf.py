@@ -0,0 +1,374 @@
+import functools
+import mmap
+import struct
+from bisect import bisect_left, bisect_right
+import numpy as np
+from .kg_rep import *
+from .ttl_utils import emit_ontology
+from .nt_utils import TripleSink, TripleWriter, generate_prefix_map
+
+# Dictionary-encoded binary RDF, in the spirit of HDT: a sorted term dictionary, and the
+# triples as integer ids in three orders (SPO, POS and OSP), so that any triple pattern
+# is answered by a slice of one order. Each order is stored in CSR layout: a pointer array
+# indexed by the id of its first term, and arrays of the second and third term ids.
+# The file is read through mmap, so opening it does not parse anything.
+#
+# Terms are stored in their N-Triples form: <IRI>, _:label, or "literal" with ^^<datatype>.
+# The dictionary is front-coded: each term stores the length of the prefix it shares with the
+# previous term and the rest of its bytes, except the first term of every block, which is
+# stored whole so that lookups only decode one block.
+
+BINARY_RDF_MAGIC = b"OSDURDF1"
+BINARY_RDF_VERSION = 1
+
+# Number of terms per front-coded block of the dictionary
+FRONT_CODING_BLOCK_SIZE = 16
+
+# Number of decoded terms, and of term ids, kept by a view for repeated lookups
+TERM_CACHE_SIZE = 1 << 16
+
+# Term orders of the triple indexes, as positions in an (s, p, o) triple
+_ORDERS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+# Order of the arrays in the file, with their item formats. Term ids use the narrowest
+# unsigned format that holds them, given in the header.
+_ID = "id"
+_SECTIONS = [("string_offsets", "I"), ("string_shared", "H"), ("string_bytes", "B")] + [
+    (order + suffix, "I" if suffix == "_ptr" else _ID)
+    for order in _ORDERS
+    for suffix in ["_ptr", "_" + order[1], "_" + order[2]]
+]
+
+# Header: magic, version, term id format, number of sections, then (offset, length) per section
+_HEADER_FMT = "<8sI4sI" + "QQ" * len(_SECTIONS)
+_HEADER_SIZE = struct.calcsize(_HEADER_FMT)
+
+# Item formats, as struct/memoryview codes, and the matching little-endian numpy dtypes
+_DTYPES = {"B": "<u1", "H": "<u2", "I": "<u4"}
+
+
+def pack_triples(triples) -> bytes:
+    """Serialize triples into the binary format read by BinaryRDFView.
+        Duplicate triples are stored once.
+
+    Args:
+        triples: Iterable of (subject, predicate, object) terms in N-Triples form.
+
+    Returns:
+        bytes: Packed triples buffer.
+    """
+    triples = list(triples)
+    terms = sorted({term for triple in triples for term in triple})
+    term_ids = {term: i for i, term in enumerate(terms)}
+    num_terms = len(terms)
+    id_format = "H" if num_terms <= np.iinfo(np.uint16).max else "I"
+
+    id_triples = np.array(
+        [[term_ids[term] for term in triple] for triple in triples], dtype=np.int64
+    ).reshape(-1, 3)
+    id_triples = np.unique(id_triples, axis=0)
+
+    arrays = {}
+    for order, (first, second, third) in _ORDERS.items():
+        sort_idxs = np.lexsort(
+            (id_triples[:, third], id_triples[:, second], id_triples[:, first])
+        )
+        ordered = id_triples[sort_idxs][:, [first, second, third]]
+        ptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ordered[:, 0], minlength=num_terms), out=ptr[1:])
+        arrays[order + "_ptr"] = ptr
+        arrays[order + "_" + order[1]] = ordered[:, 1]
+        arrays[order + "_" + order[2]] = ordered[:, 2]
+
+    # Front-coded dictionary. Sorting str and UTF-8 bytes gives the same order.
+    encoded = [term.encode("utf-8") for term in terms]
+    shared = []
+    suffixes = []
+    for i, term in enumerate(encoded):
+        num_shared = 0
+        if i % FRONT_CODING_BLOCK_SIZE != 0:
+            previous = encoded[i - 1]
+            max_shared = min(len(term), len(previous), np.iinfo(np.uint16).max)
+            while (num_shared < max_shared) and (
+                term[num_shared] == previous[num_shared]
+            ):
+                num_shared += 1
+        shared.append(num_shared)
+        suffixes.append(term[num_shared:])
+    offsets = np.zeros(num_terms + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(suffix) for suffix in suffixes])
+    arrays["string_offsets"] = offsets
+    arrays["string_shared"] = np.array(shared, dtype=np.int64)
+    arrays["string_bytes"] = np.frombuffer(b"".join(suffixes), dtype=np.uint8)
+
+    # Lay out sections after the header, each aligned to 8 bytes
+    chunks = []
+    section_table = []
+    position = _HEADER_SIZE
+    for section_name, item_format in _SECTIONS:
+        if item_format == _ID:
+            item_format = id_format
+        data = arrays[section_name].astype(_DTYPES[item_format]).tobytes()
+        padding = -position % 8
+        chunks.append(b"\0" * padding)
+        position += padding
+        section_table.extend([position, len(data)])
+        chunks.append(data)
+        position += len(data)
+
+    header = struct.pack(
+        _HEADER_FMT,
+        BINARY_RDF_MAGIC,
+        BINARY_RDF_VERSION,
+        id_format.encode("ascii"),
+        len(_SECTIONS),
+        *section_table,
+    )
+    return header + b"".join(chunks)
+
+
+class BinaryRDFSink(TripleSink):
+    def __init__(self, filepath: str):
+        """Collects the triples of ontology events in N-Triples form, and writes them in the
+            binary format read by BinaryRDFView.open when the traversal finishes
+
+        Args:
+            filepath (str): Destination file.
+        """
+        super().__init__()
+        self.filepath = filepath
+        self.writer = None
+        self.rows = []
+
+    def start(self, open_ont_dict: dict) -> None:
+        self.writer = TripleWriter(generate_prefix_map(open_ont_dict))
+        super().start(open_ont_dict)
+
+    def entity(self, triples: list) -> None:
+        for triple in triples:
+            terms = tuple(self.writer.expand(term) for term in triple)
+            if "" not in terms:
+                self.rows.append(terms)
+
+    def finish(self) -> None:
+        with open(self.filepath, "wb") as f:
+            f.write(pack_triples(self.rows))
+        self.rows = []
+
+
+def write_binary_rdf(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    filepath: str,
+) -> None:
+    """Write the ontology in the binary format read by BinaryRDFView.open
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        filepath (str): Destination file.
+    """
+    emit_ontology(
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
+        open_ont_dict,
+        [BinaryRDFSink(filepath)],
+    )
+
+
+class BinaryRDFView:
+    def __init__(self, buffer, handle=None):
+        """Read-only view over a packed triples buffer, answering triple pattern lookups.
+            Use BinaryRDFView.open for a file.
+
+        Args:
+            buffer: Buffer-protocol object holding the output of pack_triples.
+            handle (optional): Object owning the buffer, closed when the view is closed.
+        """
+        self._handle = handle
+        self._buffer = memoryview(buffer)
+        header = struct.unpack_from(_HEADER_FMT, self._buffer, 0)
+        if header[0] != BINARY_RDF_MAGIC or header[1] != BINARY_RDF_VERSION:
+            raise ValueError("Buffer does not hold binary RDF of this version")
+        id_format = header[2].rstrip(b"\0").decode("ascii")
+
+        # Arrays are memoryviews cast to their item format, as indexing them is cheaper than
+        # numpy for the few items read by one lookup
+        self._arrays = {}
+        for i, (section_name, item_format) in enumerate(_SECTIONS):
+            offset, length = header[4 + 2 * i], header[5 + 2 * i]
+            self._arrays[section_name] = self._buffer[offset : offset + length].cast(
+                id_format if item_format == _ID else item_format
+            )
+        self.num_terms = len(self._arrays["string_shared"])
+        self.num_triples = len(self._arrays["spo_p"])
+        self.term = functools.lru_cache(maxsize=TERM_CACHE_SIZE)(self.term)
+        self.term_id = functools.lru_cache(maxsize=TERM_CACHE_SIZE)(self.term_id)
+
+    @classmethod
+    def open(cls, filepath: str) -> "BinaryRDFView":
+        """Memory-map a file written by write_binary_rdf
+
+        Args:
+            filepath (str): Path to the binary RDF file.
+        """
+        with open(filepath, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, handle=mapped)
+
+    def close(self) -> None:
+        # Views into the buffer must be released before the owner can be closed
+        for array in self._arrays.values():
+            array.release()
+        self._arrays = {}
+        self.term.cache_clear()
+        self.term_id.cache_clear()
+        self._buffer.release()
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.num_triples
+
+    def _term_bytes(self, term_id: int) -> bytes:
+        """Decode a term, starting from the first term of its block"""
+        offsets = self._arrays["string_offsets"]
+        shared = self._arrays["string_shared"]
+        strings = self._arrays["string_bytes"]
+        term = b""
+        for i in range(term_id - term_id % FRONT_CODING_BLOCK_SIZE, term_id + 1):
+            term = term[: shared[i]] + strings[offsets[i] : offsets[i + 1]].tobytes()
+        return term
+
+    def term(self, term_id: int) -> str:
+        return self._term_bytes(term_id).decode("utf-8")
+
+    def term_id(self, term: str) -> int:
+        """Id of a term in N-Triples form, or -1 if the term is not in the dictionary"""
+        offsets = self._arrays["string_offsets"]
+        shared = self._arrays["string_shared"]
+        strings = self._arrays["string_bytes"]
+        target = term.encode("utf-8")
+
+        # Binary search over the first terms of the blocks, which are stored whole
+        num_blocks = -(-self.num_terms // FRONT_CODING_BLOCK_SIZE)
+        block = (
+            bisect_right(
+                range(num_blocks),
+                target,
+                key=lambda block: strings[
+                    offsets[block * FRONT_CODING_BLOCK_SIZE] : offsets[
+                        block * FRONT_CODING_BLOCK_SIZE + 1
+                    ]
+                ].tobytes(),
+            )
+            - 1
+        )
+        if block < 0:
+            return -1
+
+        # Scan the block, decoding its terms in order
+        block_start = block * FRONT_CODING_BLOCK_SIZE
+        candidate = b""
+        for i in range(
+            block_start, min(block_start + FRONT_CODING_BLOCK_SIZE, self.num_terms)
+        ):
+            candidate = (
+                candidate[: shared[i]] + strings[offsets[i] : offsets[i + 1]].tobytes()
+            )
+            if candidate == target:
+                return i
+            if candidate > target:
+                break
+        return -1
+
+    def triple_ids(self, s: int = None, p: int = None, o: int = None) -> list:
+        """Find the triples matching a pattern of term ids, with None for unbound terms
+
+        Returns:
+            list: Matching (s, p, o) term id tuples.
+        """
+        if s is not None:
+            if (o is not None) and (p is None):
+                order, first, second = "osp", o, s
+            else:
+                order, first, second = "spo", s, p
+        elif p is not None:
+            order, first, second = "pos", p, o
+        elif o is not None:
+            order, first, second = "osp", o, None
+        else:
+            ptr = self._arrays["spo_ptr"]
+            preds = self._arrays["spo_p"]
+            objs = self._arrays["spo_o"]
+            return [
+                (subj, preds[i], objs[i])
+                for subj in range(self.num_terms)
+                for i in range(ptr[subj], ptr[subj + 1])
+            ]
+
+        ptr = self._arrays[order + "_ptr"]
+        seconds = self._arrays[order + "_" + order[1]]
+        thirds = self._arrays[order + "_" + order[2]]
+        start, stop = ptr[first], ptr[first + 1]
+        if second is not None:
+            start, stop = (
+                bisect_left(seconds, second, start, stop),
+                bisect_right(seconds, second, start, stop),
+            )
+
+        # A bound third term is checked, as no order has it after two bound terms
+        third = (s, p, o)[_ORDERS[order][2]]
+        if order == "spo":
+            rows = ((first, seconds[i], thirds[i]) for i in range(start, stop))
+        elif order == "pos":
+            rows = ((thirds[i], first, seconds[i]) for i in range(start, stop))
+        else:
+            rows = ((seconds[i], thirds[i], first) for i in range(start, stop))
+        if third is None:
+            return list(rows)
+        return [row for row in rows if row[_ORDERS[order][2]] == third]
+
+    def _pattern_ids(self, s: str, p: str, o: str) -> list:
+        """Term ids of a pattern, or None if a bound term is not in the dictionary"""
+        ids = []
+        for term in (s, p, o):
+            term_id = self.term_id(term) if term is not None else None
+            if term_id == -1:
+                return None
+            ids.append(term_id)
+        return ids
+
+    def triples(self, s: str = None, p: str = None, o: str = None):
+        """Find the triples matching a pattern of terms in N-Triples form, with None for unbound terms
+
+        Yields:
+            tuple: Matching (subject, predicate, object) terms.
+        """
+        ids = self._pattern_ids(s, p, o)
+        if ids is None:
+            return
+        for s_id, p_id, o_id in self.triple_ids(*ids):
+            yield (
+                s if s is not None else self.term(s_id),
+                p if p is not None else self.term(p_id),
+                o if o is not None else self.term(o_id),
+            )
+
+    def count(self, s: str = None, p: str = None, o: str = None) -> int:
+        ids = self._pattern_ids(s, p, o)
+        if ids is None:
+            return 0
+        return len(self.triple_ids(*ids))
@@ -0,0 +1,78 @@
+import gzip
+import io
+import lzma
+import os
+
+# Compression codecs of files, by file extension
+COMPRESSION_CODECS = {".gz": "gzip", ".xz": "xz", ".zst": "zstd"}
+
+# Compression level of each codec when none is given, as in the command line tools
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "xz": 6, "zstd": 3}
+
+
+def compression_codec(filepath: str) -> str:
+    """Compression codec of a file from its extension: 'gzip', 'xz', 'zstd', or None if uncompressed"""
+    return COMPRESSION_CODECS.get(os.path.splitext(filepath)[1].lower())
+
+
+def open_compressed(filepath: str, mode: str = "rb", level: int = None):
+    """Open a binary stream that compresses on write or decompresses on read, with the codec
+        given by the extension of the file. zstd (.zst) requires the zstandard package.
+        gzip streams carry no timestamp, so that the output is reproducible.
+
+    Args:
+        filepath (str): Filepath ending in .gz, .xz or .zst.
+        mode (str, optional): 'rb' or 'wb'. Defaults to 'rb'.
+        level (int, optional): Compression level, for writing. Defaults to None, for the
+            codec's level in DEFAULT_COMPRESSION_LEVELS.
+
+    Returns:
+        Binary file object. Closing it closes the file.
+    """
+    codec = compression_codec(filepath)
+    if codec is None:
+        raise ValueError("Not a compressed file extension: " + filepath)
+    if level is None:
+        level = DEFAULT_COMPRESSION_LEVELS[codec]
+
+    if codec == "gzip":
+        if mode == "rb":
+            return gzip.GzipFile(filepath, mode)
+        return gzip.GzipFile(filepath, mode, compresslevel=level, mtime=0)
+    if codec == "xz":
+        if mode == "rb":
+            return lzma.open(filepath, mode)
+        return lzma.open(filepath, mode, preset=level)
+
+    import zstandard
+
+    if mode == "rb":
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(filepath, mode), closefd=True
+        )
+    return zstandard.ZstdCompressor(level=level).stream_writer(
+        open(filepath, mode), closefd=True
+    )
+
+
+def open_output(
+    filepath: str,
+    level: int = None,
+    encoding: str = None,
+    buffering: int = -1,
+):
+    """Open a text file for writing, compressed as the text streams out if its extension is
+        .gz, .xz or .zst. The text written is the same as with open(filepath, 'w').
+
+    Args:
+        filepath (str): Filepath of the output.
+        level (int, optional): Compression level of a compressed file, see open_compressed. Defaults to None.
+        encoding (str, optional): Text encoding. Defaults to None, for the locale's encoding as with open.
+        buffering (int, optional): Buffer size of an uncompressed file, as with open. Defaults to -1.
+
+    Returns:
+        Text file object.
+    """
+    if compression_codec(filepath) is None:
+        return open(filepath, "w", encoding=encoding, buffering=buffering)
+    return io.TextIOWrapper(open_compressed(filepath, "wb", level), encoding=encoding)
@@ -0,0 +1,177 @@
+from .kg_rep import *
+
+
+class InheritanceDAG:
+    def __init__(self, class_ontology_dict: dict, include_subclass_links: bool = True):
+        """Superclass graph of an ontology, built once from a dictionary of ClassRep objects.
+            Nodes are the keys of class_ontology_dict; an edge points from a class to each
+            of its superclasses that is itself a key of class_ontology_dict.
+            Superclasses outside the dictionary (e.g. owl:Thing, or open ontology classes) are left out.
+
+            Strongly connected components are computed once on construction, in an order where
+            every component comes after the components of all of its superclasses.
+            This gives cycle detection and a topological order of the classes in linear time.
+
+        Args:
+            class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+            include_subclass_links (bool, optional): Whether edges implied by the subclass_list of
+                each class are part of the graph. Defaults to True.
+        """
+        self.names = list(class_ontology_dict.keys())
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        # Direct superclasses of each node, as node indices, in superclass_list order
+        self.parents = [[] for _ in self.names]
+
+        # (subclass, superclass) name pairs given by subclass_list entries
+        self.subclass_links = []
+
+        # (class, referenced class) name pairs for subclass_list entries missing from the dictionary
+        self.missing_subclasses = []
+
+        for i, class_rep in enumerate(class_ontology_dict.values()):
+            for superclass in class_rep.superclass_list:
+                if superclass in self.index:
+                    self._add_edge(i, self.index[superclass])
+
+        for class_name, class_rep in class_ontology_dict.items():
+            for subclass_name in class_rep.subclass_list:
+                if subclass_name not in self.index:
+                    self.missing_subclasses.append((class_name, subclass_name))
+                    continue
+                self.subclass_links.append((subclass_name, class_name))
+                if include_subclass_links:
+                    self._add_edge(self.index[subclass_name], self.index[class_name])
+
+        self.components = self._strongly_connected_components()
+        self.component_of = [0] * len(self.names)
+        for c, members in enumerate(self.components):
+            for node in members:
+                self.component_of[node] = c
+
+    def _add_edge(self, node: int, parent: int) -> None:
+        if parent not in self.parents[node]:
+            self.parents[node].append(parent)
+
+    def _strongly_connected_components(self) -> list:
+        """Iterative Tarjan's algorithm over edges pointing from class to superclass.
+        Components are emitted after every component reachable from them,
+        i.e. superclasses before subclasses.
+        """
+        num_nodes = len(self.names)
+        order = [-1] * num_nodes
+        lowlink = [0] * num_nodes
+        on_stack = [False] * num_nodes
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(num_nodes):
+            if order[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child_idx = work.pop()
+                if child_idx == 0:
+                    order[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                recurse = False
+                parents = self.parents[node]
+                while child_idx < len(parents):
+                    parent = parents[child_idx]
+                    child_idx += 1
+                    if order[parent] == -1:
+                        work.append((node, child_idx))
+                        work.append((parent, 0))
+                        recurse = True
+                        break
+                    elif on_stack[parent]:
+                        lowlink[node] = min(lowlink[node], order[parent])
+                if recurse:
+                    continue
+                if lowlink[node] == order[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        members.append(member)
+                        if member == node:
+                            break
+                    components.append(members)
+                if work:
+                    caller = work[-1][0]
+                    lowlink[caller] = min(lowlink[caller], lowlink[node])
+
+        return components
+
+    def cycles(self) -> list:
+        """Find inheritance cycles.
+
+        Returns:
+            list: One sorted list of class names per cycle, i.e. per strongly connected
+                component with more than one class, or a class inheriting itself.
+        """
+        cycles = []
+        for members in self.components:
+            if (len(members) > 1) or (members[0] in self.parents[members[0]]):
+                cycles.append(sorted(self.names[node] for node in members))
+        return cycles
+
+    def topological_order(self) -> list:
+        """Class names ordered so that every class comes after its superclasses.
+            Classes within a cycle are grouped together, in no particular order.
+
+        Returns:
+            list: Ordered class names.
+        """
+        return [self.names[node] for members in self.components for node in members]
+
+    def ancestor_bitsets(self) -> list:
+        """Compute the strict ancestors of each strongly connected component, as bitsets
+            over node indices (Python integers), in one pass in topological order.
+            Ancestors in the same component as the class are not included.
+
+        Returns:
+            list: Bitset of ancestor nodes for each component, indexed as self.components.
+        """
+        member_bits = [0] * len(self.components)
+        ancestors = [0] * len(self.components)
+        for c, members in enumerate(self.components):
+            bits = 0
+            for node in members:
+                bits |= 1 << node
+                for parent in self.parents[node]:
+                    parent_c = self.component_of[parent]
+                    if parent_c != c:
+                        ancestors[c] |= member_bits[parent_c] | ancestors[parent_c]
+            member_bits[c] = bits
+        return ancestors
+
+    def redundant_superclasses(self) -> dict:
+        """Compute the transitive reduction of the superclass graph: a direct superclass is
+            redundant if it is also reachable through another direct superclass.
+            Edges within a cycle are never reported as redundant.
+
+        Returns:
+            dict: Mapping from class name to the list of its redundant direct superclasses.
+        """
+        ancestors = self.ancestor_bitsets()
+        redundant = {}
+        for node, parents in enumerate(self.parents):
+            if len(parents) < 2:
+                continue
+            # Superclasses in the same cycle as the class reach back to it, so only
+            # superclasses outside its component can make another superclass redundant
+            component = self.component_of[node]
+            reachable = 0
+            for parent in parents:
+                if self.component_of[parent] != component:
+                    reachable |= ancestors[self.component_of[parent]]
+            removed = [
+                self.names[parent] for parent in parents if (reachable >> parent) & 1
+            ]
+            if removed:
+                redundant[self.names[node]] = removed
+        return redundant
@@ -0,0 +1,290 @@
+import numpy as np
+
+from .kg_rep import *
+
+# Classes with more than this many candidate pairs from shared properties are
+# compared with MinHash signatures instead of exact pairwise intersections
+EXACT_MAX_PAIRS = 1 << 24
+
+# MinHash signature length, and number of signature rows hashed together per LSH band
+MINHASH_NUM_PERM = 64
+MINHASH_BAND_SIZE = 4
+
+
+class IncidenceMatrix:
+    def __init__(
+        self,
+        class_ontology_dict: dict,
+        prop_ontology_dict: dict,
+        include_ranges: bool = False,
+        min_features: int = 1,
+    ):
+        """Sparse binary class-by-property incidence matrix, stored as CSR arrays.
+            Row i lists the properties of class row_names[i]: each property with the class
+            in its domain and, if include_ranges is set, each property with the class in its range.
+            Domain and range incidences are separate columns.
+            Classes with fewer than min_features properties are left out.
+
+        Args:
+            class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+            prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+            include_ranges (bool, optional): Whether properties ranging over a class are columns of its row.
+                Defaults to False, since inline classes are usually the range of a property named after them.
+            min_features (int, optional): Minimum number of properties of a class in the matrix. Defaults to 1.
+        """
+        self.feature_names = []
+        features_by_class = {}
+        for prop_name, prop_rep in prop_ontology_dict.items():
+            incidences = [("domain", prop_rep.domain)]
+            if include_ranges:
+                incidences.append(("range", prop_rep.range))
+            for kind, class_names in incidences:
+                feature_id = len(self.feature_names)
+                self.feature_names.append(kind + ":" + prop_name)
+                for class_name in class_names:
+                    if class_name in class_ontology_dict:
+                        features_by_class.setdefault(class_name, set()).add(feature_id)
+
+        self.row_names = [
+            class_name
+            for class_name in class_ontology_dict.keys()
+            if len(features_by_class.get(class_name, ())) >= max(min_features, 1)
+        ]
+        row_features = [sorted(features_by_class[name]) for name in self.row_names]
+        self.row_sizes = np.array([len(f) for f in row_features], dtype=np.int64)
+        self.indptr = np.zeros(len(self.row_names) + 1, dtype=np.int64)
+        np.cumsum(self.row_sizes, out=self.indptr[1:])
+        self.indices = np.array(
+            [feature_id for f in row_features for feature_id in f], dtype=np.int64
+        )
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.row_names)
+
+    @property
+    def num_features(self) -> int:
+        return len(self.feature_names)
+
+    def row(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i] : self.indptr[i + 1]]
+
+    def columns(self) -> tuple:
+        """Transpose of the matrix, as CSC arrays
+
+        Returns:
+            tuple: (column pointers, row indices sorted within each column)
+        """
+        rows = np.repeat(np.arange(self.num_rows, dtype=np.int64), self.row_sizes)
+        order = np.argsort(self.indices, kind="stable")
+        colptr = np.zeros(self.num_features + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self.indices, minlength=self.num_features), out=colptr[1:]
+        )
+        return colptr, rows[order]
+
+    def num_candidate_pairs(self) -> int:
+        column_sizes = np.bincount(self.indices, minlength=self.num_features)
+        return int(np.sum(column_sizes * (column_sizes - 1) // 2))
+
+
+def exact_similar_pairs(matrix: IncidenceMatrix, threshold: float) -> tuple:
+    """Jaccard similarity of every pair of rows sharing a column, computed by expanding
+        each column into its row pairs and counting the pairs with np.unique.
+
+    Args:
+        matrix (IncidenceMatrix): Class-by-property incidence matrix.
+        threshold (float): Minimum Jaccard similarity of the returned pairs.
+
+    Returns:
+        tuple: Arrays (first rows, second rows, similarities) of the pairs above the threshold.
+    """
+    colptr, col_rows = matrix.columns()
+    pair_keys = []
+    for j in range(matrix.num_features):
+        members = col_rows[colptr[j] : colptr[j + 1]]
+        if len(members) < 2:
+            continue
+        first, second = np.triu_indices(len(members), 1)
+        pair_keys.append(members[first] * matrix.num_rows + members[second])
+    if not pair_keys:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+
+    keys, intersections = np.unique(np.concatenate(pair_keys), return_counts=True)
+    first, second = np.divmod(keys, matrix.num_rows)
+    unions = matrix.row_sizes[first] + matrix.row_sizes[second] - intersections
+    similarities = intersections / unions
+    keep = similarities >= threshold
+    return first[keep], second[keep], similarities[keep]
+
+
+def minhash_signatures(
+    matrix: IncidenceMatrix, num_perm: int = MINHASH_NUM_PERM, seed: int = 0
+) -> np.ndarray:
+    """MinHash signature of each row, with multiply-shift hashes of the column indices
+
+    Args:
+        matrix (IncidenceMatrix): Class-by-property incidence matrix, without empty rows.
+        num_perm (int, optional): Number of hash functions. Defaults to MINHASH_NUM_PERM.
+        seed (int, optional): Seed of the hash functions. Defaults to 0.
+
+    Returns:
+        np.ndarray: Array of shape (num_rows, num_perm) of uint32 minimum hashes.
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 1 << 63, num_perm, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+    columns = (matrix.indices.astype(np.uint64) + np.uint64(1))[:, None]
+    hashes = ((columns * multipliers + offsets) >> np.uint64(32)).astype(np.uint32)
+    return np.minimum.reduceat(hashes, matrix.indptr[:-1], axis=0)
+
+
+def minhash_similar_pairs(
+    matrix: IncidenceMatrix,
+    threshold: float,
+    num_perm: int = MINHASH_NUM_PERM,
+    band_size: int = MINHASH_BAND_SIZE,
+) -> tuple:
+    """Rows likely above a Jaccard threshold, found by locality sensitive hashing of MinHash
+        signatures, then checked with their exact Jaccard similarity.
+        Rows with an equal band of signature values are candidates: each is compared with
+        the first row and the previous row of its bucket.
+
+    Args:
+        matrix (IncidenceMatrix): Class-by-property incidence matrix.
+        threshold (float): Minimum Jaccard similarity of the returned pairs.
+        num_perm (int, optional): Number of hash functions. Defaults to MINHASH_NUM_PERM.
+        band_size (int, optional): Signature rows per band. Defaults to MINHASH_BAND_SIZE.
+
+    Returns:
+        tuple: Arrays (first rows, second rows, similarities) of the pairs above the threshold.
+    """
+    signatures = minhash_signatures(matrix, num_perm)
+    candidate_keys = []
+    for start in range(0, num_perm, band_size):
+        _, buckets = np.unique(
+            signatures[:, start : start + band_size], axis=0, return_inverse=True
+        )
+        order = np.argsort(buckets.ravel(), kind="stable")
+        sorted_buckets = buckets.ravel()[order]
+        positions = np.arange(len(order))
+        is_start = np.ones(len(order), dtype=bool)
+        is_start[1:] = sorted_buckets[1:] != sorted_buckets[:-1]
+        bucket_start = np.maximum.accumulate(np.where(is_start, positions, 0))
+        for other in (order[bucket_start], np.roll(order, 1)):
+            first = np.minimum(other, order)[~is_start]
+            second = np.maximum(other, order)[~is_start]
+            candidate_keys.append(first * matrix.num_rows + second)
+
+    keys = np.unique(np.concatenate(candidate_keys))
+    first, second = np.divmod(keys, matrix.num_rows)
+    row_sets = [frozenset(matrix.row(i).tolist()) for i in range(matrix.num_rows)]
+    similarities = np.array(
+        [
+            len(row_sets[i] & row_sets[k]) / len(row_sets[i] | row_sets[k])
+            for i, k in zip(first.tolist(), second.tolist())
+        ],
+        dtype=float,
+    )
+    keep = similarities >= threshold
+    return first[keep], second[keep], similarities[keep]
+
+
+def cluster_pairs(num_rows: int, first: np.ndarray, second: np.ndarray) -> list:
+    """Connected components of rows linked by pairs, with a union-find forest
+
+    Returns:
+        list: Lists of row indices of the components with more than one row.
+    """
+    parent = list(range(num_rows))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for i, k in zip(first.tolist(), second.tolist()):
+        root_i, root_k = find(i), find(k)
+        if root_i != root_k:
+            parent[max(root_i, root_k)] = min(root_i, root_k)
+
+    components = {}
+    for node in range(num_rows):
+        components.setdefault(find(node), []).append(node)
+    return [members for members in components.values() if len(members) > 1]
+
+
+def find_duplicate_classes(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    threshold: float = 0.9,
+    include_ranges: bool = False,
+    min_features: int = 1,
+    method: str = "auto",
+) -> list:
+    """Find clusters of near-duplicate classes: classes linked by a chain of pairs whose
+        property sets have a Jaccard similarity of at least the threshold.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        threshold (float, optional): Minimum Jaccard similarity of linked classes. Defaults to 0.9.
+        include_ranges (bool, optional): Whether properties ranging over a class count as its properties.
+            Defaults to False.
+        min_features (int, optional): Minimum number of properties of a compared class. Defaults to 1.
+        method (str, optional): "exact" for pairwise intersections, "minhash" for MinHash LSH,
+            or "auto" for exact unless there are more than EXACT_MAX_PAIRS candidate pairs. Defaults to "auto".
+
+    Returns:
+        list: Clusters as sorted lists of class names, largest clusters first.
+    """
+    matrix = IncidenceMatrix(
+        class_ontology_dict, prop_ontology_dict, include_ranges, min_features
+    )
+    if matrix.num_rows < 2:
+        return []
+
+    if method == "auto":
+        method = (
+            "exact" if matrix.num_candidate_pairs() <= EXACT_MAX_PAIRS else "minhash"
+        )
+    if method == "exact":
+        first, second, _ = exact_similar_pairs(matrix, threshold)
+    else:
+        first, second, _ = minhash_similar_pairs(matrix, threshold)
+
+    clusters = [
+        sorted(matrix.row_names[row] for row in members)
+        for members in cluster_pairs(matrix.num_rows, first, second)
+    ]
+    return sorted(clusters, key=lambda cluster: (-len(cluster), cluster[0]))
+
+
+def merge_duplicate_classes(class_ontology_dict: dict, clusters: list) -> int:
+    """Link the classes of each cluster to its first class with owl:equivalentClass
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        clusters (list): Clusters of class names, as returned by find_duplicate_classes.
+
+    Returns:
+        int: Number of classes linked.
+    """
+    num_linked = 0
+    for cluster in clusters:
+        for class_name in cluster[1:]:
+            class_ontology_dict[class_name].add_equivalent_class(cluster[0])
+            num_linked += 1
+    return num_linked
+
+
+def print_duplicate_clusters(clusters: list, threshold: float) -> None:
+    print(
+        "Near-duplicate classes (Jaccard >= {}): {} clusters, {} classes".format(
+            threshold, len(clusters), sum(len(cluster) for cluster in clusters)
+        )
+    )
+    for cluster in clusters:
+        print("\t" + ", ".join(cluster))
@@ -0,0 +1,335 @@
+import multiprocessing
+from xml.sax.saxutils import quoteattr
+
+from .kg_rep import *
+from .dag_utils import InheritanceDAG
+from .compress_utils import open_output
+from .ttl_utils import (
+    PROPERTY_SECTION_HEADERS,
+    STANDARD_IMPORTS,
+    TTL_WRITE_BUFFER_SIZE,
+    annotation_property_lines,
+    classes_header,
+    generate_open_ont_prefix_lines,
+    join_lines,
+    prefix_lines,
+    render_block,
+    render_ontology_declaration,
+    sorted_class_keys,
+    sorted_property_sections,
+)
+
+# Module holding the classes with no organizing superclass (System, ACL, abstract and inline classes),
+# and the properties shared by classes of several modules
+BASE_MODULE = "abstract"
+
+# Modules of the classes inheriting each organizing superclass, named after the schema folders.
+# Listed in layers, from the base up: a module only imports the modules below it, so that
+# loading one module never loads the modules above it.
+DOMAIN_MODULES = {
+    "ReferenceData": "reference-data",
+    "MasterData": "master-data",
+    "Dataset": "dataset",
+    "WorkProductComponent": "work-product-component",
+}
+
+# Ontology IRI of a module, followed by the module name
+MODULE_IRI_PREFIX = "https://w3id.org/osdu/"
+
+# XML catalog mapping the module IRIs to the module files, as read by Protege
+MODULE_CATALOG_FILENAME = "catalog-v001.xml"
+
+
+def module_references(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: RestrictionStore,
+) -> dict:
+    """Classes and properties of the ontology referred to by the TTL block of each class and property:
+        superclasses, restriction properties and onClass targets, and equivalent classes of a class,
+        and the domain and range classes of a property.
+
+    Returns:
+        dict: Mapping from ('class', name) or ('property', name) to a list of such keys.
+    """
+    references = {}
+    for class_name, class_rep in class_ontology_dict.items():
+        refs = [("class", name) for name in class_rep.superclass_list]
+        for rest_prop in array_properties_dict.get(class_name, []):
+            refs.append(("property", rest_prop["prop_name"]))
+            if "on_class" in rest_prop:
+                refs.append(("class", rest_prop["on_class"]))
+        refs.extend(("class", name) for name in class_rep.equivalent_list)
+        references[("class", class_name)] = refs
+
+    for prop_name, prop_rep in prop_ontology_dict.items():
+        references[("property", prop_name)] = [
+            ("class", name) for name in prop_rep.domain + prop_rep.range
+        ]
+
+    # Drop references to literals and external classes, which belong to no module
+    for key, refs in references.items():
+        references[key] = [ref for ref in refs if ref in references]
+    return references
+
+
+def partition_modules(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: RestrictionStore,
+) -> dict:
+    """Partition the ontology into modules by organizing superclass (see DOMAIN_MODULES).
+        A class inheriting an organizing superclass, or the superclass itself, is in its module;
+        with several, in the highest one. Every other class (System, ACL, abstract and inline
+        classes) is in BASE_MODULE. A property is in the module of its domain classes if they are
+        all in the same module, and in BASE_MODULE otherwise, e.g. for properties shared by classes
+        of several modules. A module imports each lower module its blocks refer to; references to
+        higher modules are left as IRIs, so that imports only point downward.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+
+    Returns:
+        dict: Mapping from module name to a dictionary of its 'classes' and 'properties', as keys in
+            output order, and its 'imports', as module names in layer order. Modules are in layer order.
+    """
+    layers = [BASE_MODULE] + list(DOMAIN_MODULES.values())
+    layer_of = {module_name: layer for layer, module_name in enumerate(layers)}
+
+    # Organizing module of each class, from its superclasses in topological order
+    dag = InheritanceDAG(class_ontology_dict)
+    organizing_layer = {}
+    for class_name in dag.topological_order():
+        if class_name in DOMAIN_MODULES:
+            organizing_layer[class_name] = layer_of[DOMAIN_MODULES[class_name]]
+            continue
+        parent_layers = [
+            organizing_layer.get(dag.names[parent], 0)
+            for parent in dag.parents[dag.index[class_name]]
+        ]
+        organizing_layer[class_name] = max(parent_layers, default=0)
+
+    entity_layer = {
+        ("class", class_name): layer for class_name, layer in organizing_layer.items()
+    }
+    for prop_name, prop_rep in prop_ontology_dict.items():
+        domain_layers = {organizing_layer.get(name, 0) for name in prop_rep.domain}
+        entity_layer[("property", prop_name)] = (
+            domain_layers.pop() if len(domain_layers) == 1 else 0
+        )
+
+    modules = {
+        module_name: {"classes": [], "properties": [], "imports": set()}
+        for module_name in layers
+    }
+    for class_name in sorted_class_keys(class_ontology_dict):
+        modules[layers[entity_layer[("class", class_name)]]]["classes"].append(
+            class_name
+        )
+    for _, propkeys_list in sorted_property_sections(prop_ontology_dict):
+        for prop_name in propkeys_list:
+            modules[layers[entity_layer[("property", prop_name)]]]["properties"].append(
+                prop_name
+            )
+
+    references = module_references(
+        class_ontology_dict, prop_ontology_dict, array_properties_dict
+    )
+    for key, refs in references.items():
+        module = modules[layers[entity_layer[key]]]
+        for ref in refs:
+            if entity_layer[ref] < entity_layer[key]:
+                module["imports"].add(entity_layer[ref])
+    for module in modules.values():
+        module["imports"] = [layers[layer] for layer in sorted(module["imports"])]
+
+    cycle = find_import_cycle(modules)
+    if cycle:
+        raise ValueError("Cyclic module imports: " + " -> ".join(cycle))
+    return modules
+
+
+def find_import_cycle(modules: dict) -> list:
+    """Find a cycle of owl:imports between modules, as returned by partition_modules
+
+    Returns:
+        list: Names of the modules on the cycle, starting and ending with the same module,
+            or an empty list if the imports are acyclic.
+    """
+    visiting = []
+    done = set()
+
+    def visit(module_name: str) -> list:
+        if module_name in done:
+            return []
+        if module_name in visiting:
+            return visiting[visiting.index(module_name) :] + [module_name]
+        visiting.append(module_name)
+        for imported_name in modules[module_name]["imports"]:
+            cycle = visit(imported_name)
+            if cycle:
+                return cycle
+        visiting.pop()
+        done.add(module_name)
+        return []
+
+    for module_name in modules:
+        cycle = visit(module_name)
+        if cycle:
+            return cycle
+    return []
+
+
+def module_iri(module_name: str) -> str:
+    return MODULE_IRI_PREFIX + module_name
+
+
+def render_module_header(module_name: str, imports: list, open_ont_dict: dict) -> str:
+    """Prefixes, annotation properties and ontology declaration of a module. The base module
+    imports the vocabularies and open ontologies, and other modules import the modules they refer to.
+    """
+    import_refs = ["<" + module_iri(name) + ">" for name in imports]
+    if module_name == BASE_MODULE:
+        import_refs = STANDARD_IMPORTS + import_refs
+    return join_lines(
+        [
+            prefix_lines + generate_open_ont_prefix_lines(open_ont_dict),
+            annotation_property_lines
+            + render_ontology_declaration(
+                module_iri(module_name), "OSDU Ontology, " + module_name, import_refs
+            ),
+            classes_header,
+        ]
+    )
+
+
+def module_filename(module_name: str, compress_suffix: str = "") -> str:
+    return "osdu_" + module_name + ".ttl" + compress_suffix
+
+
+def write_domain_modules(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: RestrictionStore,
+    open_ont_dict: dict,
+    dest_filepath: str,
+    jobs: int = 1,
+    compress_suffix: str = "",
+    compress_level: int = None,
+) -> dict:
+    """Write the ontology as one TTL module per organizing superclass, see partition_modules,
+        each declaring an ontology that imports the lower modules it refers to, so that a consumer
+        can load one module and the modules it imports only. Module blocks are the same as in
+        the full TTL file, in the same order. Modules are written to osdu_<module>.ttl, along with
+        an XML catalog mapping their IRIs to the files, for editors to resolve the imports locally.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        dest_filepath (str): Destination location of the module files.
+        jobs (int, optional): Number of worker processes, each rendering and writing whole modules.
+            Defaults to 1, to write in this process.
+        compress_suffix (str, optional): Extension of the compression codec of the module files,
+            e.g. '.gz', or '' for uncompressed files. Defaults to ''.
+        compress_level (int, optional): Compression level, see open_compressed. Defaults to None.
+
+    Returns:
+        dict: Modules, as returned by partition_modules.
+    """
+    modules = partition_modules(
+        class_ontology_dict, prop_ontology_dict, array_properties_dict
+    )
+    module_tasks = []
+    for module_name, module in modules.items():
+        prop_set = set(module["properties"])
+        # Property sections hold all of the module properties, in the order of the full file
+        sections = [
+            (prop_type, [key for key in propkeys_list if key in prop_set])
+            for prop_type, propkeys_list in sorted_property_sections(prop_ontology_dict)
+        ]
+        module_tasks.append(
+            (
+                dest_filepath + module_filename(module_name, compress_suffix),
+                render_module_header(module_name, module["imports"], open_ont_dict),
+                module["classes"],
+                sections,
+                compress_level,
+            )
+        )
+
+    if jobs <= 1:
+        render_dicts = (class_ontology_dict, prop_ontology_dict, array_properties_dict)
+        for module_task in module_tasks:
+            _write_module(module_task, render_dicts)
+    else:
+        # Largest modules first, so that they do not end up last on a worker
+        module_tasks.sort(
+            key=lambda task: -(len(task[2]) + sum(len(keys) for _, keys in task[3]))
+        )
+        with multiprocessing.Pool(
+            min(jobs, len(module_tasks)),
+            initializer=_init_module_worker,
+            initargs=(class_ontology_dict, prop_ontology_dict, array_properties_dict),
+        ) as pool:
+            for _ in pool.imap_unordered(_write_module, module_tasks):
+                pass
+
+    write_module_catalog(modules, dest_filepath, compress_suffix)
+    for module_name, module in modules.items():
+        print(
+            "Module",
+            module_name + ":",
+            len(module["classes"]),
+            "classes,",
+            len(module["properties"]),
+            "properties, imports",
+            ", ".join(module["imports"]) or "none",
+        )
+    return modules
+
+
+# Dictionaries rendered by a worker process of write_domain_modules
+_MODULE_DICTS = None
+
+
+def _init_module_worker(class_ontology_dict, prop_ontology_dict, array_properties_dict):
+    global _MODULE_DICTS
+    _MODULE_DICTS = (class_ontology_dict, prop_ontology_dict, array_properties_dict)
+
+
+def _write_module(module_task: tuple, render_dicts: tuple = None) -> str:
+    filepath, header, class_keys, sections, compress_level = module_task
+    render_dicts = render_dicts or _MODULE_DICTS
+    with open_output(filepath, compress_level, buffering=TTL_WRITE_BUFFER_SIZE) as f:
+        f.write(header)
+        for class_name in class_keys:
+            f.write(render_block("class", class_name, *render_dicts))
+        for prop_type, propkeys_list in sections:
+            f.write(join_lines([PROPERTY_SECTION_HEADERS[prop_type]]))
+            for prop_name in propkeys_list:
+                f.write(render_block("property", prop_name, *render_dicts))
+    return filepath
+
+
+def write_module_catalog(
+    modules: dict, dest_filepath: str, compress_suffix: str = ""
+) -> None:
+    """Write an OASIS XML catalog mapping the IRI of each module to its file"""
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>',
+        '<catalog prefer="public" xmlns="urn:oasis:names:tc:entity:xmlns:1.0:catalog">',
+    ]
+    for module_name in modules:
+        lines.append(
+            "    <uri name={} uri={}/>".format(
+                quoteattr(module_iri(module_name)),
+                quoteattr(module_filename(module_name, compress_suffix)),
+            )
+        )
+    lines.append("</catalog>")
+    with open(dest_filepath + MODULE_CATALOG_FILENAME, "w") as f:
+        f.write(join_lines(lines))
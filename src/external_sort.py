@@ -0,0 +1,106 @@
+import heapq
+import marshal
+import os
+import struct
+from operator import itemgetter
+
+# Maximum number of sorted runs read at once by a merge pass
+MERGE_FAN_IN = 64
+
+# Estimated memory taken by a buffered record besides its text, in bytes
+RECORD_OVERHEAD = 160
+
+# Length prefix of a record in a run file
+RECORD_HEADER = struct.Struct("<I")
+
+
+class ExternalSorter:
+    def __init__(self, max_memory: int, tmp_dir: str, fan_in: int = MERGE_FAN_IN):
+        """Sorts (key, text) records that may not fit in memory. Records are buffered until their
+            estimated size reaches max_memory, then sorted and spilled to a run file in tmp_dir.
+            Runs are k-way merged, in passes of at most fan_in runs, into one sorted stream.
+
+        Args:
+            max_memory (int): Memory budget of the buffered records, in bytes.
+            tmp_dir (str): Directory of the run files, e.g. a TemporaryDirectory. Files are removed once merged.
+            fan_in (int, optional): Maximum number of runs merged at once, i.e. of open run files.
+                Defaults to MERGE_FAN_IN.
+        """
+        self.max_memory = max_memory
+        self.tmp_dir = tmp_dir
+        self.fan_in = max(2, fan_in)
+        self.buffer = []
+        self.buffer_size = 0
+        self.runs = []
+        self.num_spilled_runs = 0
+        self.num_run_files = 0
+
+    def add(self, key: tuple, text: str) -> None:
+        """Add a record. Keys are compared as tuples, and should be distinct.
+        Keys hold values that marshal can write, such as numbers and strings.
+        """
+        self.buffer.append((key, text))
+        self.buffer_size += len(text) + RECORD_OVERHEAD
+        if self.buffer_size >= self.max_memory:
+            self.spill()
+
+    def spill(self) -> None:
+        """Sort the buffered records and write them as a new run"""
+        if not self.buffer:
+            return
+        self.buffer.sort(key=itemgetter(0))
+        self.runs.append(self.write_run(self.buffer))
+        self.num_spilled_runs += 1
+        self.buffer = []
+        self.buffer_size = 0
+
+    def write_run(self, records) -> str:
+        # Records are marshalled one by one, each after its length, so that runs are read
+        # back one record at a time (an Unpickler would keep every record in its memo)
+        run_path = os.path.join(self.tmp_dir, "run{}.bin".format(self.num_run_files))
+        self.num_run_files += 1
+        with open(run_path, "wb") as f:
+            for record in records:
+                data = marshal.dumps(record)
+                f.write(RECORD_HEADER.pack(len(data)))
+                f.write(data)
+        return run_path
+
+    @staticmethod
+    def read_run(run_path: str):
+        with open(run_path, "rb") as f:
+            header = f.read(RECORD_HEADER.size)
+            while header:
+                yield marshal.loads(f.read(RECORD_HEADER.unpack(header)[0]))
+                header = f.read(RECORD_HEADER.size)
+        os.remove(run_path)
+
+    def sorted_records(self):
+        """Records in key order. Records fitting in the budget are sorted in memory only.
+
+        Yields:
+            tuple: (key, text) records.
+        """
+        if not self.runs:
+            self.buffer.sort(key=itemgetter(0))
+            yield from self.buffer
+            self.buffer = []
+            return
+
+        self.spill()
+        # Merge the oldest runs first, so that every run is merged a similar number of times
+        while len(self.runs) > self.fan_in:
+            merged_runs = self.runs[: self.fan_in]
+            self.runs = self.runs[self.fan_in :]
+            self.runs.append(
+                self.write_run(
+                    heapq.merge(
+                        *[self.read_run(run_path) for run_path in merged_runs],
+                        key=itemgetter(0),
+                    )
+                )
+            )
+        yield from heapq.merge(
+            *[self.read_run(run_path) for run_path in self.runs], key=itemgetter(0)
+        )
+        self.runs = []
@@ -0,0 +1,155 @@
+import hashlib
+import os
+
+from .nt_utils import TripleSink, TripleWriter, generate_prefix_map
+from .ttl_utils import emit_ontology
+
+# Predicates whose object is an RDF collection with the semantics of a set
+SET_COLLECTION_PREDICATES = {
+    "<http://www.w3.org/2002/07/owl#unionOf>",
+    "<http://www.w3.org/2002/07/owl#intersectionOf>",
+    "<http://www.w3.org/2002/07/owl#oneOf>",
+}
+
+RDF_FIRST = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#first>"
+RDF_REST = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#rest>"
+RDF_NIL = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#nil>"
+
+# Sidecar file of the fingerprint, written next to the ontology
+FINGERPRINT_FILENAME = "osdu_draft.fingerprint"
+
+
+class FingerprintSink(TripleSink):
+    def __init__(self):
+        """Computes a canonical fingerprint of the ontology from ontology events: the SHA-256 digest
+        of its sorted, distinct triples in a normalized form, so that it only changes with
+        the content of the ontology, not with the order or layout of its output.
+        Terms are expanded to N-Triples form. Each blank node is labelled by a digest of its
+        own triples, computed from the inside out, and an RDF collection with set semantics
+        (e.g. owl:unionOf members) is written as one term listing its members in sorted order.
+        Triples with an empty or undeclared term are left out, as in N-Triples output.
+        """
+        super().__init__()
+        self.writer = None
+        self.lines = set()
+        self.fingerprint = None
+
+    def start(self, open_ont_dict: dict) -> None:
+        self.writer = TripleWriter(generate_prefix_map(open_ont_dict))
+        super().start(open_ont_dict)
+
+    def entity(self, triples: list) -> None:
+        expanded = []
+        for triple in triples:
+            terms = tuple(self.writer.expand(term) for term in triple)
+            if "" not in terms:
+                expanded.append(terms)
+
+        # Triples of each blank node, which are all in the same entity
+        bnode_triples = {}
+        for subject, predicate, obj in expanded:
+            if subject.startswith("_:"):
+                bnode_triples.setdefault(subject, []).append((predicate, obj))
+
+        labels = {}
+        # Nodes of set collections, whose triples are folded into the term of their collection
+        collection_nodes = set()
+
+        def collection_members(node: str) -> list:
+            members = []
+            while node.startswith("_:"):
+                collection_nodes.add(node)
+                links = dict(bnode_triples.get(node, []))
+                if RDF_FIRST not in links:
+                    break
+                members.append(canonical_term(links[RDF_FIRST]))
+                node = links.get(RDF_REST, RDF_NIL)
+            return members
+
+        def canonical_object(predicate: str, obj: str) -> str:
+            if (predicate in SET_COLLECTION_PREDICATES) and (
+                obj.startswith("_:") or obj == RDF_NIL
+            ):
+                return "( " + " ".join(sorted(collection_members(obj))) + " )"
+            return canonical_term(obj)
+
+        def canonical_term(term: str) -> str:
+            if not term.startswith("_:"):
+                return term
+            if term not in labels:
+                # Class expressions nest a few levels deep at most, so recursion is bounded
+                content = sorted(
+                    predicate + " " + canonical_object(predicate, obj)
+                    for predicate, obj in bnode_triples.get(term, [])
+                )
+                labels[term] = (
+                    "_:"
+                    + hashlib.blake2b(
+                        "\n".join(content).encode("utf-8"), digest_size=16
+                    ).hexdigest()
+                )
+            return labels[term]
+
+        canonical_lines = [
+            (
+                subject,
+                canonical_term(subject)
+                + " "
+                + predicate
+                + " "
+                + canonical_object(predicate, obj),
+            )
+            for subject, predicate, obj in expanded
+        ]
+        for subject, line in canonical_lines:
+            if subject not in collection_nodes:
+                self.lines.add(line)
+
+    def finish(self) -> None:
+        digest = hashlib.sha256()
+        for line in sorted(self.lines):
+            digest.update(line.encode("utf-8"))
+            digest.update(b"\n")
+        self.fingerprint = digest.hexdigest()
+        self.lines = set()
+
+
+def compute_fingerprint(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+) -> str:
+    """Canonical fingerprint of the ontology, see FingerprintSink.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest.
+    """
+    sink = FingerprintSink()
+    emit_ontology(
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
+        open_ont_dict,
+        [sink],
+    )
+    return sink.fingerprint
+
+
+def read_fingerprint(filepath: str) -> str:
+    """Fingerprint saved in a sidecar file, or None if there is none"""
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, "r") as f:
+        return f.read().strip()
+
+
+def write_fingerprint(fingerprint: str, filepath: str) -> None:
+    with open(filepath, "w") as f:
+        f.write(fingerprint + "\n")
@@ -0,0 +1,173 @@
+import numpy as np
+from .kg_rep import *
+
+# Inheritance and property graphs of the ontology as sparse adjacency matrices, for analytics.
+# Each graph is saved to an .npz file in the layout of scipy.sparse.save_npz, so that
+# scipy.sparse.load_npz reads its CSR matrix, with extra arrays for its nodes and edge labels:
+#   node_names: name of each node, by node id (row and column of the matrix)
+#   data: number of edges from the row node to the column node, as in a MultiDiGraph
+#   edge_labels: label ids of the edges of each stored entry, in CSR order, data[k] per entry k
+#   label_names: name of each label id, e.g. the property of an edge of the property graph
+# Nodes are numbered in the order networkx adds them in extract_inheritance_graph and
+# extract_property_graph, and the matrices hold the same edges, without building the graphs.
+
+INHERITANCE_GRAPH_FILENAME = "osdu_inheritance_graph.npz"
+PROPERTY_GRAPH_FILENAME = "osdu_property_graph.npz"
+
+
+def inheritance_graph_edges(
+    class_ontology_dict: dict, extract_classname: bool = True
+) -> tuple:
+    """Nodes and edges of the inheritance graph, as built by extract_inheritance_graph: an edge from
+        each superclass to each of its subclasses
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        extract_classname (bool, optional): Extract superclass names from schema filenames. Defaults to True.
+
+    Returns:
+        tuple: (node names, source node ids, target node ids).
+    """
+    node_ids = {class_key: i for i, class_key in enumerate(class_ontology_dict)}
+    sources = []
+    targets = []
+    for class_key, class_rep in class_ontology_dict.items():
+        for superclass_key in class_rep.superclass_list:
+            if extract_classname:
+                superclass_name = extract_classname_from_filename(superclass_key)
+            else:
+                superclass_name = superclass_key
+            sources.append(node_ids.setdefault(superclass_name, len(node_ids)))
+            targets.append(node_ids[class_key])
+    return list(node_ids), sources, targets
+
+
+def property_graph_edges(class_ontology_dict: dict, prop_ontology_dict: dict) -> tuple:
+    """Nodes and labelled edges of the property graph, as built by extract_property_graph: an edge
+        from each domain class to each range of a property, labelled with the property name.
+        Edges with the same ends and label are one edge, as edges with the same key in a MultiDiGraph.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+
+    Returns:
+        tuple: (node names, source node ids, target node ids, label ids, label names).
+    """
+    node_ids = {class_key: i for i, class_key in enumerate(class_ontology_dict)}
+    label_ids = {}
+    edges = {}
+    for prop_rep in prop_ontology_dict.values():
+        label = label_ids.setdefault(prop_rep.name, len(label_ids))
+        for range_name in prop_rep.range:
+            target = node_ids.setdefault(range_name, len(node_ids))
+            for domain_name in prop_rep.domain:
+                source = node_ids.setdefault(domain_name, len(node_ids))
+                edges[(source, target, label)] = None
+
+    sources, targets, labels = zip(*edges) if edges else ((), (), ())
+    return list(node_ids), list(sources), list(targets), list(labels), list(label_ids)
+
+
+def csr_graph_arrays(
+    node_names: list,
+    sources: list,
+    targets: list,
+    labels: list = None,
+    label_names: list = None,
+) -> dict:
+    """Arrays of a graph in the layout of scipy.sparse.save_npz for a CSR matrix, with node and
+        edge label tables, see INHERITANCE_GRAPH_FILENAME
+
+    Args:
+        node_names (list): Name of each node, by node id.
+        sources (list): Source node id of each edge.
+        targets (list): Target node id of each edge.
+        labels (list, optional): Label id of each edge. Defaults to None, for unlabelled edges.
+        label_names (list, optional): Name of each label id. Defaults to None.
+
+    Returns:
+        dict: Arrays, keyed by name.
+    """
+    num_nodes = len(node_names)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+
+    # Sort the edges by source then target, and count the edges between each pair of nodes
+    keys = sources * num_nodes + targets
+    order = np.argsort(keys, kind="stable")
+    entry_keys, counts = np.unique(keys[order], return_counts=True)
+    indptr = np.zeros(num_nodes + 1, dtype=np.int32)
+    np.cumsum(
+        np.bincount(entry_keys // max(num_nodes, 1), minlength=num_nodes),
+        out=indptr[1:],
+    )
+
+    arrays = {
+        "format": np.array(b"csr"),
+        "shape": np.array([num_nodes, num_nodes]),
+        "indptr": indptr,
+        "indices": (entry_keys % max(num_nodes, 1)).astype(np.int32),
+        "data": counts.astype(np.int32),
+        "node_names": np.array(node_names, dtype=str),
+    }
+    if labels is not None:
+        arrays["edge_labels"] = np.asarray(labels, dtype=np.int32)[order]
+        arrays["label_names"] = np.array(label_names, dtype=str)
+    return arrays
+
+
+def export_graphs(
+    class_ontology_dict: dict, prop_ontology_dict: dict, dest_filepath: str
+) -> list:
+    """Save the inheritance and property graphs of the ontology, as used by compute_metrics,
+        to compressed .npz files, see INHERITANCE_GRAPH_FILENAME
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        dest_filepath (str): Destination location of the .npz files.
+
+    Returns:
+        list: Filepaths written.
+    """
+    graphs = [
+        (
+            INHERITANCE_GRAPH_FILENAME,
+            csr_graph_arrays(
+                *inheritance_graph_edges(class_ontology_dict, extract_classname=False)
+            ),
+        ),
+        (
+            PROPERTY_GRAPH_FILENAME,
+            csr_graph_arrays(
+                *property_graph_edges(class_ontology_dict, prop_ontology_dict)
+            ),
+        ),
+    ]
+    filepaths = []
+    for filename, arrays in graphs:
+        np.savez_compressed(dest_filepath + filename, **arrays)
+        filepaths.append(dest_filepath + filename)
+    return filepaths
+
+
+def load_graph(filepath: str) -> tuple:
+    """Read a graph saved by export_graphs. Requires scipy.
+
+    Args:
+        filepath (str): Path to the .npz file.
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix of edge counts, node names, edge label ids in CSR order or None,
+            label names or None).
+    """
+    import scipy.sparse
+
+    with np.load(filepath) as arrays:
+        return (
+            scipy.sparse.load_npz(filepath),
+            arrays["node_names"].tolist(),
+            arrays["edge_labels"] if "edge_labels" in arrays else None,
+            arrays["label_names"].tolist() if "label_names" in arrays else None,
+        )
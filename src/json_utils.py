@@ -1,6 +1,31 @@
 import os
 import json
 import re
+import hashlib
+
+# Decoded schema files, keyed by a digest of the file contents.
+# Shared between every load_schemas call in the process, so that schema files
+# repeated across schema directories (e.g. the abstract/ folder) are only decoded once.
+# Decoded schemas are treated as read-only by the ontology builder.
+_DECODED_SCHEMA_CACHE = {}
+
+
+def load_schema_file(filepath: str) -> dict:
+    """Decode a JSON schema file, reusing the decoded dictionary if a file
+        with the same contents was already loaded in this process.
+
+    Args:
+        filepath (str): filepath to a JSON schema file
+
+    Returns:
+        dict: Decoded JSON schema
+    """
+    with open(filepath, "rb") as fp:
+        data = fp.read()
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    if digest not in _DECODED_SCHEMA_CACHE:
+        _DECODED_SCHEMA_CACHE[digest] = json.loads(data.decode("utf-8"))
+    return _DECODED_SCHEMA_CACHE[digest]
 
 
 def load_schemas(schema_path: str) -> dict:
@@ -29,14 +54,13 @@ def load_schemas(schema_path: str) -> dict:
     list_schema_files(schema_path, file_list)
 
     for schema_file in file_list:
-        with open(schema_file, "r", encoding="utf-8") as fp:
-            a_schema = json.load(fp)
-
-            file_id = a_schema.get("$id")
-            if file_id is None:
-                file_id = a_schema.get("$ID")
-            if file_id is not None:
-                dict_schemas[file_id] = a_schema
+        a_schema = load_schema_file(schema_file)
+
+        file_id = a_schema.get("$id")
+        if file_id is None:
+            file_id = a_schema.get("$ID")
+        if file_id is not None:
+            dict_schemas[file_id] = a_schema
 
     # Resolve latest version
     dict_latest_key = {}
@@ -0,0 +1,197 @@
+import io
+import json
+
+from .kg_rep import *
+from .ttl_utils import TTL_WRITE_BUFFER_SIZE
+from .ttl_utils import emit_ontology
+from .nt_utils import TripleSink, generate_prefix_map
+from .compress_utils import compression_codec, open_compressed
+
+# Prefixes kept in compact form through the @context of JSON-LD output
+JSONLD_CONTEXT_PREFIXES = ["osdu", "owl", "rdfs", "skos", "xsd"]
+
+# Escape sequences of TTL string literals
+TTL_ESCAPE_PATTERN = re.compile(r"\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|[tbnrf\"'\\])")
+TTL_ESCAPES = {
+    "t": "\t",
+    "b": "\b",
+    "n": "\n",
+    "r": "\r",
+    "f": "\f",
+    '"': '"',
+    "'": "'",
+    "\\": "\\",
+}
+
+
+def unescape_ttl_string(text: str) -> str:
+    """Value of the text of a TTL string literal, with its escape sequences replaced"""
+
+    def replace(match):
+        escape = match.group(1)
+        if escape[0] in "uU":
+            return chr(int(escape[1:], 16))
+        return TTL_ESCAPES[escape]
+
+    return TTL_ESCAPE_PATTERN.sub(replace, text)
+
+
+class JsonLdNodeBuilder:
+    def __init__(self, prefix_map: dict):
+        """Builds compacted JSON-LD node objects from the triples of one entity, with terms written
+            as in the TTL file. Blank nodes are embedded in the node referring to them, and
+            owl:unionOf collections become @list values.
+
+        Args:
+            prefix_map (dict): Mapping from prefix to namespace IRI, as returned by generate_prefix_map.
+        """
+        self.prefix_map = prefix_map
+        self.context = {
+            prefix: prefix_map[prefix]
+            for prefix in JSONLD_CONTEXT_PREFIXES
+            if prefix in prefix_map
+        }
+
+    def iri(self, term: str) -> str:
+        """Compact IRI of a term if its namespace is in the context, otherwise its full IRI.
+        Returns '' if the term is empty or its prefix is not declared."""
+        if term.startswith("<"):
+            iri = term[1:-1]
+            for prefix, namespace in self.context.items():
+                if iri.startswith(namespace) and (iri != namespace):
+                    return prefix + ":" + iri[len(namespace) :]
+            return iri
+        prefix, _, local_name = term.partition(":")
+        if (term == "") or (prefix not in self.prefix_map):
+            return ""
+        if prefix in self.context:
+            return term
+        return self.prefix_map[prefix] + local_name
+
+    def value(self, term: str, subjects: dict):
+        if term.startswith("_:"):
+            return self.node(term, subjects)
+        if term.startswith('"'):
+            split_idx = term.rfind('"^^')
+            if split_idx > 0:
+                datatype = self.iri(term[split_idx + 3 :])
+                if datatype == "":
+                    return None
+                return {
+                    "@value": unescape_ttl_string(term[1:split_idx]),
+                    "@type": datatype,
+                }
+            return unescape_ttl_string(term[1:-1])
+        iri = self.iri(term)
+        return {"@id": iri} if iri != "" else None
+
+    def collection(self, term: str, subjects: dict) -> dict:
+        members = []
+        while term != "rdf:nil":
+            predicates = subjects.get(term, {})
+            members += [
+                member
+                for member in (
+                    self.value(obj, subjects) for obj in predicates.get("rdf:first", [])
+                )
+                if member is not None
+            ]
+            term = predicates.get("rdf:rest", ["rdf:nil"])[0]
+        return {"@list": members}
+
+    def node(self, subject: str, subjects: dict) -> dict:
+        node = {} if subject.startswith("_:") else {"@id": self.iri(subject)}
+        for predicate, objs in subjects[subject].items():
+            if predicate == "rdf:type":
+                node["@type"] = [self.iri(obj) for obj in objs if self.iri(obj) != ""]
+                continue
+            key = self.iri(predicate)
+            if key == "":
+                continue
+            if predicate == "owl:unionOf":
+                values = [self.collection(obj, subjects) for obj in objs]
+            else:
+                values = [self.value(obj, subjects) for obj in objs]
+            values = [value for value in values if value is not None]
+            if values:
+                node[key] = values
+        if len(node.get("@type", [])) == 1:
+            node["@type"] = node["@type"][0]
+        return node
+
+    def entity_nodes(self, triples: list) -> list:
+        """Node objects of the named subjects of an entity's triples, in order of first appearance"""
+        subjects = {}
+        for subject, predicate, obj in triples:
+            subjects.setdefault(subject, {}).setdefault(predicate, []).append(obj)
+        return [
+            self.node(subject, subjects)
+            for subject in subjects
+            if (not subject.startswith("_:")) and (self.iri(subject) != "")
+        ]
+
+
+class JsonLdSink(TripleSink):
+    def __init__(self, filepath: str, compress_level: int = None):
+        """Streams ontology events as a JSON-LD document with a compact @context and one @graph node
+            per class and property, each written as it is built. Blank nodes are embedded in their node.
+            A filepath ending in .gz, .xz or .zst is compressed as the document is written.
+
+        Args:
+            filepath (str): Filepath of the JSON-LD file.
+            compress_level (int, optional): Compression level, see open_compressed. Defaults to None.
+        """
+        super().__init__()
+        self.filepath = filepath
+        self.compress_level = compress_level
+        self.builder = None
+        self.file = None
+        self.separator = "\n"
+
+    def start(self, open_ont_dict: dict) -> None:
+        self.builder = JsonLdNodeBuilder(generate_prefix_map(open_ont_dict))
+        if compression_codec(self.filepath) is None:
+            stream = open(self.filepath, "wb", buffering=TTL_WRITE_BUFFER_SIZE)
+        else:
+            stream = open_compressed(self.filepath, "wb", self.compress_level)
+        self.file = io.TextIOWrapper(stream, encoding="utf-8", newline="\n")
+        self.file.write(
+            '{"@context": ' + json.dumps(self.builder.context) + ',\n"@graph": ['
+        )
+        super().start(open_ont_dict)
+
+    def entity(self, triples: list) -> None:
+        for node in self.builder.entity_nodes(triples):
+            self.file.write(self.separator + json.dumps(node, ensure_ascii=False))
+            self.separator = ",\n"
+
+    def finish(self) -> None:
+        self.file.write("\n]}\n")
+        self.file.close()
+
+
+def write_jsonld(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    filepath: str,
+    compress_level: int = None,
+) -> None:
+    """Stream the ontology as a JSON-LD document, see JsonLdSink
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        filepath (str): Filepath of the JSON-LD file, compressed if it ends in .gz, .xz or .zst.
+        compress_level (int, optional): Compression level, see open_compressed. Defaults to None.
+    """
+    emit_ontology(
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
+        open_ont_dict,
+        [JsonLdSink(filepath, compress_level=compress_level)],
+    )
@@ -1,5 +1,6 @@
 import regex as re
 from enum import Enum
+from functools import lru_cache
 from .str_utils import *
 import numpy as np
 
@@ -21,6 +22,7 @@ literals_dict = {
 }
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def process_range(name: str) -> str:
     if name in literals_dict:
         return name
@@ -207,6 +209,9 @@ class ClassRep:
 
         self.array_props = []
 
+        # Structurally equivalent classes, linked with owl:equivalentClass
+        self.equivalent_list = []
+
     def add_comment(self, comment: str):
         """Process and add a comment if it is not already associated with the class
         Args:
@@ -228,6 +233,14 @@ class ClassRep:
     def add_sameas_link(self, identifier):
         self.sameas.append(identifier)
 
+    def add_equivalent_class(self, class_name: str) -> None:
+        """Add a class declared equivalent to the current one, if not already listed
+        Args:
+            class_name (str): string name referencing an OSDU class
+        """
+        if (class_name != self.name) and (class_name not in self.equivalent_list):
+            self.equivalent_list.append(class_name)
+
     def add_superclass(self, superclass: str, process_name_flag=True) -> None:
         """Add a class which is inherited by the current one, if not already listed
         Args:
@@ -310,6 +323,137 @@ class ClassRep:
         self.array_props.append(array_prop)
 
 
+class RestrictionStore:
+    def __init__(self):
+        """Indexed store of the cardinality restrictions placed on OSDU classes.
+        Restrictions are keyed by class name, then by (property name, onClass),
+        so a repeated restriction is merged into the existing one instead of being emitted twice.
+        When merging, the strongest bounds are kept: the largest minimum and the smallest maximum.
+        A restriction whose minimum ends up above its maximum makes its class unsatisfiable,
+        and is reported when added.
+
+        Each restriction is a dictionary with key "prop_name", optional key "on_class" for
+        qualified cardinality restrictions, and one or both of "min_card" and "max_card".
+        The store can be read like a dictionary mapping class names to lists of restrictions.
+        """
+        self._index = {}
+
+    def add_restriction(
+        self,
+        class_name: str,
+        prop_name: str,
+        on_class: str = "",
+        min_card: int = None,
+        max_card: int = None,
+    ) -> None:
+        """Add a restriction, or tighten the bounds of an existing restriction on the same property and onClass.
+            WARNING: given names will not be formatted.
+
+        Args:
+            class_name (str): Name of the restricted OSDU class.
+            prop_name (str): Name of the restricted property.
+            on_class (str, optional): Class or literal type for a qualified restriction. Defaults to ''.
+            min_card (int, optional): Minimum cardinality. Defaults to None, for no minimum.
+            max_card (int, optional): Maximum cardinality. Defaults to None, for no maximum.
+        """
+        if (min_card is None) and (max_card is None):
+            return
+
+        class_restrictions = self._index.setdefault(class_name, {})
+        key = (prop_name, on_class)
+        if key not in class_restrictions:
+            rest_prop = {"prop_name": prop_name}
+            if on_class != "":
+                rest_prop["on_class"] = on_class
+            class_restrictions[key] = rest_prop
+        rest_prop = class_restrictions[key]
+        was_conflicting = self.is_conflicting(rest_prop)
+
+        if min_card is not None:
+            rest_prop["min_card"] = max(min_card, rest_prop.get("min_card", min_card))
+        if max_card is not None:
+            rest_prop["max_card"] = min(max_card, rest_prop.get("max_card", max_card))
+
+        if self.is_conflicting(rest_prop) and not was_conflicting:
+            restricted = class_name + "." + prop_name
+            if on_class != "":
+                restricted += " onClass " + on_class
+            print(
+                "Conflicting cardinality restrictions on",
+                restricted,
+                "- minimum",
+                rest_prop["min_card"],
+                "is above maximum",
+                rest_prop["max_card"],
+            )
+
+    @staticmethod
+    def is_conflicting(rest_prop: dict) -> bool:
+        """Whether the minimum of a restriction is above its maximum, so that no instance satisfies it"""
+        return (
+            ("min_card" in rest_prop)
+            and ("max_card" in rest_prop)
+            and (rest_prop["min_card"] > rest_prop["max_card"])
+        )
+
+    def rename_class(self, old_name: str, new_name: str) -> None:
+        """Move the restrictions of a class to a new class name, merging them with any
+        restrictions already held by the new name.
+        """
+        if old_name not in self._index:
+            return
+        for rest_prop in self._index.pop(old_name).values():
+            self.add_restriction(
+                new_name,
+                rest_prop["prop_name"],
+                on_class=rest_prop.get("on_class", ""),
+                min_card=rest_prop.get("min_card"),
+                max_card=rest_prop.get("max_card"),
+            )
+
+    def rename_on_class(self, class_name: str, old_name: str, new_name: str) -> None:
+        """Point the qualified restrictions of a class on old_name to new_name instead"""
+        class_restrictions = self._index.get(class_name, {})
+        for prop_name, on_class in list(class_restrictions.keys()):
+            if on_class == old_name:
+                rest_prop = class_restrictions.pop((prop_name, on_class))
+                self.add_restriction(
+                    class_name,
+                    prop_name,
+                    on_class=new_name,
+                    min_card=rest_prop.get("min_card"),
+                    max_card=rest_prop.get("max_card"),
+                )
+
+    def get(self, class_name: str, default=None) -> list:
+        if class_name in self._index:
+            return list(self._index[class_name].values())
+        return default
+
+    def pop(self, class_name: str, default=None) -> list:
+        if class_name in self._index:
+            return list(self._index.pop(class_name).values())
+        return default
+
+    def keys(self):
+        return self._index.keys()
+
+    def items(self):
+        return [(class_name, self[class_name]) for class_name in self._index]
+
+    def __getitem__(self, class_name: str) -> list:
+        return list(self._index[class_name].values())
+
+    def __contains__(self, class_name: str) -> bool:
+        return class_name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
 def add_property_from_parameters(
     property_name: str,
     domain_name: str,
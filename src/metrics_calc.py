@@ -1,6 +1,7 @@
 import numpy as np
 import networkx as nx
 from .kg_rep import *
+from .ttl_utils import OntologySink
 
 import typing
 from typing import Any, Dict, List, Optional, Tuple
@@ -81,6 +82,81 @@ def compute_metrics(class_ontology_dict: dict, prop_ontology_dict: dict) -> dict
     }
 
 
+class StatsSink(OntologySink):
+    def __init__(self):
+        """Counts the classes, properties and axioms of the ontology from ontology events,
+        so that they are reported from the traversal writing the output files.
+        Counts are in self.stats, keyed by description.
+        """
+        self.stats = {
+            "Classes written": 0,
+            "Object properties written": 0,
+            "Datatype properties written": 0,
+            "Labels": 0,
+            "Comments": 0,
+            "Subclass links": 0,
+            "Cardinality restrictions": 0,
+            "Qualified cardinality restrictions": 0,
+            "sameAs links": 0,
+            "Equivalent class links": 0,
+            "Union domains": 0,
+            "Union ranges": 0,
+            "Patterns": 0,
+            "Unresolved class references": 0,
+        }
+
+    def count_refs(self, class_refs: list) -> None:
+        self.stats["Unresolved class references"] += class_refs.count("")
+
+    def class_start(self, class_key: str, class_name: str) -> None:
+        self.stats["Classes written"] += 1
+
+    def pref_label(self, label: str) -> None:
+        self.stats["Labels"] += 1
+
+    def comment(self, text: str) -> None:
+        self.stats["Comments"] += 1
+
+    def superclass(self, class_ref: str) -> None:
+        self.stats["Subclass links"] += 1
+        self.count_refs([class_ref])
+
+    def restriction(
+        self, prop_ref: str, bound: str, cardinality, on_class_ref: str
+    ) -> None:
+        if on_class_ref is None:
+            self.stats["Cardinality restrictions"] += 1
+        else:
+            self.stats["Qualified cardinality restrictions"] += 1
+            self.count_refs([on_class_ref])
+
+    def sameas(self, link: str) -> None:
+        self.stats["sameAs links"] += 1
+
+    def equivalent_class(self, class_ref: str) -> None:
+        self.stats["Equivalent class links"] += 1
+        self.count_refs([class_ref])
+
+    def property_start(
+        self, prop_key: str, prop_name: str, prop_type: PropType
+    ) -> None:
+        if prop_type == PropType.Object:
+            self.stats["Object properties written"] += 1
+        else:
+            self.stats["Datatype properties written"] += 1
+
+    def property_domain(self, class_refs: list) -> None:
+        self.stats["Union domains"] += len(class_refs) > 1
+        self.count_refs(class_refs)
+
+    def pattern(self, text: str) -> None:
+        self.stats["Patterns"] += 1
+
+    def property_range(self, class_refs: list) -> None:
+        self.stats["Union ranges"] += len(class_refs) > 1
+        self.count_refs(class_refs)
+
+
 def extract_inheritance_graph(
     class_ontology_dict: dict, prop_ontology_dict: dict, extract_classname: bool = True
 ) -> nx.MultiDiGraph:
@@ -134,7 +210,7 @@ def calc_adit_ln_metrics(
         float: value for ADIT-LN
         int: value for NOL
     """
-    leaf_class_list = list(class_ontology_dict.keys())
+    removed_leaf_set = set()
     root_class_list = []
 
     for class_key, class_rep in class_ontology_dict.items():
@@ -153,12 +229,13 @@ def calc_adit_ln_metrics(
             root_class_list.append(class_key)
         else:
             for superclass_key in class_rep.superclass_list:
-                superclass_name = superclass_key
-
-                if (superclass_name not in literals_dict) and (
-                    superclass_name in leaf_class_list
-                ):
-                    leaf_class_list.remove(superclass_name)
+                if superclass_key not in literals_dict:
+                    removed_leaf_set.add(superclass_key)
+    leaf_class_list = [
+        class_key
+        for class_key in class_ontology_dict
+        if class_key not in removed_leaf_set
+    ]
 
     noc = len(root_class_list)
     nol = len(leaf_class_list)
@@ -166,6 +243,73 @@ def calc_adit_ln_metrics(
     num_paths_matrix = np.zeros((noc, nol)) + 1e-10
     path_lengths_matrix = np.zeros((noc, nol))
 
+    path_counts = count_root_leaf_paths(inheritance_g, root_class_list, leaf_class_list)
+    for (i, j), (num_paths, path_length_sum) in path_counts.items():
+        num_paths_matrix[i, j] = num_paths
+        path_lengths_matrix[i, j] = path_length_sum
+    num_paths = np.sum(num_paths_matrix)
+    adit_ln = np.sum(path_lengths_matrix) / (num_paths + 1e-8)
+    return adit_ln, nol
+
+
+def count_root_leaf_paths(
+    inheritance_g: nx.MultiDiGraph, root_class_list: list, leaf_class_list: list
+) -> dict:
+    """Count the paths of at least one edge from each root class to each leaf class, and sum their
+        lengths in nodes, as used by ADIT-LN. Parallel edges give distinct paths, as in nx.all_simple_paths.
+        On an acyclic graph, both are computed for each root by dynamic programming over the graph
+        in topological order, in time linear in its size, with exact integers. On a graph with cycles,
+        the simple paths between each root and leaf are enumerated instead.
+    Args:
+        inheritance_g (nx.MultiDiGraph): Inheritance graph of the ontology, with edges pointing from superclass source to subclass target
+        root_class_list (list): Root class names.
+        leaf_class_list (list): Leaf class names.
+    Returns:
+        dict: Mapping from (root index, leaf index) to (number of paths, sum of path lengths),
+            for each root and leaf with at least one path between them.
+    """
+    try:
+        topological_order = list(nx.topological_sort(inheritance_g))
+    except nx.NetworkXUnfeasible:
+        return enumerate_root_leaf_paths(
+            inheritance_g, root_class_list, leaf_class_list
+        )
+    position = {node: k for k, node in enumerate(topological_order)}
+    leaf_index = {leaf_class: j for j, leaf_class in enumerate(leaf_class_list)}
+
+    path_counts = {}
+    for i, root_class in enumerate(root_class_list):
+        # Number of paths from the root to each node, and sum of their lengths in nodes
+        num_paths = {root_class: 1}
+        length_sums = {root_class: 1}
+        for node in topological_order[position[root_class] :]:
+            if node not in num_paths:
+                continue
+            node_paths = num_paths[node]
+            node_length_sum = length_sums[node]
+            for subclass, edges in inheritance_g.succ[node].items():
+                num_edges = len(edges)
+                num_paths[subclass] = (
+                    num_paths.get(subclass, 0) + num_edges * node_paths
+                )
+                length_sums[subclass] = length_sums.get(subclass, 0) + num_edges * (
+                    node_length_sum + node_paths
+                )
+
+        for node, node_paths in num_paths.items():
+            if (node != root_class) and (node in leaf_index):
+                path_counts[(i, leaf_index[node])] = (node_paths, length_sums[node])
+    return path_counts
+
+
+def enumerate_root_leaf_paths(
+    inheritance_g: nx.MultiDiGraph, root_class_list: list, leaf_class_list: list
+) -> dict:
+    """Count the simple paths of at least one edge from each root class to each leaf class, and sum
+    their lengths in nodes, by enumerating them. Takes time exponential in the number of multiple
+    inheritance diamonds, see count_root_leaf_paths.
+    """
+    path_counts = {}
     for i, root_class in enumerate(root_class_list):
         for j, leaf_class in enumerate(leaf_class_list):
             if nx.has_path(inheritance_g, source=root_class, target=leaf_class):
@@ -173,17 +317,13 @@ def calc_adit_ln_metrics(
                 paths_gen = nx.all_simple_paths(
                     inheritance_g, source=root_class, target=leaf_class
                 )
-                comp_paths = list(paths_gen)
-                paths = [path for path in comp_paths if len(path) != 1]
-
-                num_paths = len(paths)
-                num_paths_matrix[i, j] = num_paths if num_paths != 0 else 1e-10
-
-                path_lengths = [len(path) for path in paths] if paths != [] else [0]
-                path_lengths_matrix[i, j] = sum(path_lengths)
-    num_paths = np.sum(num_paths_matrix)
-    adit_ln = np.sum(path_lengths_matrix) / (num_paths + 1e-8)
-    return adit_ln, nol
+                paths = [path for path in paths_gen if len(path) != 1]
+                if paths:
+                    path_counts[(i, j)] = (
+                        len(paths),
+                        sum(len(path) for path in paths),
+                    )
+    return path_counts
 
 
 def calc_shortest_path_metrics(ont_graph: nx.MultiDiGraph) -> tuple[float, float, int]:
@@ -0,0 +1,134 @@
+import copy
+
+from .kg_rep import *
+from .ref_index import ReferenceIndex
+
+
+def module_closure(
+    seed_classes: list,
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: RestrictionStore,
+    index: ReferenceIndex = None,
+) -> tuple:
+    """Find the classes and properties needed to describe a set of seed classes, with one traversal
+        from the seeds. A class in the module brings in:
+            its superclasses,
+            the properties with the class in their domain, and the classes in their ranges,
+            and the properties and onClass targets of its restrictions.
+        Properties with a module class in their range only are not followed, as that would
+        bring in most of the ontology through shared types.
+
+    Args:
+        seed_classes (list): Names of the OSDU classes to extract.
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes.
+        index (ReferenceIndex, optional): Index of the dictionaries, to reuse between extractions.
+            Defaults to None, to build a new index.
+
+    Returns:
+        tuple: (list of class names, list of property names) in the module, in traversal order.
+    """
+    if index is None:
+        index = ReferenceIndex(
+            class_ontology_dict, prop_ontology_dict, array_properties_dict
+        )
+
+    module_classes = {}
+    module_props = {}
+    stack = []
+
+    def visit_class(class_name):
+        if (class_name in class_ontology_dict) and (class_name not in module_classes):
+            module_classes[class_name] = None
+            stack.append(class_name)
+
+    def visit_prop(prop_name):
+        if (prop_name in prop_ontology_dict) and (prop_name not in module_props):
+            module_props[prop_name] = None
+            for range_name in prop_ontology_dict[prop_name].range:
+                visit_class(range_name)
+
+    for class_name in seed_classes:
+        if class_name not in class_ontology_dict:
+            print("Seed class not in ontology:", class_name)
+        visit_class(class_name)
+
+    while stack:
+        class_name = stack.pop()
+        for superclass in class_ontology_dict[class_name].superclass_list:
+            visit_class(superclass)
+        for prop_name in index.domain_refs.get(class_name, ()):
+            visit_prop(prop_name)
+        for rest_prop in array_properties_dict.get(class_name, []):
+            visit_prop(rest_prop["prop_name"])
+            if "on_class" in rest_prop:
+                visit_class(rest_prop["on_class"])
+
+    return list(module_classes), list(module_props)
+
+
+def extract_module(
+    seed_classes: list,
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: RestrictionStore,
+    index: ReferenceIndex = None,
+) -> tuple:
+    """Extract a self-contained sub-ontology for a set of seed classes, as found by module_closure.
+        Classes and properties are copied, and their links to classes outside the module
+        (subclasses, equivalent classes and property domains) are left out, so that the module
+        only refers to classes it declares. The original dictionaries are not changed.
+
+    Args:
+        seed_classes (list): Names of the OSDU classes to extract.
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes.
+        index (ReferenceIndex, optional): Index of the dictionaries, to reuse between extractions.
+            Defaults to None, to build a new index.
+
+    Returns:
+        tuple: (class dictionary, property dictionary, RestrictionStore) of the module.
+    """
+    class_names, prop_names = module_closure(
+        seed_classes,
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
+        index,
+    )
+    module_class_set = set(class_names)
+
+    module_class_dict = {}
+    for class_name in class_names:
+        class_rep = copy.copy(class_ontology_dict[class_name])
+        class_rep.superclass_list = class_rep.superclass_list.copy()
+        class_rep.subclass_list = [
+            name for name in class_rep.subclass_list if name in module_class_set
+        ]
+        class_rep.equivalent_list = [
+            name for name in class_rep.equivalent_list if name in module_class_set
+        ]
+        module_class_dict[class_name] = class_rep
+
+    module_prop_dict = {}
+    for prop_name in prop_names:
+        prop_rep = copy.copy(prop_ontology_dict[prop_name])
+        prop_rep.domain = [name for name in prop_rep.domain if name in module_class_set]
+        prop_rep.range = prop_rep.range.copy()
+        module_prop_dict[prop_name] = prop_rep
+
+    module_array_properties_dict = RestrictionStore()
+    for class_name in class_names:
+        for rest_prop in array_properties_dict.get(class_name, []):
+            module_array_properties_dict.add_restriction(
+                class_name,
+                rest_prop["prop_name"],
+                on_class=rest_prop.get("on_class", ""),
+                min_card=rest_prop.get("min_card"),
+                max_card=rest_prop.get("max_card"),
+            )
+
+    return module_class_dict, module_prop_dict, module_array_properties_dict
@@ -0,0 +1,339 @@
+import hashlib
+
+from .kg_rep import *
+from .ttl_utils import (
+    TTL_WRITE_BUFFER_SIZE,
+    prefix_lines,
+    generate_open_ont_prefix_lines,
+    add_prefix,
+    OntologySink,
+    emit_ontology,
+)
+from .compress_utils import open_output
+
+# IRI of the ontology, and default graph name of N-Quads output
+ONTOLOGY_IRI = "https://w3id.org/osdu#"
+
+# Triples of the annotation and ontology header of the TTL file, as prefixed names or literals
+HEADER_TRIPLES = [
+    ("dc:creator", "rdf:type", "owl:AnnotationProperty"),
+    ("dc:title", "rdf:type", "owl:AnnotationProperty"),
+    ("xsd:pattern", "rdf:type", "owl:AnnotationProperty"),
+    ("owl:minCardinality", "rdf:type", "owl:AnnotationProperty"),
+    ("<" + ONTOLOGY_IRI + ">", "rdf:type", "owl:Ontology"),
+    ("<" + ONTOLOGY_IRI + ">", "dc:creator", '"Neda Abolhassani, Ph.D."^^xsd:string'),
+    ("<" + ONTOLOGY_IRI + ">", "dc:creator", '"Ana Tudor, M.S."^^xsd:string'),
+    ("<" + ONTOLOGY_IRI + ">", "dc:title", '"OSDU Ontology"^^xsd:string'),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "rdf:"),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "rdfs:"),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "xsd:"),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "owl:"),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "skos:"),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "time:"),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "<http://www.w3.org/XML/1998/namespace>"),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "<http://www.w3.org/ns/auth/acl>"),
+    ("<" + ONTOLOGY_IRI + ">", "owl:imports", "foaf:"),
+    (
+        "<" + ONTOLOGY_IRI + ">",
+        "owl:imports",
+        "<https://www.geonames.org/ontology/ontology_v3.3.rdf>",
+    ),
+    ("<" + ONTOLOGY_IRI + ">", "owl:versionInfo", '"Version 1.0"'),
+]
+
+
+def generate_prefix_map(open_ont_dict: dict) -> dict:
+    """Namespaces of the prefixes declared in the header of the TTL file
+
+    Args:
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+
+    Returns:
+        dict: Mapping from prefix to namespace IRI.
+    """
+    declarations = prefix_lines + generate_open_ont_prefix_lines(open_ont_dict)
+    return dict(re.findall(r"@prefix\s*(\w*):\s*<([^>]*)>", declarations))
+
+
+class TripleWriter:
+    def __init__(self, prefix_map: dict, graph: str = None):
+        """Formats N-Triples lines, or N-Quads lines if a graph IRI is given, from terms written
+            as in the TTL file: prefixed names, <IRIs>, _:blank nodes, or "literals" with an
+            optional prefixed datatype. Literal text is kept as is, since it is escaped for TTL.
+
+        Args:
+            prefix_map (dict): Mapping from prefix to namespace IRI, as returned by generate_prefix_map.
+            graph (str, optional): IRI of the graph of each quad. Defaults to None, for triples.
+        """
+        self.prefix_map = prefix_map
+        self.line_end = " .\n" if graph is None else " <" + graph + "> .\n"
+
+    def expand(self, term: str) -> str:
+        """Expand a term to its N-Triples form, or return '' if it is empty or its prefix is not declared"""
+        if term == "":
+            return ""
+        if term.startswith(("<", "_:")):
+            return term
+        if term.startswith('"'):
+            split_idx = term.rfind('"^^')
+            if split_idx > 0:
+                datatype = self.expand(term[split_idx + 3 :])
+                return term[: split_idx + 3] + datatype if datatype != "" else ""
+            return term
+        prefix, _, local_name = term.partition(":")
+        if prefix not in self.prefix_map:
+            return ""
+        return "<" + self.prefix_map[prefix] + local_name + ">"
+
+    def line(self, subject: str, predicate: str, obj: str) -> str:
+        terms = [self.expand(term) for term in (subject, predicate, obj)]
+        if "" in terms:
+            return ""
+        return " ".join(terms) + self.line_end
+
+
+def blank_node_prefix(kind: str, key: str) -> str:
+    """Blank node label prefix of a class or property, stable across runs and shards"""
+    return "_:" + kind + hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def union_triples(subject: str, predicate: str, members: list, bnode: str) -> list:
+    """Triples of an owl:unionOf class expression over a list of members, as an RDF collection"""
+    triples = [
+        (subject, predicate, bnode),
+        (bnode, "rdf:type", "owl:Class"),
+    ]
+    members = [member for member in members if member != ""]
+    node = bnode + "l0"
+    triples.append((bnode, "owl:unionOf", node if members else "rdf:nil"))
+    for i, member in enumerate(members):
+        next_node = bnode + "l" + str(i + 1) if (i + 1 < len(members)) else "rdf:nil"
+        triples.append((node, "rdf:first", member))
+        triples.append((node, "rdf:rest", next_node))
+        node = next_node
+    return triples
+
+
+class TripleSink(OntologySink):
+    def __init__(self):
+        """Builds the triples of each entity of the ontology (the header, each class, each property)
+        from ontology events, with terms written as in the TTL file, and passes them to
+        self.entity. All triples of a blank node are in the same entity.
+        """
+        self.triples = []
+        self.subject = ""
+        self.bnode_prefix = ""
+        self.num_restrictions = 0
+
+    def entity(self, triples: list) -> None:
+        """Consume the (subject, predicate, object) triples of one entity"""
+        pass
+
+    def start(self, open_ont_dict: dict) -> None:
+        self.entity(HEADER_TRIPLES)
+
+    def start_entity(self, subject: str, bnode_prefix: str, rdf_type: str) -> None:
+        self.subject = subject
+        self.bnode_prefix = bnode_prefix
+        self.num_restrictions = 0
+        self.triples = [(subject, "rdf:type", rdf_type)]
+
+    def class_start(self, class_key: str, class_name: str) -> None:
+        self.start_entity(
+            add_prefix(class_name), blank_node_prefix("c", class_key), "owl:Class"
+        )
+
+    def pref_label(self, label: str) -> None:
+        self.triples.append((self.subject, "skos:prefLabel", '"' + label + '"'))
+
+    def comment(self, text: str) -> None:
+        self.triples.append((self.subject, "rdfs:comment", '"' + text + ' "'))
+
+    def superclass(self, class_ref: str) -> None:
+        self.triples.append((self.subject, "rdfs:subClassOf", class_ref))
+
+    def restriction(
+        self, prop_ref: str, bound: str, cardinality, on_class_ref: str
+    ) -> None:
+        restriction = self.bnode_prefix + "r" + str(self.num_restrictions)
+        self.num_restrictions += 1
+        cardinality = '"{}"^^xsd:nonNegativeInteger'.format(cardinality)
+        self.triples.append((self.subject, "rdfs:subClassOf", restriction))
+        self.triples.append((restriction, "rdf:type", "owl:Restriction"))
+        self.triples.append((restriction, "owl:onProperty", prop_ref))
+        if on_class_ref is not None:
+            self.triples.append(
+                (restriction, "owl:" + bound + "QualifiedCardinality", cardinality)
+            )
+            self.triples.append((restriction, "owl:onClass", on_class_ref))
+        else:
+            self.triples.append(
+                (restriction, "owl:" + bound + "Cardinality", cardinality)
+            )
+
+    def sameas(self, link: str) -> None:
+        self.triples.append((self.subject, "owl:sameAs", link))
+
+    def equivalent_class(self, class_ref: str) -> None:
+        self.triples.append((self.subject, "owl:equivalentClass", class_ref))
+
+    def class_end(self) -> None:
+        self.entity(self.triples)
+
+    def property_start(
+        self, prop_key: str, prop_name: str, prop_type: PropType
+    ) -> None:
+        self.start_entity(
+            add_prefix(prop_name), blank_node_prefix("p", prop_key), prop_type.value
+        )
+
+    def property_domain(self, class_refs: list) -> None:
+        if len(class_refs) > 1:
+            self.triples += union_triples(
+                self.subject, "rdfs:domain", class_refs, self.bnode_prefix + "d"
+            )
+        else:
+            self.triples.append((self.subject, "rdfs:domain", class_refs[0]))
+
+    def pattern(self, text: str) -> None:
+        self.triples.append((self.subject, "rdfs:pattern", '"' + text + '"'))
+
+    def property_range(self, class_refs: list) -> None:
+        if len(class_refs) > 1:
+            self.triples += union_triples(
+                self.subject, "rdfs:range", class_refs, self.bnode_prefix + "r"
+            )
+        else:
+            self.triples.append((self.subject, "rdfs:range", class_refs[0]))
+
+    def property_end(self) -> None:
+        self.entity(self.triples)
+
+
+class NTriplesSink(TripleSink):
+    def __init__(
+        self,
+        filepath_stem: str,
+        num_entities: int,
+        output_format: str = "nt",
+        num_shards: int = 1,
+        graph: str = ONTOLOGY_IRI,
+        compress_suffix: str = "",
+        compress_level: int = None,
+    ):
+        """Streams ontology events to N-Triples or N-Quads files, one triple per line.
+            With several shards, entities are split into contiguous runs of about equal length,
+            one per file, so that every blank node stays within one file and each shard can be
+            loaded on its own. Triples with an empty or undeclared term, which have no valid
+            TTL form either, are left out.
+
+        Args:
+            filepath_stem (str): Filepath of the output without extension, e.g. 'out/osdu_draft'.
+            num_entities (int): Number of entities of the ontology: one for the header, plus the
+                number of classes and properties.
+            output_format (str, optional): 'nt' for N-Triples, or 'nq' for N-Quads. Defaults to 'nt'.
+            num_shards (int, optional): Number of files to split the output into. Defaults to 1.
+            graph (str, optional): Graph IRI of N-Quads output. Defaults to ONTOLOGY_IRI.
+            compress_suffix (str, optional): Extension of a compression codec appended to each filepath,
+                '.gz', '.xz' or '.zst'. Defaults to '', for uncompressed files.
+            compress_level (int, optional): Compression level, see open_compressed. Defaults to None.
+        """
+        super().__init__()
+        self.graph = graph if output_format == "nq" else None
+        self.num_entities = num_entities
+        self.num_shards = max(1, min(num_shards, num_entities))
+        self.filepaths = [
+            (
+                filepath_stem + "." + output_format + compress_suffix
+                if self.num_shards == 1
+                else "{}.{}.{}{}".format(
+                    filepath_stem, shard, output_format, compress_suffix
+                )
+            )
+            for shard in range(self.num_shards)
+        ]
+        self.compress_level = compress_level
+        self.writer = None
+        self.file = None
+        self.shard = -1
+        self.shard_end = 0
+        self.entity_idx = 0
+
+    def next_shard(self) -> None:
+        if self.file is not None:
+            self.file.close()
+        self.shard += 1
+        self.shard_end = (self.shard + 1) * self.num_entities // self.num_shards
+        self.file = open_output(
+            self.filepaths[self.shard],
+            self.compress_level,
+            encoding="utf-8",
+            buffering=TTL_WRITE_BUFFER_SIZE,
+        )
+
+    def start(self, open_ont_dict: dict) -> None:
+        self.writer = TripleWriter(generate_prefix_map(open_ont_dict), self.graph)
+        super().start(open_ont_dict)
+
+    def entity(self, triples: list) -> None:
+        while (self.entity_idx >= self.shard_end) and (
+            self.shard + 1 < self.num_shards
+        ):
+            self.next_shard()
+        self.file.write("".join(self.writer.line(*triple) for triple in triples))
+        self.entity_idx += 1
+
+    def finish(self) -> None:
+        while self.shard + 1 < self.num_shards:
+            self.next_shard()
+        self.file.close()
+        self.file = None
+
+
+def write_ntriples(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    filepath_stem: str,
+    output_format: str = "nt",
+    num_shards: int = 1,
+    graph: str = ONTOLOGY_IRI,
+    compress_suffix: str = "",
+    compress_level: int = None,
+) -> list:
+    """Stream the ontology to N-Triples or N-Quads files, one triple per line, see NTriplesSink.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        filepath_stem (str): Filepath of the output without extension, e.g. 'out/osdu_draft'.
+        output_format (str, optional): 'nt' for N-Triples, or 'nq' for N-Quads. Defaults to 'nt'.
+        num_shards (int, optional): Number of files to split the output into. Defaults to 1.
+        graph (str, optional): Graph IRI of N-Quads output. Defaults to ONTOLOGY_IRI.
+        compress_suffix (str, optional): Extension of a compression codec appended to each filepath,
+            '.gz', '.xz' or '.zst'. Defaults to '', for uncompressed files.
+        compress_level (int, optional): Compression level, see open_compressed. Defaults to None.
+
+    Returns:
+        list: Filepaths written, as filepath_stem + '.nt', or filepath_stem + '.<shard>.nt' for shards.
+    """
+    sink = NTriplesSink(
+        filepath_stem,
+        1 + len(class_ontology_dict) + len(prop_ontology_dict),
+        output_format=output_format,
+        num_shards=num_shards,
+        graph=graph,
+        compress_suffix=compress_suffix,
+        compress_level=compress_level,
+    )
+    emit_ontology(
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
+        open_ont_dict,
+        [sink],
+    )
+    return sink.filepaths
@@ -0,0 +1,401 @@
+from .kg_rep import *
+from .nt_utils import TripleSink, TripleWriter, generate_prefix_map
+from .ttl_utils import emit_ontology, join_lines
+from .shared_ont import SharedOntologyView
+
+# Packed ontology of a build, written by --snapshot, to diff later builds against
+SNAPSHOT_FILENAME = "osdu_draft.snapshot"
+
+# Report of the changes between two ontologies, and SPARQL Update patch applying them
+DIFF_REPORT_FILENAME = "osdu_diff.txt"
+DIFF_PATCH_FILENAME = "osdu_diff.rq"
+
+# Comments and patterns longer than this are shortened in the report
+REPORT_LITERAL_LENGTH = 72
+
+
+def union_value(class_refs: list) -> str:
+    # Members of a union are a set, so that reordering them is not a change
+    return " ".join(sorted(class_ref for class_ref in class_refs if class_ref != ""))
+
+
+class FactIndexSink(TripleSink):
+    def __init__(self):
+        """Indexes the facts of each class and property from ontology events, keyed by name, to compare
+        ontologies without comparing their graphs. Each fact is one event, as a (kind, slot, value)
+        key: kind is the predicate or cardinality bound, slot identifies one of several facts of the
+        same kind (a superclass, a comment, or the property and onClass of a restriction), and value
+        holds what a fact of a single-valued kind is set to (a type, label, cardinality, domain or
+        range). Each fact maps to its triples, which are the same as in N-Triples output, blank
+        nodes included.
+
+        self.index maps ('class', key) or ('property', key) to a dictionary of facts, in output order.
+        """
+        super().__init__()
+        self.index = {}
+        self.facts = {}
+        self.key = None
+
+    def record(self, kind: str, slot: str, value: str, event, *args) -> None:
+        num_triples = len(self.triples)
+        event(*args)
+        triples = self.triples[num_triples:]
+        # Facts referring to a class missing from the ontology are not written
+        if "" not in triples[0]:
+            self.facts[(kind, slot, value)] = triples
+
+    def start_facts(self, key: tuple) -> None:
+        self.key = key
+        self.facts = {("rdf:type", "", self.triples[0][2]): self.triples[:1]}
+
+    def class_start(self, class_key: str, class_name: str) -> None:
+        super().class_start(class_key, class_name)
+        self.start_facts(("class", class_key))
+
+    def pref_label(self, label: str) -> None:
+        self.record("skos:prefLabel", "", '"' + label + '"', super().pref_label, label)
+
+    def comment(self, text: str) -> None:
+        self.record("rdfs:comment", '"' + text + '"', "", super().comment, text)
+
+    def superclass(self, class_ref: str) -> None:
+        self.record("rdfs:subClassOf", class_ref, "", super().superclass, class_ref)
+
+    def restriction(
+        self, prop_ref: str, bound: str, cardinality, on_class_ref: str
+    ) -> None:
+        slot = prop_ref if on_class_ref is None else prop_ref + " on " + on_class_ref
+        self.record(
+            bound + " cardinality",
+            slot,
+            str(cardinality),
+            super().restriction,
+            prop_ref,
+            bound,
+            cardinality,
+            on_class_ref,
+        )
+
+    def sameas(self, link: str) -> None:
+        self.record("owl:sameAs", link, "", super().sameas, link)
+
+    def equivalent_class(self, class_ref: str) -> None:
+        self.record(
+            "owl:equivalentClass", class_ref, "", super().equivalent_class, class_ref
+        )
+
+    def class_end(self) -> None:
+        self.index[self.key] = self.facts
+
+    def property_start(
+        self, prop_key: str, prop_name: str, prop_type: PropType
+    ) -> None:
+        super().property_start(prop_key, prop_name, prop_type)
+        self.start_facts(("property", prop_key))
+
+    def property_domain(self, class_refs: list) -> None:
+        self.record(
+            "rdfs:domain",
+            "",
+            union_value(class_refs),
+            super().property_domain,
+            class_refs,
+        )
+
+    def pattern(self, text: str) -> None:
+        self.record("rdfs:pattern", '"' + text + '"', "", super().pattern, text)
+
+    def property_range(self, class_refs: list) -> None:
+        self.record(
+            "rdfs:range",
+            "",
+            union_value(class_refs),
+            super().property_range,
+            class_refs,
+        )
+
+    def property_end(self) -> None:
+        self.index[self.key] = self.facts
+
+
+def index_ontology(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: RestrictionStore,
+    open_ont_dict: dict = None,
+) -> dict:
+    """Facts of each class and property of the ontology, see FactIndexSink
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict, optional): Dictionary of open ontology alignments, keyed by ontology prefix.
+            Defaults to None.
+
+    Returns:
+        dict: Mapping from ('class', key) or ('property', key) to a dictionary of facts and their triples.
+    """
+    sink = FactIndexSink()
+    emit_ontology(
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
+        open_ont_dict or {},
+        [sink],
+    )
+    return sink.index
+
+
+def load_snapshot(filepath: str) -> tuple:
+    """Read the class, property and restriction dictionaries of a snapshot written by --snapshot,
+        i.e. a packed ontology file written by write_shared_ontology
+
+    Args:
+        filepath (str): Path to the snapshot file.
+
+    Returns:
+        tuple: (class_ontology_dict, prop_ontology_dict, array_properties_dict).
+    """
+    class_ontology_dict = {}
+    prop_ontology_dict = {}
+    array_properties_dict = RestrictionStore()
+    with SharedOntologyView.open(filepath) as view:
+        for class_name in view.class_names():
+            fields = view.get_class(class_name)
+            class_rep = ClassRep(class_name, process_name_flag=False)
+            # Names and fields are stored as built, so they are set without processing them again
+            class_rep.name = class_name
+            class_rep.pref_label = fields["pref_label"]
+            class_rep.superclass_list = fields["superclass_list"]
+            class_rep.comments = fields["comments"]
+            class_rep.sameas = fields["sameas"]
+            class_rep.equivalent_list = fields["equivalent_list"]
+            class_ontology_dict[class_name] = class_rep
+            for rest_prop in fields["restrictions"]:
+                array_properties_dict.add_restriction(
+                    class_name,
+                    rest_prop["prop_name"],
+                    on_class=rest_prop.get("on_class", ""),
+                    min_card=rest_prop.get("min_card"),
+                    max_card=rest_prop.get("max_card"),
+                )
+
+        for prop_name in view.property_names():
+            fields = view.get_property(prop_name)
+            prop_rep = PropertyRep(
+                prop_name, fields["domain"], "", process_name_flag=False
+            )
+            prop_rep.range = fields["range"]
+            prop_rep.type = fields["type"]
+            prop_rep.comments = fields["comments"]
+            prop_rep.patterns = fields["patterns"]
+            prop_rep.sameas = fields["sameas"]
+            prop_ontology_dict[prop_name] = prop_rep
+    return class_ontology_dict, prop_ontology_dict, array_properties_dict
+
+
+def diff_ontologies(old_index: dict, new_index: dict) -> list:
+    """Changes between two ontologies, from their fact indexes (see index_ontology). Entities are
+        matched by key, and their facts by (kind, slot, value), so the diff takes time linear in
+        the size of the ontologies.
+
+    Args:
+        old_index (dict): Fact index of the earlier ontology.
+        new_index (dict): Fact index of the later ontology.
+
+    Returns:
+        list: Changed entities, in the output order of the later ontology followed by removed entities.
+            Each change is a dictionary of the entity 'key', its 'status' ('added', 'removed' or
+            'changed'), and the 'removed' and 'added' facts, as dictionaries of facts and their triples.
+    """
+    changes = []
+    for key, new_facts in new_index.items():
+        old_facts = old_index.get(key)
+        if old_facts is None:
+            changes.append(
+                {"key": key, "status": "added", "removed": {}, "added": new_facts}
+            )
+            continue
+        removed = {fact: old_facts[fact] for fact in old_facts if fact not in new_facts}
+        added = {fact: new_facts[fact] for fact in new_facts if fact not in old_facts}
+        if removed or added:
+            changes.append(
+                {"key": key, "status": "changed", "removed": removed, "added": added}
+            )
+
+    for key, old_facts in old_index.items():
+        if key not in new_index:
+            changes.append(
+                {"key": key, "status": "removed", "removed": old_facts, "added": {}}
+            )
+    return changes
+
+
+def shorten(text: str, length: int = REPORT_LITERAL_LENGTH) -> str:
+    return text if len(text) <= length else text[: length - 3] + "..."
+
+
+def fact_text(fact: tuple) -> str:
+    kind, slot, value = fact
+    text = kind
+    if slot != "":
+        text += " " + shorten(slot)
+    if value != "":
+        text += ": " + shorten(value)
+    return text
+
+
+def format_diff_report(changes: list) -> list:
+    """Human-readable report of the changes between two ontologies, one line per entity and per fact:
+        '+' for added, '-' for removed, and '~' for changed entities, and for facts of a single-valued
+        kind set to another value, e.g. a cardinality, shown as 'old -> new'.
+
+    Args:
+        changes (list): Changes, as returned by diff_ontologies.
+
+    Returns:
+        list: Lines of the report.
+    """
+    markers = {"added": "+", "removed": "-", "changed": "~"}
+    lines = []
+    for kind in ["class", "property"]:
+        counts = {status: 0 for status in markers}
+        for change in changes:
+            if change["key"][0] == kind:
+                counts[change["status"]] += 1
+        lines.append(
+            "{}: {} added, {} removed, {} changed".format(
+                "Classes" if kind == "class" else "Properties",
+                counts["added"],
+                counts["removed"],
+                counts["changed"],
+            )
+        )
+
+    for change in changes:
+        kind, name = change["key"]
+        lines.append("")
+        lines.append(markers[change["status"]] + " " + kind + " " + name)
+
+        # Pair the removed and added values of a single-valued fact
+        added_values = {
+            (fact[0], fact[1]): fact[2] for fact in change["added"] if fact[2] != ""
+        }
+        paired = set()
+        for fact in change["removed"]:
+            if (fact[2] != "") and ((fact[0], fact[1]) in added_values):
+                new_value = added_values[(fact[0], fact[1])]
+                paired.add((fact[0], fact[1], new_value))
+                lines.append(
+                    "    ~ "
+                    + fact_text((fact[0], fact[1], ""))
+                    + ": "
+                    + shorten(fact[2])
+                    + " -> "
+                    + shorten(new_value)
+                )
+            else:
+                lines.append("    - " + fact_text(fact))
+        for fact in change["added"]:
+            if fact not in paired:
+                lines.append("    + " + fact_text(fact))
+    return lines
+
+
+def patch_pattern_lines(triples: list, writer: TripleWriter) -> list:
+    # Blank nodes become variables, so that the pattern matches the nodes loaded in the store
+    lines = []
+    for triple in triples:
+        terms = [writer.expand(term) for term in triple]
+        if "" not in terms:
+            terms = [
+                "?" + term[2:] if term.startswith("_:") else term for term in terms
+            ]
+            lines.append("  " + " ".join(terms) + " .")
+    return lines
+
+
+def format_diff_patch(changes: list, prefix_map: dict) -> list:
+    """SPARQL Update request applying the changes between two ontologies to a triple store holding
+        the earlier one: a DELETE DATA operation for the triples of removed facts, a DELETE WHERE
+        operation for each removed fact with blank nodes (restrictions and unions), which DELETE DATA
+        cannot match, and an INSERT DATA operation for the triples of added facts.
+
+    Args:
+        changes (list): Changes, as returned by diff_ontologies.
+        prefix_map (dict): Mapping from prefix to namespace IRI, as returned by generate_prefix_map.
+
+    Returns:
+        list: Lines of the request.
+    """
+    writer = TripleWriter(prefix_map)
+    deleted_lines = []
+    delete_patterns = []
+    inserted_lines = []
+    for change in changes:
+        for triples in change["removed"].values():
+            if any(term.startswith("_:") for triple in triples for term in triple):
+                delete_patterns.append(patch_pattern_lines(triples, writer))
+            else:
+                deleted_lines += [writer.line(*triple) for triple in triples]
+        for triples in change["added"].values():
+            inserted_lines += [writer.line(*triple) for triple in triples]
+
+    operations = []
+    deleted_lines = ["  " + line[:-1] for line in deleted_lines if line != ""]
+    if deleted_lines:
+        operations.append(["DELETE DATA {"] + deleted_lines + ["}"])
+    for pattern_lines in delete_patterns:
+        operations.append(["DELETE WHERE {"] + pattern_lines + ["}"])
+    inserted_lines = ["  " + line[:-1] for line in inserted_lines if line != ""]
+    if inserted_lines:
+        operations.append(["INSERT DATA {"] + inserted_lines + ["}"])
+
+    lines = [
+        "# {} triples deleted, {} blank node patterns deleted, {} triples inserted".format(
+            len(deleted_lines), len(delete_patterns), len(inserted_lines)
+        )
+    ]
+    for i, operation in enumerate(operations):
+        if i + 1 < len(operations):
+            operation[-1] += " ;"
+        lines += operation
+    return lines
+
+
+def write_ontology_diff(
+    old_dicts: tuple,
+    new_dicts: tuple,
+    open_ont_dict: dict,
+    dest_filepath: str,
+) -> list:
+    """Compare an earlier build of the ontology with the current one, and write a report of the
+        changes to osdu_diff.txt, see format_diff_report, and a SPARQL Update request applying them
+        to a triple store to osdu_diff.rq, see format_diff_patch.
+
+    Args:
+        old_dicts (tuple): (class_ontology_dict, prop_ontology_dict, array_properties_dict) of the earlier build.
+        new_dicts (tuple): (class_ontology_dict, prop_ontology_dict, array_properties_dict) of the current build.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        dest_filepath (str): Destination location of the report and request.
+
+    Returns:
+        list: Changes, as returned by diff_ontologies.
+    """
+    changes = diff_ontologies(
+        index_ontology(*old_dicts, open_ont_dict),
+        index_ontology(*new_dicts, open_ont_dict),
+    )
+    report_lines = format_diff_report(changes)
+    with open(dest_filepath + DIFF_REPORT_FILENAME, "w", encoding="utf-8") as f:
+        f.write(join_lines(report_lines))
+    with open(dest_filepath + DIFF_PATCH_FILENAME, "w", encoding="utf-8") as f:
+        f.write(
+            join_lines(format_diff_patch(changes, generate_prefix_map(open_ont_dict)))
+        )
+
+    # Counts of changed classes and properties
+    for line in report_lines[:2]:
+        print(line)
+    return changes
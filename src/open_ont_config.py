@@ -1,10 +1,41 @@
-# Define dictionary
-open_ont_dict = {}
+import json
+import os
 
+# Alignments between OSDU and open ontologies, keyed by the ontology prefix.
+# Each ontology has the keys:
+#   "namespace": IRI of the ontology, declared as a prefix in the output if not already declared
+#   "ranges_dict": open ontology class -> OSDU properties whose range becomes that class
+#   "subclass_dict": open ontology class -> OSDU classes that become its subclasses
+#   "sameas_dict": open ontology identifier -> OSDU classes or properties linked with owl:sameAs
+DEFAULT_OPEN_ONT_CONFIG = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "open_ont_config.json"
+)
 
-def add_open_ont(ontology_key: str, ranges_dict, subclass_dict, sameas_dict):
-    global open_ont_dict
+
+def add_open_ont(
+    ontology_key: str,
+    ranges_dict,
+    subclass_dict,
+    sameas_dict,
+    open_ont_dict: dict = None,
+    namespace: str = "",
+) -> dict:
+    """Add the alignments of one open ontology to a dictionary of alignments
+
+    Args:
+        ontology_key (str): Prefix of the open ontology, e.g. "time".
+        ranges_dict (dict): Open ontology class to list of OSDU properties ranging over it.
+        subclass_dict (dict): Open ontology class to list of OSDU classes inheriting it.
+        sameas_dict (dict): Open ontology identifier to list of OSDU classes or properties linked with owl:sameAs.
+        open_ont_dict (dict, optional): Dictionary of alignments to update. Defaults to None, for a new dictionary.
+        namespace (str, optional): IRI of the open ontology. Defaults to ''.
+
+    Returns:
+        dict: Updated dictionary of alignments, keyed by ontology prefix.
+    """
+    open_ont_dict = {} if open_ont_dict is None else open_ont_dict
     open_ont_dict[ontology_key] = {
+        "namespace": namespace,
         "ranges_dict": ranges_dict,
         "subclass_dict": subclass_dict,
         "sameas_dict": sameas_dict,
@@ -12,186 +43,46 @@ def add_open_ont(ontology_key: str, ranges_dict, subclass_dict, sameas_dict):
     return open_ont_dict
 
 
-def config_open_onts():
-    global open_ont_dict
-    add_open_ont(
-        "acl",
-        ranges_dict={
-            "AuthenticatedAgent": [
-                "coordinateQualityCheckPerformedBy",
-                "createUser",
-                "modifyUser",
-                "preloadFileCreateUser",
-                "preloadFileModifyUser",
-            ]
-        },
-        subclass_dict={},
-        sameas_dict={},
-    )
+def load_open_ont_config(config_path: str = DEFAULT_OPEN_ONT_CONFIG) -> dict:
+    """Load open ontology alignments from a JSON or YAML file.
+        YAML files (.yaml or .yml) require the PyYAML package.
 
-    add_open_ont(
-        "time",
-        ranges_dict={
-            "DateTimeDescription": [
-                "acquisitionDate",
-                "activityStartDateTime",
-                "activityStopDateTime",
-                "analysisDate",
-                "commentTime",
-                "commitDate",
-                "coordinateQualityCheckDateTime",
-                "coreRecoveredDate",
-                "coringOperationDate",
-                "createTime",
-                "creationDateTime",
-                "cutDate",
-                "dataRuleCreatedOn",
-                "dataRulePublishedOn",
-                "dataRuleUpdatedOn",
-                "date",
-                "dateModified",
-                "datePublished",
-                "dateStamp",
-                "dateTime",
-                "daylightSavingTimeEndDate",
-                "daylightSavingTimeStartDate",
-                "deadline",
-                "drillingStartDateTime",
-                "drillingStopDateTime",
-                "effectiveDate",
-                "effectiveDateTime",
-                "endDate",
-                "endDateActivity",
-                "endDateTime",
-                "facilitySpecificationDateTime",
-                "importTimeStamp",
-                "intervalDateTime",
-                "issueDateTime",
-                "jobEndDateTime",
-                "jobStartDateTime",
-                "lastAbandonDrillDate",
-                "lastBopDrillDate",
-                "lastBopPressureTestDate",
-                "lastCasingPressureTestDate",
-                "lastDiverterDrillDate",
-                "lastFireBoatDrillDate",
-                "lastRigInspectionDate",
-                "lastSafetyInspectionDate",
-                "lastSafetyMeetingDate",
-                "lastSuccessfulRunDateUTC",
-                "lastTripDrillDate",
-                "markerDate",
-                "modifyTime",
-                "nextBopPresTestDate",
-                "parameterTypeDefaultValueDateTime",
-                "parameterTypeDefaultValueTime",
-                "plannedEndTime",
-                "plannedStartTime",
-                "preloadFileCreateDate",
-                "preloadFileModifyDate",
-                "projectBeginDate",
-                "projectEndDate",
-                "projectSpecificationDateTime",
-                "publicationDate",
-                "recordDate",
-                "referenceLogDate",
-                "revisionDate",
-                "runDateTime",
-                "sampleAcquiredDate",
-                "sampleDateTime",
-                "spatialLocationCoordinatesDate",
-                "specificationDate",
-                "specificationDateTime",
-                "specificationTime",
-                "startDate",
-                "startDateActivity",
-                "startDateTime",
-                "startTime",
-                "statusDateTime",
-                "surfacePressureFinalDateTime",
-                "terminationDate",
-                "terminationDateTime",
-                "timeValues",
-                "totalTime",
-                "uTCDateTimeValues",
-                "updateDate",
-                "validationDate",
-                "zeroTime",
-            ],
-            "TemporalDuration": [
-                "bitRunTIme",
-                "elapsedTimeCirc",
-                "elapsedTimeDrill",
-                "elapsedTimeDrillRot",
-                "elapsedTimeDrillSlid",
-                "elapsedTimeHold",
-                "elapsedTimeLoc",
-                "elapsedTimeReam",
-                "elapsedTimeSpud",
-                "elapsedTimeStart",
-                "elapsedTimeSteering",
-                "maximumAge",
-                "minimumAge",
-                "nonProductiveTimeDuration",
-                "productiveTimeDuration",
-                "satelliteRevisitTime",
-                "timeReaming",
-                "testTimeDuration",
-                "timeCirculating",
-                "timeDrillingRotating",
-                "timeDrillingSliding",
-                "timeHolding",
-                "timeSteering",
-                "validationDuration",
-                "wavePeriod",
-            ],
-        },
-        subclass_dict={},
-        sameas_dict={},
-    )
+    Args:
+        config_path (str, optional): Filepath to the alignment config. Defaults to the bundled open_ont_config.json.
 
-    add_open_ont(
-        ontology_key="foaf",
-        ranges_dict={},
-        subclass_dict={
-            "Image": [
-                "GenericImage",
-                "GeoReferencedImage",
-                "GeoTIFF",
-                "JPEG",
-                "PNG",
-                "TIFF",
-            ],
-            "Person": ["Personnel"],
-        },
-        sameas_dict={
-            "Organization": ["Organisation"],
-            "name": ["incidentReporterName", "interpreterName", "name", "personName"],
-        },
-    )
+    Returns:
+        dict: Dictionary of alignments, keyed by ontology prefix.
+    """
+    with open(config_path, "r", encoding="utf-8") as fp:
+        if config_path.endswith((".yaml", ".yml")):
+            import yaml
 
-    add_open_ont(
-        ontology_key="gn",
-        ranges_dict={
-            "Feature": [
-                "boundingBoxEastBoundLongitude",
-                "boundingBoxWestBoundLongitude",
-                "boundingBoxNorthBoundLatitude",
-                "boundingBoxSouthBoundLatitude",
-                "otherRelevantDataCountries",
-            ]
-        },
-        subclass_dict={},
-        sameas_dict={
-            "longitude": [
-                "boundingBoxEastBoundLongitude",
-                "boundingBoxWestBoundLongitude",
-            ],
-            "latitude": [
-                "boundingBoxNorthBoundLatitude",
-                "boundingBoxSouthBoundLatitude",
-            ],
-            "countryCode": ["otherRelevantDataCountries"],
-        },
-    )
+            config = yaml.safe_load(fp)
+        else:
+            config = json.load(fp)
+
+    open_ont_dict = {}
+    for ontology_key, ont_links_dict in config.items():
+        add_open_ont(
+            ontology_key,
+            ranges_dict=ont_links_dict.get("ranges_dict", {}),
+            subclass_dict=ont_links_dict.get("subclass_dict", {}),
+            sameas_dict=ont_links_dict.get("sameas_dict", {}),
+            open_ont_dict=open_ont_dict,
+            namespace=ont_links_dict.get("namespace", ""),
+        )
     return open_ont_dict
+
+
+def config_open_onts(config_path: str = None) -> dict:
+    """Load the open ontology alignments used for the OSDU ontology
+
+    Args:
+        config_path (str, optional): Filepath to an alignment config. Defaults to None, for the bundled config.
+
+    Returns:
+        dict: Dictionary of alignments, keyed by ontology prefix.
+    """
+    return load_open_ont_config(
+        DEFAULT_OPEN_ONT_CONFIG if config_path is None else config_path
+    )
@@ -0,0 +1,195 @@
+from .kg_rep import *
+
+
+class ReferenceIndex:
+    def __init__(
+        self,
+        class_ontology_dict: dict,
+        prop_ontology_dict: dict,
+        array_properties_dict: RestrictionStore = None,
+    ):
+        """Reverse index from a class name to every entry of the ontology dictionaries that refers to it:
+            classes listing it as a superclass or subclass, properties listing it in their domain or range,
+            and classes with a qualified cardinality restriction on it.
+            Built with one scan of the dictionaries, and kept up to date by rename_classes,
+            so that renaming a class only visits the entries that refer to it.
+
+        Args:
+            class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+            prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+            array_properties_dict (RestrictionStore, optional): Cardinality restrictions on OSDU classes.
+                Defaults to None, for no restrictions.
+        """
+        self.superclass_refs = {}
+        self.subclass_refs = {}
+        self.domain_refs = {}
+        self.range_refs = {}
+        self.restriction_refs = {}
+
+        for class_name, class_rep in class_ontology_dict.items():
+            self.add_class(class_name, class_rep)
+        for prop_name, prop_rep in prop_ontology_dict.items():
+            self.add_property(prop_name, prop_rep)
+        if array_properties_dict is not None:
+            for class_name, rest_props in array_properties_dict.items():
+                self.add_restrictions(class_name, rest_props)
+
+    @staticmethod
+    def _link(refs: dict, name: str, referrer: str) -> None:
+        refs.setdefault(name, set()).add(referrer)
+
+    @staticmethod
+    def _unlink(refs: dict, name: str, referrer: str) -> None:
+        if name in refs:
+            refs[name].discard(referrer)
+
+    def add_class(self, class_name: str, class_rep: ClassRep) -> None:
+        for superclass in class_rep.superclass_list:
+            self._link(self.superclass_refs, superclass, class_name)
+        for subclass in class_rep.subclass_list:
+            self._link(self.subclass_refs, subclass, class_name)
+
+    def remove_class(self, class_name: str, class_rep: ClassRep) -> None:
+        for superclass in class_rep.superclass_list:
+            self._unlink(self.superclass_refs, superclass, class_name)
+        for subclass in class_rep.subclass_list:
+            self._unlink(self.subclass_refs, subclass, class_name)
+
+    def add_property(self, prop_name: str, prop_rep: PropertyRep) -> None:
+        for domain in prop_rep.domain:
+            self._link(self.domain_refs, domain, prop_name)
+        for range_name in prop_rep.range:
+            self._link(self.range_refs, range_name, prop_name)
+
+    def remove_property(self, prop_name: str, prop_rep: PropertyRep) -> None:
+        for domain in prop_rep.domain:
+            self._unlink(self.domain_refs, domain, prop_name)
+        for range_name in prop_rep.range:
+            self._unlink(self.range_refs, range_name, prop_name)
+
+    def add_restrictions(self, class_name: str, rest_props: list) -> None:
+        for rest_prop in rest_props:
+            if "on_class" in rest_prop:
+                self._link(self.restriction_refs, rest_prop["on_class"], class_name)
+
+    def remove_restrictions(self, class_name: str, rest_props: list) -> None:
+        for rest_prop in rest_props:
+            if "on_class" in rest_prop:
+                self._unlink(self.restriction_refs, rest_prop["on_class"], class_name)
+
+    def references(self, class_name: str) -> dict:
+        """List every entry referring to a class
+
+        Args:
+            class_name (str): Name of an OSDU class.
+
+        Returns:
+            dict: Sorted names of the referring classes or properties, keyed by kind of reference:
+                "superclass", "subclass", "domain", "range" and "restriction".
+        """
+        return {
+            "superclass": sorted(self.superclass_refs.get(class_name, [])),
+            "subclass": sorted(self.subclass_refs.get(class_name, [])),
+            "domain": sorted(self.domain_refs.get(class_name, [])),
+            "range": sorted(self.range_refs.get(class_name, [])),
+            "restriction": sorted(self.restriction_refs.get(class_name, [])),
+        }
+
+
+def rename_classes(
+    renames: dict,
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: RestrictionStore = None,
+    index: ReferenceIndex = None,
+    keep_old_classes: bool = True,
+) -> ReferenceIndex:
+    """Rename classes everywhere they are referred to, visiting only the referring entries
+        through a ReferenceIndex. Renames are applied in the order given.
+        For each renamed class:
+            the class is stored and named under the new name,
+            superclass links, property domains and ranges, restriction owners and
+            restriction onClass targets are pointed to the new name,
+            a property "has" + old name is stored under "has" + new name,
+            and, if keep_old_classes is set, the old class is added back with the superclasses of the new class.
+
+    Args:
+        renames (dict): Mapping from old class names to new class names.
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore, optional): Cardinality restrictions on OSDU classes.
+            Defaults to None, for no restrictions.
+        index (ReferenceIndex, optional): Index of the dictionaries, updated in place.
+            Defaults to None, to build a new index.
+        keep_old_classes (bool, optional): Whether to add the old classes back. Defaults to True.
+
+    Returns:
+        ReferenceIndex: Index of the renamed dictionaries, to be reused by later renames.
+    """
+    if index is None:
+        index = ReferenceIndex(
+            class_ontology_dict, prop_ontology_dict, array_properties_dict
+        )
+
+    for replace_key, new_key in renames.items():
+        # Store the class under its new name
+        class_rep = class_ontology_dict.pop(replace_key)
+        index.remove_class(replace_key, class_rep)
+        class_rep.name = new_key
+        class_ontology_dict[new_key] = class_rep
+        index.add_class(new_key, class_rep)
+
+        # Superclass links
+        for class_name in list(index.superclass_refs.pop(replace_key, [])):
+            referring_rep = class_ontology_dict[class_name]
+            index.remove_class(class_name, referring_rep)
+            referring_rep.superclass_list.remove(replace_key)
+            referring_rep.add_superclass(new_key)
+            index.add_class(class_name, referring_rep)
+
+        # Subclass links
+        for class_name in list(index.subclass_refs.pop(replace_key, [])):
+            subclass_list = class_ontology_dict[class_name].subclass_list
+            subclass_list[subclass_list.index(replace_key)] = new_key
+            index._link(index.subclass_refs, new_key, class_name)
+
+        # Property named after the class
+        if ("has" + replace_key) in prop_ontology_dict:
+            prop_rep = prop_ontology_dict.pop("has" + replace_key)
+            index.remove_property("has" + replace_key, prop_rep)
+            prop_ontology_dict["has" + new_key] = prop_rep
+            index.add_property("has" + new_key, prop_rep)
+
+        # Property domains and ranges
+        for prop_name in list(index.domain_refs.pop(replace_key, [])):
+            prop_rep = prop_ontology_dict[prop_name]
+            prop_rep.domain.append(new_key)
+            prop_rep.domain.remove(replace_key)
+            index._link(index.domain_refs, new_key, prop_name)
+        for prop_name in list(index.range_refs.pop(replace_key, [])):
+            prop_rep = prop_ontology_dict[prop_name]
+            prop_rep.range.append(new_key)
+            prop_rep.range.remove(replace_key)
+            index._link(index.range_refs, new_key, prop_name)
+
+        # Restrictions
+        if array_properties_dict is not None:
+            if replace_key in array_properties_dict:
+                rest_props = array_properties_dict[replace_key]
+                index.remove_restrictions(replace_key, rest_props)
+                array_properties_dict.rename_class(replace_key, new_key)
+                index.add_restrictions(new_key, array_properties_dict[new_key])
+            for class_name in list(index.restriction_refs.pop(replace_key, [])):
+                array_properties_dict.rename_on_class(class_name, replace_key, new_key)
+                index._link(index.restriction_refs, new_key, class_name)
+
+        # Add old class back, with the superclasses of the new class
+        if keep_old_classes:
+            class_ontology_dict = add_class_from_parameters(
+                replace_key,
+                class_ontology_dict[new_key].superclass_list.copy(),
+                class_ontology_dict,
+            )
+            index.add_class(replace_key, class_ontology_dict[replace_key])
+
+    return index
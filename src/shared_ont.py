@@ -0,0 +1,419 @@
+import mmap
+import struct
+from bisect import bisect_left
+from multiprocessing import shared_memory
+import numpy as np
+from .kg_rep import *
+
+# Read-only, zero-copy view of a built ontology, so that worker processes can share
+# one copy of the class, property and restriction dictionaries.
+# The dictionaries are packed once into a flat buffer: a string table followed by
+# integer arrays in CSR (pointer + index) layout. The buffer is placed in a
+# multiprocessing.shared_memory block, or written to a file and mmap'd. Workers wrap
+# the arrays with np.frombuffer, so nothing is copied or unpickled, and strings are
+# only decoded when they are looked up.
+
+SHARED_ONT_MAGIC = b"OSDUONT1"
+SHARED_ONT_VERSION = 3
+
+# Order of the arrays in the packed buffer, with their numpy dtypes
+_SECTIONS = [
+    ("string_offsets", np.int64),
+    ("string_bytes", np.uint8),
+    ("class_names", np.int32),
+    ("class_labels", np.int32),
+    ("class_super_ptr", np.int32),
+    ("class_super_ids", np.int32),
+    ("class_comment_ptr", np.int32),
+    ("class_comment_ids", np.int32),
+    ("class_sameas_ptr", np.int32),
+    ("class_sameas_ids", np.int32),
+    ("class_equiv_ptr", np.int32),
+    ("class_equiv_ids", np.int32),
+    ("class_rest_ptr", np.int32),
+    ("class_rest", np.int32),
+    ("prop_names", np.int32),
+    ("prop_types", np.int32),
+    ("prop_domain_ptr", np.int32),
+    ("prop_domain_ids", np.int32),
+    ("prop_range_ptr", np.int32),
+    ("prop_range_ids", np.int32),
+    ("prop_comment_ptr", np.int32),
+    ("prop_comment_ids", np.int32),
+    ("prop_pattern_ptr", np.int32),
+    ("prop_pattern_ids", np.int32),
+    ("prop_sameas_ptr", np.int32),
+    ("prop_sameas_ids", np.int32),
+]
+
+# Header: magic, version, number of sections, then (offset, length) per section
+_HEADER_FMT = "<8sII" + "QQ" * len(_SECTIONS)
+_HEADER_SIZE = struct.calcsize(_HEADER_FMT)
+
+# Number of int32 fields stored per restriction:
+# property, onClass, min cardinality and max cardinality, with -1 where absent
+_REST_WIDTH = 4
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, value: str) -> int:
+        if value not in self.ids:
+            self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return self.ids[value]
+
+
+def _csr(lists: list, strings: _StringTable) -> (np.ndarray, np.ndarray):
+    ptr = np.zeros(len(lists) + 1, dtype=np.int32)
+    ids = []
+    for i, values in enumerate(lists):
+        ids.extend(strings.add(value) for value in values)
+        ptr[i + 1] = len(ids)
+    return ptr, np.array(ids, dtype=np.int32)
+
+
+def pack_ontology(
+    class_ontology_dict: dict, prop_ontology_dict: dict, array_properties_dict: dict
+) -> bytes:
+    """Serialize class, property and restriction dictionaries into the flat buffer
+        format read by SharedOntologyView.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+
+    Returns:
+        bytes: Packed ontology buffer.
+    """
+    strings = _StringTable()
+    arrays = {}
+
+    # Classes, sorted by name so that workers can binary search them
+    class_keys = sorted(class_ontology_dict.keys())
+    class_reps = [class_ontology_dict[key] for key in class_keys]
+    arrays["class_names"] = np.array(
+        [strings.add(key) for key in class_keys], dtype=np.int32
+    )
+    arrays["class_labels"] = np.array(
+        [
+            strings.add(class_rep.pref_label) if class_rep.pref_label != "" else -1
+            for class_rep in class_reps
+        ],
+        dtype=np.int32,
+    )
+    for field, lists in [
+        ("super", [class_rep.superclass_list for class_rep in class_reps]),
+        ("comment", [class_rep.comments for class_rep in class_reps]),
+        ("sameas", [class_rep.sameas for class_rep in class_reps]),
+        ("equiv", [class_rep.equivalent_list for class_rep in class_reps]),
+    ]:
+        arrays["class_" + field + "_ptr"], arrays["class_" + field + "_ids"] = _csr(
+            lists, strings
+        )
+
+    rest_ptr = np.zeros(len(class_keys) + 1, dtype=np.int32)
+    rest_rows = []
+    for i, class_key in enumerate(class_keys):
+        for rest_prop in array_properties_dict.get(class_key, []):
+            rest_rows.append(
+                [
+                    strings.add(rest_prop["prop_name"]),
+                    (
+                        strings.add(rest_prop["on_class"])
+                        if "on_class" in rest_prop
+                        else -1
+                    ),
+                    rest_prop.get("min_card", -1),
+                    rest_prop.get("max_card", -1),
+                ]
+            )
+        rest_ptr[i + 1] = len(rest_rows)
+    arrays["class_rest_ptr"] = rest_ptr
+    arrays["class_rest"] = np.array(rest_rows, dtype=np.int32).reshape(-1)
+
+    # Properties
+    prop_keys = sorted(prop_ontology_dict.keys())
+    prop_reps = [prop_ontology_dict[key] for key in prop_keys]
+    arrays["prop_names"] = np.array(
+        [strings.add(key) for key in prop_keys], dtype=np.int32
+    )
+    arrays["prop_types"] = np.array(
+        [strings.add(prop_rep.type.value) for prop_rep in prop_reps], dtype=np.int32
+    )
+    for field, lists in [
+        ("domain", [prop_rep.domain for prop_rep in prop_reps]),
+        ("range", [prop_rep.range for prop_rep in prop_reps]),
+        ("comment", [prop_rep.comments for prop_rep in prop_reps]),
+        ("pattern", [prop_rep.patterns for prop_rep in prop_reps]),
+        ("sameas", [prop_rep.sameas for prop_rep in prop_reps]),
+    ]:
+        arrays["prop_" + field + "_ptr"], arrays["prop_" + field + "_ids"] = _csr(
+            lists, strings
+        )
+
+    # String table
+    encoded = [value.encode("utf-8") for value in strings.strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    arrays["string_offsets"] = offsets
+    arrays["string_bytes"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    # Lay out sections after the header, each aligned to 8 bytes
+    chunks = []
+    section_table = []
+    position = _HEADER_SIZE
+    for section_name, dtype in _SECTIONS:
+        data = np.ascontiguousarray(arrays[section_name], dtype=dtype).tobytes()
+        padding = -position % 8
+        chunks.append(b"\0" * padding)
+        position += padding
+        section_table.extend([position, len(data)])
+        chunks.append(data)
+        position += len(data)
+
+    header = struct.pack(
+        _HEADER_FMT,
+        SHARED_ONT_MAGIC,
+        SHARED_ONT_VERSION,
+        len(_SECTIONS),
+        *section_table,
+    )
+    return header + b"".join(chunks)
+
+
+def publish_shared_ontology(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    name: str = None,
+) -> shared_memory.SharedMemory:
+    """Pack the ontology into a new shared memory block.
+        The caller owns the block, and should close() and unlink() it once all workers are done.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        name (str, optional): Name for the shared memory block. Defaults to None, for a generated name.
+
+    Returns:
+        shared_memory.SharedMemory: Shared memory block; pass its .name to SharedOntologyView.attach
+    """
+    data = pack_ontology(class_ontology_dict, prop_ontology_dict, array_properties_dict)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+    shm.buf[: len(data)] = data
+    return shm
+
+
+def write_shared_ontology(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    filepath: str,
+) -> None:
+    """Pack the ontology into a file, to be mmap'd by SharedOntologyView.open
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        filepath (str): Destination file for the packed ontology.
+    """
+    with open(filepath, "wb") as f:
+        f.write(
+            pack_ontology(
+                class_ontology_dict, prop_ontology_dict, array_properties_dict
+            )
+        )
+
+
+class SharedOntologyView:
+    def __init__(self, buffer, handle=None):
+        """Read-only view over a packed ontology buffer.
+            Use SharedOntologyView.attach for shared memory, or SharedOntologyView.open for a file.
+
+        Args:
+            buffer: Buffer-protocol object holding the output of pack_ontology.
+            handle (optional): Object owning the buffer, closed when the view is closed.
+        """
+        self._handle = handle
+        self._buffer = memoryview(buffer)
+        header = struct.unpack_from(_HEADER_FMT, self._buffer, 0)
+        if header[0] != SHARED_ONT_MAGIC or header[1] != SHARED_ONT_VERSION:
+            raise ValueError("Buffer does not hold a packed ontology of this version")
+
+        self._arrays = {}
+        for i, (section_name, dtype) in enumerate(_SECTIONS):
+            offset, length = header[3 + 2 * i], header[4 + 2 * i]
+            self._arrays[section_name] = np.frombuffer(
+                self._buffer,
+                dtype=dtype,
+                count=length // np.dtype(dtype).itemsize,
+                offset=offset,
+            )
+        self.num_classes = len(self._arrays["class_names"])
+        self.num_properties = len(self._arrays["prop_names"])
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedOntologyView":
+        """Attach to a shared memory block created by publish_shared_ontology
+
+        Args:
+            name (str): Name of the shared memory block.
+        """
+        try:
+            # Only the publishing process should track and unlink the block (Python 3.13+)
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm.buf, handle=shm)
+
+    @classmethod
+    def open(cls, filepath: str) -> "SharedOntologyView":
+        """Memory-map a file written by write_shared_ontology
+
+        Args:
+            filepath (str): Path to the packed ontology file.
+        """
+        with open(filepath, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, handle=mapped)
+
+    def close(self) -> None:
+        # Views into the buffer must be released before the owner can be closed
+        self._arrays = {}
+        self._buffer.release()
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _string(self, string_id: int) -> str:
+        offsets = self._arrays["string_offsets"]
+        return (
+            self._arrays["string_bytes"][offsets[string_id] : offsets[string_id + 1]]
+            .tobytes()
+            .decode("utf-8")
+        )
+
+    def _strings(self, ptr_name: str, ids_name: str, row: int) -> list:
+        ptr = self._arrays[ptr_name]
+        return [
+            self._string(string_id)
+            for string_id in self._arrays[ids_name][ptr[row] : ptr[row + 1]]
+        ]
+
+    def _find(self, names_section: str, name: str) -> int:
+        names = self._arrays[names_section]
+        row = bisect_left(range(len(names)), name, key=lambda i: self._string(names[i]))
+        if row < len(names) and self._string(names[row]) == name:
+            return row
+        return -1
+
+    def class_names(self) -> list:
+        return [self._string(string_id) for string_id in self._arrays["class_names"]]
+
+    def property_names(self) -> list:
+        return [self._string(string_id) for string_id in self._arrays["prop_names"]]
+
+    def has_class(self, class_name: str) -> bool:
+        return self._find("class_names", class_name) >= 0
+
+    def has_property(self, property_name: str) -> bool:
+        return self._find("prop_names", property_name) >= 0
+
+    def superclasses(self, class_name: str) -> list:
+        row = self._find("class_names", class_name)
+        if row < 0:
+            return []
+        return self._strings("class_super_ptr", "class_super_ids", row)
+
+    def restrictions(self, class_name: str) -> list:
+        """Cardinality restrictions for a class, in the format of the restriction dictionaries
+        held by a RestrictionStore
+        """
+        row = self._find("class_names", class_name)
+        if row < 0:
+            return []
+        ptr = self._arrays["class_rest_ptr"]
+        rows = self._arrays["class_rest"].reshape(-1, _REST_WIDTH)[
+            ptr[row] : ptr[row + 1]
+        ]
+        rest_props = []
+        for prop_id, on_class_id, min_card, max_card in rows:
+            rest_prop = {"prop_name": self._string(prop_id)}
+            if on_class_id >= 0:
+                rest_prop["on_class"] = self._string(on_class_id)
+            if min_card >= 0:
+                rest_prop["min_card"] = int(min_card)
+            if max_card >= 0:
+                rest_prop["max_card"] = int(max_card)
+            rest_props.append(rest_prop)
+        return rest_props
+
+    def domains(self, property_name: str) -> list:
+        row = self._find("prop_names", property_name)
+        if row < 0:
+            return []
+        return self._strings("prop_domain_ptr", "prop_domain_ids", row)
+
+    def ranges(self, property_name: str) -> list:
+        row = self._find("prop_names", property_name)
+        if row < 0:
+            return []
+        return self._strings("prop_range_ptr", "prop_range_ids", row)
+
+    def get_class(self, class_name: str) -> dict:
+        """Look up all stored fields of a class
+
+        Args:
+            class_name (str): Name of an OSDU class.
+
+        Returns:
+            dict: Fields of the class, or None if the class is not in the ontology.
+        """
+        row = self._find("class_names", class_name)
+        if row < 0:
+            return None
+        label_id = self._arrays["class_labels"][row]
+        return {
+            "name": class_name,
+            "pref_label": self._string(label_id) if label_id >= 0 else "",
+            "superclass_list": self._strings("class_super_ptr", "class_super_ids", row),
+            "comments": self._strings("class_comment_ptr", "class_comment_ids", row),
+            "sameas": self._strings("class_sameas_ptr", "class_sameas_ids", row),
+            "equivalent_list": self._strings("class_equiv_ptr", "class_equiv_ids", row),
+            "restrictions": self.restrictions(class_name),
+        }
+
+    def get_property(self, property_name: str) -> dict:
+        """Look up all stored fields of a property
+
+        Args:
+            property_name (str): Name of an OSDU property.
+
+        Returns:
+            dict: Fields of the property, or None if the property is not in the ontology.
+        """
+        row = self._find("prop_names", property_name)
+        if row < 0:
+            return None
+        return {
+            "name": property_name,
+            "type": PropType(self._string(self._arrays["prop_types"][row])),
+            "domain": self._strings("prop_domain_ptr", "prop_domain_ids", row),
+            "range": self._strings("prop_range_ptr", "prop_range_ids", row),
+            "comments": self._strings("prop_comment_ptr", "prop_comment_ids", row),
+            "patterns": self._strings("prop_pattern_ptr", "prop_pattern_ids", row),
+            "sameas": self._strings("prop_sameas_ptr", "prop_sameas_ids", row),
+        }
@@ -0,0 +1,258 @@
+import os
+import sqlite3
+from pathlib import Path
+
+from .kg_rep import *
+from .ttl_utils import OntologySink, add_prefix, emit_ontology
+from .nt_utils import TripleWriter, generate_prefix_map
+from .jsonld_utils import unescape_ttl_string
+
+# Normalized SQLite store of the ontology, for services to look up classes and properties
+# without parsing the TTL file. Every class, property, datatype and external term referred to
+# is a row of the term table, with its name as written in the TTL file (e.g. 'osdu:Well' or
+# 'xsd:string') and its full IRI; the other tables link term ids. Indexes are built once the
+# rows are written, and comments are also indexed for full text search with FTS5.
+
+SQLITE_STORE_VERSION = 2
+
+SQLITE_SCHEMA = """
+CREATE TABLE term (id INTEGER PRIMARY KEY, ref TEXT NOT NULL UNIQUE, iri TEXT);
+CREATE TABLE class (id INTEGER PRIMARY KEY REFERENCES term (id), pref_label TEXT);
+CREATE TABLE property (id INTEGER PRIMARY KEY REFERENCES term (id), type TEXT NOT NULL);
+CREATE TABLE subclass_of (
+    class_id INTEGER NOT NULL REFERENCES term (id),
+    superclass_id INTEGER NOT NULL REFERENCES term (id),
+    PRIMARY KEY (class_id, superclass_id)
+) WITHOUT ROWID;
+CREATE TABLE equivalent_class (
+    class_id INTEGER NOT NULL REFERENCES term (id),
+    equivalent_id INTEGER NOT NULL REFERENCES term (id),
+    PRIMARY KEY (class_id, equivalent_id)
+) WITHOUT ROWID;
+CREATE TABLE property_domain (
+    property_id INTEGER NOT NULL REFERENCES term (id),
+    class_id INTEGER NOT NULL REFERENCES term (id),
+    PRIMARY KEY (property_id, class_id)
+) WITHOUT ROWID;
+CREATE TABLE property_range (
+    property_id INTEGER NOT NULL REFERENCES term (id),
+    class_id INTEGER NOT NULL REFERENCES term (id),
+    PRIMARY KEY (property_id, class_id)
+) WITHOUT ROWID;
+CREATE TABLE restriction (
+    class_id INTEGER NOT NULL REFERENCES term (id),
+    property_id INTEGER NOT NULL REFERENCES term (id),
+    on_class_id INTEGER REFERENCES term (id),
+    min_card INTEGER,
+    max_card INTEGER
+);
+CREATE TABLE same_as (
+    term_id INTEGER NOT NULL REFERENCES term (id),
+    target_id INTEGER NOT NULL REFERENCES term (id),
+    PRIMARY KEY (term_id, target_id)
+) WITHOUT ROWID;
+CREATE TABLE comment (term_id INTEGER NOT NULL REFERENCES term (id), text TEXT NOT NULL);
+CREATE TABLE pattern (property_id INTEGER NOT NULL REFERENCES term (id), text TEXT NOT NULL);
+CREATE VIRTUAL TABLE comment_fts USING fts5 (text, content='comment', content_rowid='rowid');
+
+CREATE VIEW subclass_of_names (class, superclass) AS
+    SELECT c.ref, s.ref FROM subclass_of
+    JOIN term AS c ON c.id = class_id JOIN term AS s ON s.id = superclass_id;
+CREATE VIEW property_domain_names (property, domain) AS
+    SELECT p.ref, c.ref FROM property_domain
+    JOIN term AS p ON p.id = property_id JOIN term AS c ON c.id = class_id;
+CREATE VIEW property_range_names (property, range) AS
+    SELECT p.ref, c.ref FROM property_range
+    JOIN term AS p ON p.id = property_id JOIN term AS c ON c.id = class_id;
+"""
+
+# Indexes for lookups in the reverse direction of the primary keys, built after the rows are written
+SQLITE_INDEXES = """
+CREATE INDEX subclass_of_superclass ON subclass_of (superclass_id, class_id);
+CREATE INDEX equivalent_class_equivalent ON equivalent_class (equivalent_id, class_id);
+CREATE INDEX property_domain_class ON property_domain (class_id, property_id);
+CREATE INDEX property_range_class ON property_range (class_id, property_id);
+CREATE INDEX restriction_class ON restriction (class_id);
+CREATE INDEX restriction_property ON restriction (property_id);
+CREATE INDEX same_as_target ON same_as (target_id, term_id);
+CREATE INDEX comment_term ON comment (term_id);
+CREATE INDEX pattern_property ON pattern (property_id);
+"""
+
+# Columns of each table written by SqliteSink, in insertion order
+SQLITE_TABLE_COLUMNS = {
+    "class": 2,
+    "property": 2,
+    "subclass_of": 2,
+    "equivalent_class": 2,
+    "property_domain": 2,
+    "property_range": 2,
+    "restriction": 5,
+    "same_as": 2,
+    "comment": 2,
+    "pattern": 2,
+}
+
+
+class SqliteSink(OntologySink):
+    def __init__(self, filepath: str):
+        """Collects the rows of each table of the SQLite store from ontology events, and writes
+            the store when the traversal finishes, see SQLITE_SCHEMA. The store is written to a
+            temporary file, then moved to filepath, so that readers never see a partial store.
+            References to classes missing from the ontology are left out, as in the TTL file.
+            Comments and patterns are stored as their literal values, without the TTL escapes
+            or the space the TTL writer appends to comments.
+
+        Args:
+            filepath (str): Destination file.
+        """
+        self.filepath = filepath
+        self.writer = None
+        self.term_ids = {}
+        self.rows = {table: [] for table in SQLITE_TABLE_COLUMNS}
+        self.restrictions = {}
+        self.subject = None
+
+    def term(self, ref: str) -> int:
+        if ref not in self.term_ids:
+            self.term_ids[ref] = len(self.term_ids) + 1
+        return self.term_ids[ref]
+
+    def link(self, table: str, ref: str) -> None:
+        if ref != "":
+            self.rows[table].append((self.subject, self.term(ref)))
+
+    def start(self, open_ont_dict: dict) -> None:
+        self.writer = TripleWriter(generate_prefix_map(open_ont_dict))
+
+    def class_start(self, class_key: str, class_name: str) -> None:
+        self.subject = self.term(add_prefix(class_name))
+        self.rows["class"].append([self.subject, None])
+
+    def pref_label(self, label: str) -> None:
+        self.rows["class"][-1][1] = label
+
+    def comment(self, text: str) -> None:
+        self.rows["comment"].append((self.subject, unescape_ttl_string(text)))
+
+    def superclass(self, class_ref: str) -> None:
+        self.link("subclass_of", class_ref)
+
+    def restriction(
+        self, prop_ref: str, bound: str, cardinality, on_class_ref: str
+    ) -> None:
+        # The bounds of a property and onClass are sent as two events, and stored as one row
+        key = (
+            self.subject,
+            self.term(prop_ref),
+            self.term(on_class_ref) if on_class_ref else None,
+        )
+        if key not in self.restrictions:
+            self.restrictions[key] = [None, None]
+        self.restrictions[key][0 if bound == "min" else 1] = int(cardinality)
+
+    def sameas(self, link: str) -> None:
+        self.link("same_as", link)
+
+    def equivalent_class(self, class_ref: str) -> None:
+        self.link("equivalent_class", class_ref)
+
+    def property_start(
+        self, prop_key: str, prop_name: str, prop_type: PropType
+    ) -> None:
+        self.subject = self.term(add_prefix(prop_name))
+        self.rows["property"].append((self.subject, prop_type.value))
+
+    def property_domain(self, class_refs: list) -> None:
+        for class_ref in class_refs:
+            self.link("property_domain", class_ref)
+
+    def pattern(self, text: str) -> None:
+        self.rows["pattern"].append((self.subject, unescape_ttl_string(text)))
+
+    def property_range(self, class_refs: list) -> None:
+        for class_ref in class_refs:
+            self.link("property_range", class_ref)
+
+    def finish(self) -> None:
+        self.rows["restriction"] = [
+            key + tuple(bounds) for key, bounds in self.restrictions.items()
+        ]
+        term_rows = []
+        for ref, term_id in self.term_ids.items():
+            iri = self.writer.expand(ref)
+            term_rows.append((term_id, ref, iri[1:-1] if iri.startswith("<") else None))
+
+        tmp_filepath = self.filepath + ".tmp"
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        connection = sqlite3.connect(tmp_filepath)
+        try:
+            # The file is only moved into place once complete, so it needs no journal
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            connection.executescript(SQLITE_SCHEMA)
+            with connection:
+                connection.executemany("INSERT INTO term VALUES (?, ?, ?)", term_rows)
+                for table, num_columns in SQLITE_TABLE_COLUMNS.items():
+                    connection.executemany(
+                        "INSERT OR IGNORE INTO {} VALUES ({})".format(
+                            table, ", ".join(["?"] * num_columns)
+                        ),
+                        self.rows[table],
+                    )
+                connection.execute(
+                    "INSERT INTO comment_fts (comment_fts) VALUES ('rebuild')"
+                )
+            connection.executescript(SQLITE_INDEXES)
+            connection.execute("ANALYZE")
+            connection.execute("PRAGMA user_version = {}".format(SQLITE_STORE_VERSION))
+        finally:
+            connection.close()
+        os.replace(tmp_filepath, self.filepath)
+        self.rows = {table: [] for table in SQLITE_TABLE_COLUMNS}
+        self.restrictions = {}
+
+
+def write_sqlite(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    filepath: str,
+) -> None:
+    """Write the ontology to a SQLite store, see SqliteSink
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        filepath (str): Destination file.
+    """
+    emit_ontology(
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
+        open_ont_dict,
+        [SqliteSink(filepath)],
+    )
+
+
+def open_sqlite_store(filepath: str) -> sqlite3.Connection:
+    """Open a SQLite store read-only. The file is opened as immutable, without locks, so that
+        any number of processes can share it; it should be replaced, not written to, while open.
+
+    Args:
+        filepath (str): Path to the store.
+
+    Returns:
+        sqlite3.Connection: Read-only connection.
+    """
+    uri = Path(filepath).resolve().as_uri() + "?mode=ro&immutable=1"
+    connection = sqlite3.connect(uri, uri=True)
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != SQLITE_STORE_VERSION:
+        connection.close()
+        raise ValueError("File does not hold a SQLite store of this version")
+    return connection
@@ -1,7 +1,14 @@
 import regex as re
+from functools import lru_cache
 from nltk.tokenize import word_tokenize
 
+# Size of the per-process caches of normalized names.
+# Names repeat heavily within and across schema directories, so the
+# name-normalizing functions below are memoized.
+NAME_CACHE_SIZE = 1 << 16
 
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def strip_whitespace(name: str) -> str:
     """Remove any instance of whitespace from a string
     Args:
@@ -16,6 +23,7 @@ def remove_punctuation(name: str) -> str:
     return re.sub("\.", "", name)
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def process_name(name: str) -> str:
     """Removes asterisks and periods from a string, to be formatted as a name for a class or property.
     Args:
@@ -27,6 +35,7 @@ def process_name(name: str) -> str:
     return upper_split_camelcase(name)
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def process_prop_name(name: str) -> str:
     name = re.sub(r"\.", "", re.sub(r"\*", "", strip_whitespace(name)))
     return lower_split_camelcase(name)
@@ -78,6 +87,7 @@ def process_new_patterns(pattern: str) -> list:
     return new_patterns
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def lower_process_name(property_name: str) -> str:
     """_summary_
     Args:
@@ -88,6 +98,11 @@ def lower_process_name(property_name: str) -> str:
     return str.lower(process_name(property_name))
 
 
+CAMELCASE_PATTERN = re.compile(
+    "(?:[A-Z](?:[a-z]+|[A-Z]*(?=[A-Z]|$)))|[a-z]+|[A-Z]*(?=[A-Z]|$)"
+)
+
+
 def split_camelcase(name: str) -> list:
     """_summary_
     Args:
@@ -95,11 +110,10 @@ def split_camelcase(name: str) -> list:
     Returns:
         str: _description_
     """
-    return re.findall(
-        "(?:[A-Z](?:[a-z]+|[A-Z]*(?=[A-Z]|$)))|[a-z]+|[A-Z]*(?=[A-Z]|$)", name
-    )
+    return CAMELCASE_PATTERN.findall(name)
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def upper_split_camelcase(name: str) -> str:
     name_comps = split_camelcase(remove_punctuation(name))
     name_comps.remove("")
@@ -109,6 +123,7 @@ def upper_split_camelcase(name: str) -> str:
     return "".join(name_comps)
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def lower_split_camelcase(name: str) -> str:
     name_comps = split_camelcase(remove_punctuation(name))
     name_comps.remove("")
@@ -139,6 +154,7 @@ def extract_classname_from_kind(value: str) -> str:
     return classname
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def extract_classname_from_filename(value: str) -> str:
     class_name = re.search("([A-z]+)\.\d\.\d\.\d\.json", value)
     class_name = str(value) if class_name is None else "".join(class_name.groups())
@@ -1,9 +1,36 @@
+import hashlib
+import json
+import locale
+import multiprocessing
+import os
+import tempfile
 import regex as re
 from .kg_rep import *
 from .str_utils import *
 from .open_ont_config import *
+from .dag_utils import InheritanceDAG
+from .ref_index import rename_classes
+from .compress_utils import compression_codec, open_output
+from .external_sort import ExternalSorter
 import numpy as np
 
+# Size of the write buffer of the ttl file, in bytes
+TTL_WRITE_BUFFER_SIZE = 1 << 20
+
+# Minimum number of classes or properties rendered per task by parallel workers
+RENDER_CHUNK_SIZE = 64
+
+# Minimum length of a comment written once as a shared annotation resource, in the compact layout,
+# about the length of the link to the resource that replaces it
+SHARED_COMMENT_MIN_LENGTH = 40
+
+# Annotation property linking a class or property to a shared comment resource
+SHARED_COMMENT_PROPERTY = "osdu:sharedComment"
+
+# Block index written next to a ttl file by incremental writes, and its format version
+TTL_INDEX_SUFFIX = ".index.json"
+TTL_INDEX_VERSION = 1
+
 prefix_lines = """# baseURI: <https://w3id.org/osdu#>
 # imports: http://topbraid.org/schema/schema-single-range
 # imports: http://www.w3.org/2004/02/skos/core
@@ -38,7 +65,7 @@ prefix_lines = """# baseURI: <https://w3id.org/osdu#>
 
 """
 
-annotation_lines = """
+annotation_property_lines = """
 #################################################################
 #    Annotation properties
 #################################################################
@@ -58,26 +85,48 @@ xsd:pattern rdf:type owl:AnnotationProperty .
 ###  http://www.w3.org/2002/07/owl#minCardinality
 owl:minCardinality rdf:type owl:AnnotationProperty .
 
+"""
 
-<https://w3id.org/osdu#> rdf:type owl:Ontology ;
+# Declaration of an ontology, with its IRI, title, and owl:imports lines
+ontology_declaration_template = """
+<{iri}> rdf:type owl:Ontology ;
                           <http://purl.org/dc/elements/1.1/creator> "Neda Abolhassani, Ph.D."^^xsd:string ;
                           <http://purl.org/dc/elements/1.1/creator> "Ana Tudor, M.S."^^xsd:string ;
-                          <http://purl.org/dc/elements/1.1/title> "OSDU Ontology"^^xsd:string ;
-                          owl:imports rdf: ;
-                          owl:imports rdfs: ;
-                          owl:imports xsd: ;
-                          owl:imports owl: ;
-                          owl:imports skos: ;
-                          owl:imports time: ;
-                          owl:imports <http://www.w3.org/XML/1998/namespace> ;
-                          owl:imports <http://www.w3.org/ns/auth/acl> ;
-                          owl:imports <http://xmlns.com/foaf/0.1/> ;
-                          owl:imports foaf: ;
-                          owl:imports <https://www.geonames.org/ontology/ontology_v3.3.rdf> ;
-                          owl:versionInfo "Version 1.0" ;
+                          <http://purl.org/dc/elements/1.1/title> "{title}"^^xsd:string ;
+{imports}                          owl:versionInfo "Version 1.0" ;
 .
 """
 
+# Vocabularies and open ontologies imported by the OSDU ontology
+STANDARD_IMPORTS = [
+    "rdf:",
+    "rdfs:",
+    "xsd:",
+    "owl:",
+    "skos:",
+    "time:",
+    "<http://www.w3.org/XML/1998/namespace>",
+    "<http://www.w3.org/ns/auth/acl>",
+    "<http://xmlns.com/foaf/0.1/>",
+    "foaf:",
+    "<https://www.geonames.org/ontology/ontology_v3.3.rdf>",
+]
+
+
+def render_ontology_declaration(iri: str, title: str, imports: list) -> str:
+    """Declaration of an ontology in TTL, importing each of a list of IRIs or prefixed names"""
+    import_lines = "".join(
+        "                          owl:imports " + ref + " ;\n" for ref in imports
+    )
+    return ontology_declaration_template.format(
+        iri=iri, title=title, imports=import_lines
+    )
+
+
+annotation_lines = annotation_property_lines + render_ontology_declaration(
+    "https://w3id.org/osdu#", "OSDU Ontology", STANDARD_IMPORTS
+)
+
 objectprops_header = """
 #################################################################
 #    Object Properties
@@ -96,248 +145,1239 @@ classes_header = """
 #################################################################
 """
 
+# Headers of the property sections of the ttl file, in output order
+PROPERTY_SECTION_HEADERS = {
+    PropType.Object: objectprops_header,
+    PropType.Datatype: dataprops_header,
+}
+
+
+# Classes renamed in the generated ontology, applied in order
+CLASS_RENAMES = {
+    "AbstractAccessControlList": "ACL",
+    "AbstractSystemProperties": "System",
+}
+
 
 def add_prefix(name: str) -> str:
     return "osdu:" + name
 
 
-def assemble_ttl(
+def finalize_ontology(
     class_ontology_dict: dict,
     prop_ontology_dict: dict,
-    url_to_classname_dict: dict,
     array_properties_dict: dict,
-    dest_filepath: str,
-    write_file: bool = True,
-) -> None:
-    """Use linked graph of ClassRep and PropertyRep objects,
-    as well as dictionary linking filename URLs to class names,
-    to assemble the OWL-based TTL file
+    open_ont_config: str = None,
+) -> dict:
+    """Apply the final changes to the linked graph of ClassRep and PropertyRep objects before output:
+        subclass links, System and ACL classes, organisation classes, removal of links to grandparents,
+        and links to open ontologies. The dictionaries are updated in place.
 
     Args:
         class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
         prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
-        url_to_classname_dict (dict): Dictionary mapping explored filename keys to OSDU class names.
-        dest_filepath (str): String specifying the filepath to which the ttl file should be output.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_config (str, optional): Filepath to an open ontology alignment config. Defaults to None,
+            for the bundled config.
+
+    Returns:
+        dict: Dictionary of open ontology alignments that were linked, keyed by ontology prefix.
     """
     # Add System and ACL classes
     class_ontology_dict, prop_ontology_dict = process_subclasses(
         class_ontology_dict, prop_ontology_dict
     )
-    class_ontology_dict, prop_ontology_dict = create_ACL(
-        class_ontology_dict, prop_ontology_dict
+    rename_classes(
+        CLASS_RENAMES, class_ontology_dict, prop_ontology_dict, array_properties_dict
     )
     class_ontology_dict, prop_ontology_dict = create_org_classes(
         class_ontology_dict, prop_ontology_dict
     )
-    class_ontology_dict, prop_ontology_dict = create_System(
-        class_ontology_dict, prop_ontology_dict
-    )
     class_ontology_dict, prop_ontology_dict = remove_links_to_grandparents(
         class_ontology_dict, prop_ontology_dict
     )
 
     # Link open ontologies
-    class_ontology_dict, prop_ontology_dict = link_to_open_onts(
-        class_ontology_dict, prop_ontology_dict
-    )
+    open_ont_dict = config_open_onts(open_ont_config)
+    link_to_open_onts(class_ontology_dict, prop_ontology_dict, open_ont_dict)
+    return open_ont_dict
 
-    # Prefixes and base URI for file
-    lines = [prefix_lines, annotation_lines, classes_header]
 
-    # Add classes
-    classkeys_list = list(class_ontology_dict.keys())
-    classnames = [class_ontology_dict[cname].name for cname in classkeys_list]
-    class_sort_idxs = np.argsort(classnames)
-
-    for idx in class_sort_idxs:
-        class_name = classkeys_list[idx]
-        class_rep = class_ontology_dict[class_name]
-        lines.append("###  https://w3id.org/osdu#" + class_rep.name)
-        lines.append(add_prefix(class_rep.name) + " rdf:type owl:Class ;")
-
-        if class_rep.pref_label != "":
-            lines.append('\tskos:prefLabel "' + class_rep.pref_label + '" ;')
-
-        if len(class_rep.comments) > 0:
-            for comment in class_rep.comments:
-                lines.append('\trdfs:comment "' + comment + ' " ;')
-        if len(class_rep.superclass_list) > 0:
-            for superclass in class_rep.superclass_list:
-                lines.append(
-                    "\trdfs:subClassOf "
-                    + reference_class(superclass, class_ontology_dict)
-                    + " ;"
-                )
+def assemble_ttl(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    url_to_classname_dict: dict,
+    array_properties_dict: dict,
+    dest_filepath: str,
+    write_file: bool = True,
+    open_ont_config: str = None,
+    finalize: bool = True,
+    filename: str = "osdu_draft.ttl",
+    jobs: int = 1,
+    incremental: bool = False,
+    sinks: list = None,
+    compress_level: int = None,
+    compact: bool = False,
+    shared_comments: bool = False,
+    max_memory: int = None,
+) -> None:
+    """Use linked graph of ClassRep and PropertyRep objects,
+    as well as dictionary linking filename URLs to class names,
+    to assemble the OWL-based TTL file
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        url_to_classname_dict (dict): Dictionary mapping explored filename keys to OSDU class names.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        dest_filepath (str): String specifying the filepath to which the ttl file should be output.
+        write_file (bool, optional): Whether to write the ttl file. Defaults to True.
+        open_ont_config (str, optional): Filepath to an open ontology alignment config. Defaults to None,
+            for the bundled config.
+        finalize (bool, optional): Whether to apply finalize_ontology first. Defaults to True;
+            set to False if the dictionaries were already finalized.
+        filename (str, optional): Name of the ttl file, appended to dest_filepath. Defaults to 'osdu_draft.ttl'.
+        jobs (int, optional): Number of worker processes rendering blocks. Defaults to 1, to render in this process.
+        incremental (bool, optional): Whether to reuse unchanged blocks of the previous ttl file,
+            see write_ttl_incremental. Defaults to False.
+        sinks (list, optional): Other OntologySink objects, fed by the traversal writing the ttl file.
+            Defaults to None.
+        compress_level (int, optional): Compression level if filename ends in .gz, .xz or .zst,
+            see open_compressed. Defaults to None.
+        compact (bool, optional): Whether to write the compact layout of CompactTtlSink. Defaults to False.
+        shared_comments (bool, optional): Whether to write long comments repeated across classes and
+            properties once, in the compact layout. Defaults to False.
+        max_memory (int, optional): Memory budget of the rendered blocks, in bytes, to sort them
+            on disk with write_ttl_external. Defaults to None, to sort in memory.
+    """
+    if finalize:
+        open_ont_dict = finalize_ontology(
+            class_ontology_dict,
+            prop_ontology_dict,
+            array_properties_dict,
+            open_ont_config,
+        )
+    else:
+        open_ont_dict = config_open_onts(open_ont_config)
+
+    if incremental and (compression_codec(filename) is not None):
+        print("Incremental writes need an uncompressed ttl file, writing every block")
+        incremental = False
+    if incremental and compact:
+        print("Incremental writes need the default ttl layout, writing every block")
+        incremental = False
+    if (max_memory is not None) and (compact or incremental):
+        print("Compact and incremental ttl files are sorted in memory")
+
+    if write_file and not incremental:
+        write_ttl(
+            class_ontology_dict,
+            prop_ontology_dict,
+            array_properties_dict,
+            open_ont_dict,
+            dest_filepath + filename,
+            jobs=jobs,
+            sinks=sinks,
+            compress_level=compress_level,
+            compact=compact,
+            shared_comments=shared_comments,
+            max_memory=max_memory,
+        )
+        return
+
+    if write_file:
+        write_ttl_incremental(
+            class_ontology_dict,
+            prop_ontology_dict,
+            array_properties_dict,
+            open_ont_dict,
+            dest_filepath + filename,
+            sinks=sinks,
+        )
+    elif sinks:
+        emit_ontology(
+            class_ontology_dict,
+            prop_ontology_dict,
+            array_properties_dict,
+            open_ont_dict,
+            sinks,
+        )
+
+
+def write_ttl(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    filepath: str,
+    jobs: int = 1,
+    sinks: list = None,
+    compress_level: int = None,
+    compact: bool = False,
+    shared_comments: bool = False,
+    max_memory: int = None,
+) -> None:
+    """Write the TTL file block by block, as each block is rendered, to a buffered file,
+        so that only a few classes or properties are held in memory at a time.
+        A filepath ending in .gz, .xz or .zst is compressed as the blocks are written.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        filepath (str): Filepath of the ttl file.
+        jobs (int, optional): Number of worker processes rendering blocks. Defaults to 1, to render in this process.
+        sinks (list, optional): Other OntologySink objects, fed by the traversal rendering the file.
+            Defaults to None. With more than one job, or max_memory, they are fed in this process
+            from the keys of the blocks, in output order, as the blocks are written.
+        compress_level (int, optional): Compression level of a compressed file, see open_compressed.
+            Defaults to None.
+        compact (bool, optional): Whether to write the compact layout of CompactTtlSink, rendered
+            in this process whatever the number of jobs. Defaults to False.
+        shared_comments (bool, optional): Whether to write long comments repeated across classes and
+            properties once, see shared_comment_resources, in the compact layout. Defaults to False.
+        max_memory (int, optional): Memory budget of the rendered blocks, in bytes, to sort them on disk
+            with write_ttl_external, in this process. Defaults to None, to sort in memory.
+    """
+    sinks = sinks or []
+    if compact:
+        shared = None
+        if shared_comments:
+            shared = shared_comment_resources(class_ontology_dict, prop_ontology_dict)
+        emit_ontology(
+            class_ontology_dict,
+            prop_ontology_dict,
+            array_properties_dict,
+            open_ont_dict,
+            [CompactTtlSink(filepath, compress_level, shared)] + sinks,
+        )
+        return
+    if max_memory is not None:
+        write_ttl_external(
+            class_ontology_dict,
+            prop_ontology_dict,
+            array_properties_dict,
+            open_ont_dict,
+            filepath,
+            max_memory,
+            compress_level=compress_level,
+            sinks=sinks,
+        )
+    elif jobs <= 1:
+        emit_ontology(
+            class_ontology_dict,
+            prop_ontology_dict,
+            array_properties_dict,
+            open_ont_dict,
+            [TtlSink(filepath, compress_level=compress_level)] + sinks,
+        )
+    else:
+        with open_output(
+            filepath, compress_level, buffering=TTL_WRITE_BUFFER_SIZE
+        ) as f:
+            for block in generate_ttl_blocks(
+                class_ontology_dict,
+                prop_ontology_dict,
+                array_properties_dict,
+                open_ont_dict,
+                jobs=jobs,
+                sinks=sinks,
+            ):
+                f.write(block)
+
+
+def write_ttl_external(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    filepath: str,
+    max_memory: int,
+    compress_level: int = None,
+    sinks: list = None,
+) -> int:
+    """Write the TTL file with a memory budget for sorting, as an external merge sort: blocks are
+        rendered in dictionary order, spilled to sorted runs on disk whenever the buffered blocks
+        reach max_memory, and the runs are k-way merged into the file, see ExternalSorter.
+        The output is the same as that of write_ttl. Run files are kept in a temporary directory
+        next to the ttl file, rather than in a temporary directory that may be held in memory.
+        Sinks are fed the events of each block as the merged blocks are written, in output order.
 
-        if class_name in array_properties_dict:
-            for rest_prop in array_properties_dict[class_name]:
-                """
-                  [ a owl:Restriction ;
-                  owl:onProperty :works_on;
-                  owl:maxQualifiedCardinality "3"^^xsd:nonNegativeInteger ;
-                  owl:onClass :Project
-                ] .
-                """
-                lines.append("\trdfs:subClassOf [\n\t\ta owl:Restriction ;")
-                lines.append(
-                    "\t\towl:onProperty " + add_prefix(rest_prop["prop_name"]) + " ;"
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        filepath (str): Filepath of the ttl file.
+        max_memory (int): Memory budget of the buffered blocks, in bytes.
+        compress_level (int, optional): Compression level of a compressed file, see open_compressed.
+            Defaults to None.
+        sinks (list, optional): Other OntologySink objects. Defaults to None.
+
+    Returns:
+        int: Number of sorted runs spilled to disk, or 0 if the blocks were sorted in memory.
+    """
+    # Blocks are sorted by section (classes, then each property section), name, and dictionary order
+    section_headers = [None] + list(PROPERTY_SECTION_HEADERS.values())
+    section_types = [None] + list(PROPERTY_SECTION_HEADERS)
+    section_of = {
+        prop_type: section + 1
+        for section, prop_type in enumerate(PROPERTY_SECTION_HEADERS)
+    }
+    render_dicts = (class_ontology_dict, prop_ontology_dict, array_properties_dict)
+    # Keys of the blocks by kind and dictionary order, to send the events of each merged block
+    block_keys = [list(class_ontology_dict), list(prop_ontology_dict)]
+    sink = SinkGroup(sinks or [])
+
+    with tempfile.TemporaryDirectory(
+        dir=os.path.dirname(os.path.abspath(filepath))
+    ) as tmp_dir:
+        sorter = ExternalSorter(max_memory, tmp_dir)
+        for order, (class_name, class_rep) in enumerate(class_ontology_dict.items()):
+            sorter.add(
+                (0, class_rep.name, order),
+                render_block("class", class_name, *render_dicts),
+            )
+        for order, (prop_name, prop_rep) in enumerate(prop_ontology_dict.items()):
+            if prop_rep.type in section_of:
+                sorter.add(
+                    (section_of[prop_rep.type], prop_rep.name, order),
+                    render_block("property", prop_name, *render_dicts),
                 )
-                if "on_class" in rest_prop:
-                    lines.append(
-                        '\t\towl:minQualifiedCardinality "{}"^^xsd:nonNegativeInteger ;'.format(
-                            rest_prop["min_card"]
-                        )
-                    )
-                    lines.append(
-                        "\t\towl:onClass "
-                        + reference_class(rest_prop["on_class"], class_ontology_dict)
-                        + " ;"
+
+        with open_output(
+            filepath, compress_level, buffering=TTL_WRITE_BUFFER_SIZE
+        ) as f:
+            sink.start(open_ont_dict)
+            f.write(render_header_block(open_ont_dict))
+            section = 0
+            for (block_section, _, order), block in sorter.sorted_records():
+                # Every section header is written, including those of empty sections
+                while section < block_section:
+                    section += 1
+                    f.write(join_lines([section_headers[section]]))
+                    sink.section_start(section_types[section])
+                f.write(block)
+                if block_section == 0:
+                    key = block_keys[0][order]
+                    emit_class_events(
+                        key, class_ontology_dict, array_properties_dict, sink
                     )
                 else:
-                    lines.append(
-                        '\t\towl:minCardinality "{}"^^xsd:nonNegativeInteger ;'.format(
-                            rest_prop["min_card"]
-                        )
+                    key = block_keys[1][order]
+                    emit_property_events(
+                        key, prop_ontology_dict, class_ontology_dict, sink
                     )
-                lines.append("\t] ;")
+            while section < len(section_headers) - 1:
+                section += 1
+                f.write(join_lines([section_headers[section]]))
+                sink.section_start(section_types[section])
+            sink.finish()
+    return sorter.num_spilled_runs
 
-        if class_rep.sameas != []:
-            for link in class_rep.sameas:
-                lines.append("\towl:sameAs " + link + " ;")
 
-        lines.append(".\n")
+def write_ttl_incremental(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    filepath: str,
+    sinks: list = None,
+) -> tuple:
+    """Write the TTL file, reusing the blocks of the previous file whose content did not change.
+        A block index, saved next to the file, records for each class and property block a digest
+        of everything its rendering depends on, and its byte span in the file. Blocks with the same
+        digest as in the index are copied from the previous file instead of being rendered again.
+        The output is the same as that of write_ttl. If the index is missing, or the file changed
+        since the index was written, every block is rendered. Sinks are fed the events of every
+        block, reused or rendered, as it is written.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        filepath (str): Filepath of the ttl file.
+        sinks (list, optional): Other OntologySink objects. Defaults to None.
 
-    # Add properties
+    Returns:
+        tuple: Number of class and property blocks reused, and number rendered.
+    """
+    # Encode as a text mode file would
+    encoding = locale.getpreferredencoding(False)
+
+    def encode(text):
+        if os.linesep != "\n":
+            text = text.replace("\n", os.linesep)
+        return text.encode(encoding)
+
+    old_index = load_block_index(filepath)
+    if (old_index is not None) and (old_index["encoding"] != encoding):
+        old_index = None
+    old_file = open(filepath, "rb") if old_index is not None else None
+    old_blocks = old_index["blocks"] if old_index is not None else {}
+
+    render_dicts = (class_ontology_dict, prop_ontology_dict, array_properties_dict)
+    sink = SinkGroup(sinks or [])
+    blocks = {"class": {}, "property": {}}
+    num_reused = 0
+    num_rendered = 0
+    offset = 0
+    with open(filepath + ".tmp", "wb", buffering=TTL_WRITE_BUFFER_SIZE) as f:
+        sink.start(open_ont_dict)
+        offset += f.write(encode(render_header_block(open_ont_dict)))
+        for kind, task in ttl_block_tasks(class_ontology_dict, prop_ontology_dict):
+            if sinks:
+                emit_task_events(kind, task, *render_dicts, sink)
+            if kind == "header":
+                offset += f.write(encode(join_lines([task])))
+                continue
+            for key in task:
+                digest = block_digest(kind, key, *render_dicts)
+                old_block = old_blocks.get(kind, {}).get(key)
+                if (old_block is not None) and (old_block[0] == digest):
+                    old_file.seek(old_block[1])
+                    data = old_file.read(old_block[2])
+                    num_reused += 1
+                else:
+                    data = encode(render_block(kind, key, *render_dicts))
+                    num_rendered += 1
+                blocks[kind][key] = [digest, offset, len(data)]
+                offset += f.write(data)
+        sink.finish()
+
+    if old_file is not None:
+        old_file.close()
+    os.replace(filepath + ".tmp", filepath)
+
+    file_stat = os.stat(filepath)
+    with open(filepath + TTL_INDEX_SUFFIX, "w", encoding="utf-8") as fp:
+        json.dump(
+            {
+                "version": TTL_INDEX_VERSION,
+                "encoding": encoding,
+                "file_size": file_stat.st_size,
+                "file_mtime_ns": file_stat.st_mtime_ns,
+                "blocks": blocks,
+            },
+            fp,
+        )
+
+    print(
+        "Reused {} of {} blocks, rendered {}".format(
+            num_reused, num_reused + num_rendered, num_rendered
+        )
+    )
+    return num_reused, num_rendered
+
+
+def load_block_index(filepath: str) -> dict:
+    """Load the block index of a ttl file, if it was written with the file in its current state
+
+    Args:
+        filepath (str): Filepath of the ttl file.
+
+    Returns:
+        dict: Block index, or None if there is no valid index for the file.
+    """
+    index_path = filepath + TTL_INDEX_SUFFIX
+    if not (os.path.exists(filepath) and os.path.exists(index_path)):
+        return None
+    try:
+        with open(index_path, "r", encoding="utf-8") as fp:
+            index = json.load(fp)
+    except ValueError:
+        return None
+
+    file_stat = os.stat(filepath)
+    if (
+        (index.get("version") != TTL_INDEX_VERSION)
+        or (index.get("file_size") != file_stat.st_size)
+        or (index.get("file_mtime_ns") != file_stat.st_mtime_ns)
+    ):
+        return None
+    return index
+
+
+def block_digest(
+    kind: str,
+    key: str,
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+) -> str:
+    """Digest of everything the rendering of a class or property block depends on:
+    the fields of the ClassRep or PropertyRep, the restrictions of a class,
+    and how each referenced class resolves against the class dictionary.
+    """
+    if kind == "class":
+        class_rep = class_ontology_dict[key]
+        rest_props = array_properties_dict.get(key, [])
+        references = (
+            class_rep.superclass_list
+            + [rest_prop.get("on_class", "") for rest_prop in rest_props]
+            + class_rep.equivalent_list
+        )
+        content = [
+            class_rep.name,
+            class_rep.pref_label,
+            class_rep.comments,
+            class_rep.superclass_list,
+            rest_props,
+            class_rep.sameas,
+            class_rep.equivalent_list,
+        ]
+    else:
+        prop_rep = prop_ontology_dict[key]
+        references = prop_rep.range
+        content = [
+            prop_rep.name,
+            prop_rep.type.value,
+            prop_rep.comments,
+            prop_rep.domain,
+            prop_rep.patterns,
+            prop_rep.range,
+            prop_rep.sameas,
+        ]
+    content.append([reference_class(name, class_ontology_dict) for name in references])
+    return hashlib.blake2b(
+        json.dumps(content, separators=(",", ":")).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def generate_ttl_blocks(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    jobs: int = 1,
+    sinks: list = None,
+):
+    """Render the TTL file lazily, in output order: the header, one block per class sorted by name,
+        then the object and datatype property sections, each a header followed by one block per property.
+
+        With more than one job, the sorted keys are cut into contiguous chunks rendered by a pool of
+        worker processes, and the rendered chunks are yielded in order, giving the same text.
+        Sinks are fed the events of each block or chunk of blocks in this process, as it is yielded.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        jobs (int, optional): Number of worker processes. Defaults to 1, to render in this process.
+        sinks (list, optional): Other OntologySink objects. Defaults to None.
+
+    Yields:
+        str: Text of the next block or chunk of blocks, ending in a newline.
+    """
+    render_dicts = (class_ontology_dict, prop_ontology_dict, array_properties_dict)
+    sink = SinkGroup(sinks or [])
+    sink.start(open_ont_dict)
+
+    # Prefixes and base URI for file
+    yield render_header_block(open_ont_dict)
+
+    tasks = ttl_block_tasks(class_ontology_dict, prop_ontology_dict)
+
+    if jobs <= 1:
+        for kind, task in tasks:
+            if sinks:
+                emit_task_events(kind, task, *render_dicts, sink)
+            if kind == "header":
+                yield join_lines([task])
+            else:
+                for key in task:
+                    yield render_block(kind, key, *render_dicts)
+        sink.finish()
+        return
+
+    chunk_tasks = []
+    for kind, task in tasks:
+        if kind == "header":
+            chunk_tasks.append((kind, task))
+            continue
+        chunk_size = max(RENDER_CHUNK_SIZE, -(-len(task) // (jobs * 4)))
+        for start in range(0, len(task), chunk_size):
+            chunk_tasks.append((kind, task[start : start + chunk_size]))
+
+    with multiprocessing.Pool(
+        jobs,
+        initializer=_init_render_worker,
+        initargs=(class_ontology_dict, prop_ontology_dict, array_properties_dict),
+    ) as pool:
+        for (kind, task), text in zip(
+            chunk_tasks, pool.imap(_render_chunk, chunk_tasks)
+        ):
+            if sinks:
+                emit_task_events(kind, task, *render_dicts, sink)
+            yield text
+    sink.finish()
+
+
+# Dictionaries rendered by a worker process of generate_ttl_blocks
+_RENDER_DICTS = None
+
+
+def _init_render_worker(class_ontology_dict, prop_ontology_dict, array_properties_dict):
+    global _RENDER_DICTS
+    _RENDER_DICTS = (class_ontology_dict, prop_ontology_dict, array_properties_dict)
+
+
+def _render_chunk(chunk_task: tuple) -> str:
+    kind, task = chunk_task
+    if kind == "header":
+        return join_lines([task])
+    return "".join(render_block(kind, key, *_RENDER_DICTS) for key in task)
+
+
+def render_block(
+    kind: str,
+    key: str,
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+) -> str:
+    """Render the TTL block of a class (kind 'class') or a property (kind 'property')"""
+    sink = TtlSink()
+    if kind == "class":
+        emit_class_events(key, class_ontology_dict, array_properties_dict, sink)
+    else:
+        emit_property_events(key, prop_ontology_dict, class_ontology_dict, sink)
+    return "".join(sink.blocks)
+
+
+def render_header_block(open_ont_dict: dict) -> str:
+    return join_lines(
+        [
+            prefix_lines + generate_open_ont_prefix_lines(open_ont_dict),
+            annotation_lines,
+            classes_header,
+        ]
+    )
+
+
+def ttl_block_tasks(class_ontology_dict: dict, prop_ontology_dict: dict) -> list:
+    """Blocks following the header of the TTL file, in output order
+
+    Returns:
+        list: (kind, value) pairs: ("class", sorted class keys), then for each property section
+            ("header", section header text) and ("property", sorted property keys).
+    """
+    tasks = [("class", sorted_class_keys(class_ontology_dict))]
+    for prop_type, propkeys_list in sorted_property_sections(prop_ontology_dict):
+        tasks.append(("header", PROPERTY_SECTION_HEADERS[prop_type]))
+        tasks.append(("property", propkeys_list))
+    return tasks
+
+
+def join_lines(lines: list) -> str:
+    return "".join(f"{line}\n" for line in lines)
+
+
+def sorted_class_keys(class_ontology_dict: dict) -> list:
+    """Keys of the class dictionary in output order, sorted by class name, then by dictionary order"""
+    classkeys_list = list(class_ontology_dict.keys())
+    classnames = [class_ontology_dict[cname].name for cname in classkeys_list]
+    class_sort_idxs = np.argsort(classnames, kind="stable")
+    return [classkeys_list[idx] for idx in class_sort_idxs]
+
+
+def sorted_property_sections(prop_ontology_dict: dict) -> list:
+    """Property sections in output order: object properties then datatype properties,
+        each sorted by property name, then by dictionary order
+
+    Returns:
+        list: (property type, list of property keys) pairs.
+    """
     propkeys_list = list(prop_ontology_dict.keys())
 
-    datapropkeys_list = [
-        propkey
-        for propkey in propkeys_list
-        if (prop_ontology_dict[propkey].type == PropType.Datatype)
-    ]
-    dataprop_names = [prop_ontology_dict[propkey].name for propkey in datapropkeys_list]
-    dataprop_sort_idxs = np.argsort(dataprop_names)
-
-    dataprop_dict = {
-        "idxs": dataprop_sort_idxs,
-        "keys_list": datapropkeys_list,
-        "header": dataprops_header,
-    }
+    sections = []
+    for prop_type in PROPERTY_SECTION_HEADERS:
+        typed_keys_list = [
+            propkey
+            for propkey in propkeys_list
+            if (prop_ontology_dict[propkey].type == prop_type)
+        ]
+        typed_names = [prop_ontology_dict[propkey].name for propkey in typed_keys_list]
+        sort_idxs = np.argsort(typed_names, kind="stable")
+        sections.append((prop_type, [typed_keys_list[idx] for idx in sort_idxs]))
+    return sections
+
+
+class OntologySink:
+    """Consumer of the events of one traversal of the ontology by emit_ontology.
+    Events are methods, called in the order of the TTL file:
+        start(open_ont_dict),
+        for each class: class_start(class_key, class_name), pref_label(label), comment(text),
+            superclass(class_ref), restriction(prop_ref, bound, cardinality, on_class_ref),
+            sameas(link), equivalent_class(class_ref), class_end(),
+        for each property section: section_start(prop_type), then for each property:
+            property_start(prop_key, prop_name, prop_type), comment(text), property_domain(class_refs),
+            pattern(text), property_range(class_refs), sameas(link), property_end(),
+        finish().
+    Events between the start and end of a class or property are each sent zero or more times.
+    References are written as in the TTL file, e.g. 'osdu:Well' or 'xsd:string', or '' for a class
+    missing from the ontology. The restriction on_class_ref is None for unqualified cardinalities.
+    Every event does nothing here, so that sinks only define the events they use.
+    """
 
-    objectpropkeys_list = [
-        propkey
-        for propkey in propkeys_list
-        if (prop_ontology_dict[propkey].type == PropType.Object)
-    ]
-    objectprop_names = [
-        prop_ontology_dict[propkey].name for propkey in objectpropkeys_list
-    ]
-    objectprop_sort_idxs = np.argsort(objectprop_names)
-
-    objectprop_dict = {
-        "idxs": objectprop_sort_idxs,
-        "keys_list": objectpropkeys_list,
-        "header": objectprops_header,
-    }
+    def start(self, open_ont_dict: dict) -> None:
+        pass
+
+    def class_start(self, class_key: str, class_name: str) -> None:
+        pass
+
+    def pref_label(self, label: str) -> None:
+        pass
+
+    def comment(self, text: str) -> None:
+        pass
+
+    def superclass(self, class_ref: str) -> None:
+        pass
+
+    def restriction(
+        self, prop_ref: str, bound: str, cardinality, on_class_ref: str
+    ) -> None:
+        pass
+
+    def sameas(self, link: str) -> None:
+        pass
+
+    def equivalent_class(self, class_ref: str) -> None:
+        pass
+
+    def class_end(self) -> None:
+        pass
+
+    def section_start(self, prop_type: PropType) -> None:
+        pass
+
+    def property_start(
+        self, prop_key: str, prop_name: str, prop_type: PropType
+    ) -> None:
+        pass
+
+    def property_domain(self, class_refs: list) -> None:
+        pass
+
+    def pattern(self, text: str) -> None:
+        pass
+
+    def property_range(self, class_refs: list) -> None:
+        pass
+
+    def property_end(self) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+class SinkGroup:
+    def __init__(self, sinks: list):
+        """Passes each ontology event on to a list of sinks, in order
+
+        Args:
+            sinks (list): OntologySink objects.
+        """
+        self.sinks = sinks
 
-    propdicts = [objectprop_dict, dataprop_dict]
+    def __getattr__(self, event: str):
+        # Build the dispatcher of an event on first use, and keep it as an attribute
+        handlers = [getattr(sink, event) for sink in self.sinks]
 
-    for propdict in propdicts:
-        propkeys_list = propdict["keys_list"]
-        prop_sort_idxs = propdict["idxs"]
-        lines.append(propdict["header"])
-        for idx in prop_sort_idxs:
-            prop_name = propkeys_list[idx]
-            prop_rep = prop_ontology_dict[prop_name]
+        def dispatch(*args):
+            for handler in handlers:
+                handler(*args)
 
-            # Check if property name already taken by a class name
-            # if upper_split_camelcase(prop_rep.name) in class_ontology_dict:
-            #     prop_rep.name = prop_rep.name + 'Property'
+        if len(handlers) == 1:
+            dispatch = handlers[0]
+        setattr(self, event, dispatch)
+        return dispatch
 
-            lines.append("###  https://w3id.org/osdu#" + prop_rep.name)
-            lines.append(
-                add_prefix(prop_rep.name) + " rdf:type " + prop_rep.type.value + " ;"
+
+def emit_ontology(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    open_ont_dict: dict,
+    sinks: list,
+) -> None:
+    """Traverse the ontology once, in the order of the TTL file, sending each event to every sink,
+        so that any number of outputs are built without sorting or walking the dictionaries again.
+        See OntologySink for the events.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        open_ont_dict (dict): Dictionary of open ontology alignments, keyed by ontology prefix.
+        sinks (list): OntologySink objects.
+    """
+    sink = SinkGroup(sinks)
+    sink.start(open_ont_dict)
+    for class_name in sorted_class_keys(class_ontology_dict):
+        emit_class_events(class_name, class_ontology_dict, array_properties_dict, sink)
+    for prop_type, propkeys_list in sorted_property_sections(prop_ontology_dict):
+        sink.section_start(prop_type)
+        for prop_name in propkeys_list:
+            emit_property_events(
+                prop_name, prop_ontology_dict, class_ontology_dict, sink
             )
+    sink.finish()
 
-            # Add comments
-            for comment in prop_rep.comments:
-                lines.append('\trdfs:comment "' + comment + ' " ;')
-
-            # Add domain
-            if len(prop_rep.domain) > 1:
-                lines.append("\trdfs:domain [")
-                lines.append("\t\trdf:type owl:Class ;")
-                lines.append("\t\towl:unionOf (")
-
-                for domain in prop_rep.domain:
-                    lines.append("\t\t\tosdu:" + domain)
-                lines.append("\t\t) ;")
-                lines.append("\t] ;")
-            elif len(prop_rep.domain) > 0:
-                for domain in prop_rep.domain:
-                    lines.append("\trdfs:domain " + add_prefix(domain) + " ;")
-            # Add patterns for range
-            for pattern in prop_rep.patterns:
-                lines.append('\trdfs:pattern "' + pattern + '" ;')
-
-            # Add range
-            if len(prop_rep.range) > 1:
-                lines.append("\t rdfs:range [")
-                lines.append("\t\trdf:type owl:Class ;")
-                lines.append("\t\towl:unionOf (")
-
-                for range_name in prop_rep.range:
-                    lines.append(
-                        "\t\t\t" + reference_class(range_name, class_ontology_dict)
-                    )
-                lines.append("\t\t) ;")
-                lines.append("\t] ;")
-            elif len(prop_rep.range) == 1:
-                if prop_rep.range[0] == "":
-                    print("Issue!", prop_rep.name, prop_rep.domain)
-                lines.append(
-                    "\t"
-                    + generate_range_ttl_line(prop_rep.range[0], class_ontology_dict)
+
+def emit_class_events(
+    class_name: str,
+    class_ontology_dict: dict,
+    array_properties_dict: dict,
+    sink: OntologySink,
+) -> None:
+    """Send the events of one class, from class_start to class_end, to a sink
+
+    Args:
+        class_name (str): Key of the class in class_ontology_dict.
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        array_properties_dict (RestrictionStore): Cardinality restrictions on OSDU classes, indexed by class name.
+        sink (OntologySink): Sink, or SinkGroup, receiving the events.
+    """
+    class_rep = class_ontology_dict[class_name]
+    sink.class_start(class_name, class_rep.name)
+
+    if class_rep.pref_label != "":
+        sink.pref_label(class_rep.pref_label)
+    for comment in class_rep.comments:
+        sink.comment(comment)
+    for superclass in class_rep.superclass_list:
+        sink.superclass(reference_class(superclass, class_ontology_dict))
+
+    for rest_prop in array_properties_dict.get(class_name, []):
+        for bound, card_key in [("min", "min_card"), ("max", "max_card")]:
+            if card_key not in rest_prop:
+                continue
+            on_class_ref = None
+            if "on_class" in rest_prop:
+                on_class_ref = reference_class(
+                    rest_prop["on_class"], class_ontology_dict
                 )
+            sink.restriction(
+                add_prefix(rest_prop["prop_name"]),
+                bound,
+                rest_prop[card_key],
+                on_class_ref,
+            )
 
-            # Add sameAs link
-            if prop_rep.sameas != []:
-                for link in prop_rep.sameas:
-                    lines.append("\towl:sameAs " + link + " ;")
+    for link in class_rep.sameas:
+        sink.sameas(link)
+    for equivalent_class in class_rep.equivalent_list:
+        sink.equivalent_class(reference_class(equivalent_class, class_ontology_dict))
+    sink.class_end()
 
-            lines.append(".\n")
 
-    if write_file:
-        with open(dest_filepath + "osdu_draft.ttl", "w+") as f:
-            for line in lines:
-                f.write(f"{line}\n")
+def emit_property_events(
+    prop_name: str,
+    prop_ontology_dict: dict,
+    class_ontology_dict: dict,
+    sink: OntologySink,
+) -> None:
+    """Send the events of one property, from property_start to property_end, to a sink
+
+    Args:
+        prop_name (str): Key of the property in prop_ontology_dict.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        sink (OntologySink): Sink, or SinkGroup, receiving the events.
+    """
+    prop_rep = prop_ontology_dict[prop_name]
+    sink.property_start(prop_name, prop_rep.name, prop_rep.type)
+
+    for comment in prop_rep.comments:
+        sink.comment(comment)
+    if len(prop_rep.domain) > 0:
+        sink.property_domain([add_prefix(domain) for domain in prop_rep.domain])
+    for pattern in prop_rep.patterns:
+        sink.pattern(pattern)
+    if len(prop_rep.range) > 0:
+        if prop_rep.range == [""]:
+            print("Issue!", prop_rep.name, prop_rep.domain)
+        sink.property_range(
+            [
+                reference_class(range_name, class_ontology_dict)
+                for range_name in prop_rep.range
+            ]
+        )
+
+    for link in prop_rep.sameas:
+        sink.sameas(link)
+    sink.property_end()
+
+
+def emit_task_events(
+    kind: str,
+    task,
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    array_properties_dict: dict,
+    sink: OntologySink,
+) -> None:
+    """Send the events of a task of ttl_block_tasks to a sink: the start of a property section,
+    or the events of each class or property, as emit_ontology does
+    """
+    if kind == "header":
+        for prop_type, header in PROPERTY_SECTION_HEADERS.items():
+            if header == task:
+                sink.section_start(prop_type)
+    elif kind == "class":
+        for class_name in task:
+            emit_class_events(
+                class_name, class_ontology_dict, array_properties_dict, sink
+            )
+    else:
+        for prop_name in task:
+            emit_property_events(
+                prop_name, prop_ontology_dict, class_ontology_dict, sink
+            )
+
+
+class TtlSink(OntologySink):
+    def __init__(self, filepath: str = None, compress_level: int = None):
+        """Renders the TTL file from ontology events, one block per class or property.
+
+        Args:
+            filepath (str, optional): Filepath of the ttl file, opened by the start event and written
+                through a buffer, or compressed if it ends in .gz, .xz or .zst. Defaults to None,
+                to keep the rendered text in self.blocks.
+            compress_level (int, optional): Compression level of a compressed file, see open_compressed.
+                Defaults to None.
+        """
+        self.filepath = filepath
+        self.compress_level = compress_level
+        self.file = None
+        self.blocks = []
+        self.write = self.blocks.append
+        self.lines = []
+
+    def start(self, open_ont_dict: dict) -> None:
+        if self.filepath is not None:
+            self.file = open_output(
+                self.filepath, self.compress_level, buffering=TTL_WRITE_BUFFER_SIZE
+            )
+            self.write = self.file.write
+        self.write(self.render_header(open_ont_dict))
+
+    def render_header(self, open_ont_dict: dict) -> str:
+        return render_header_block(open_ont_dict)
+
+    def end_block(self) -> None:
+        self.lines.append(".\n")
+        self.write(join_lines(self.lines))
+        self.lines = []
+
+    def class_start(self, class_key: str, class_name: str) -> None:
+        self.lines.append("###  https://w3id.org/osdu#" + class_name)
+        self.lines.append(add_prefix(class_name) + " rdf:type owl:Class ;")
+
+    def pref_label(self, label: str) -> None:
+        self.lines.append('\tskos:prefLabel "' + label + '" ;')
+
+    def comment(self, text: str) -> None:
+        self.lines.append('\trdfs:comment "' + text + ' " ;')
+
+    def superclass(self, class_ref: str) -> None:
+        self.lines.append("\trdfs:subClassOf " + class_ref + " ;")
+
+    def restriction(
+        self, prop_ref: str, bound: str, cardinality, on_class_ref: str
+    ) -> None:
+        # e.g. [ a owl:Restriction ; owl:onProperty :works_on ;
+        #        owl:maxQualifiedCardinality "3"^^xsd:nonNegativeInteger ; owl:onClass :Project ]
+        self.lines.append("\trdfs:subClassOf [\n\t\ta owl:Restriction ;")
+        self.lines.append("\t\towl:onProperty " + prop_ref + " ;")
+        if on_class_ref is not None:
+            self.lines.append(
+                '\t\towl:{}QualifiedCardinality "{}"^^xsd:nonNegativeInteger ;'.format(
+                    bound, cardinality
+                )
+            )
+            self.lines.append("\t\towl:onClass " + on_class_ref + " ;")
+        else:
+            self.lines.append(
+                '\t\towl:{}Cardinality "{}"^^xsd:nonNegativeInteger ;'.format(
+                    bound, cardinality
+                )
+            )
+        self.lines.append("\t] ;")
+
+    def sameas(self, link: str) -> None:
+        self.lines.append("\towl:sameAs " + link + " ;")
+
+    def equivalent_class(self, class_ref: str) -> None:
+        self.lines.append("\towl:equivalentClass " + class_ref + " ;")
+
+    def class_end(self) -> None:
+        self.end_block()
+
+    def section_start(self, prop_type: PropType) -> None:
+        self.write(join_lines([PROPERTY_SECTION_HEADERS[prop_type]]))
+
+    def property_start(
+        self, prop_key: str, prop_name: str, prop_type: PropType
+    ) -> None:
+        self.lines.append("###  https://w3id.org/osdu#" + prop_name)
+        self.lines.append(add_prefix(prop_name) + " rdf:type " + prop_type.value + " ;")
+
+    def property_domain(self, class_refs: list) -> None:
+        if len(class_refs) > 1:
+            self.lines.append("\trdfs:domain [")
+            self.lines.append("\t\trdf:type owl:Class ;")
+            self.lines.append("\t\towl:unionOf (")
+            for class_ref in class_refs:
+                self.lines.append("\t\t\t" + class_ref)
+            self.lines.append("\t\t) ;")
+            self.lines.append("\t] ;")
+        else:
+            self.lines.append("\trdfs:domain " + class_refs[0] + " ;")
+
+    def pattern(self, text: str) -> None:
+        self.lines.append('\trdfs:pattern "' + text + '" ;')
+
+    def property_range(self, class_refs: list) -> None:
+        if len(class_refs) > 1:
+            self.lines.append("\t rdfs:range [")
+            self.lines.append("\t\trdf:type owl:Class ;")
+            self.lines.append("\t\towl:unionOf (")
+            for class_ref in class_refs:
+                self.lines.append("\t\t\t" + class_ref)
+            self.lines.append("\t\t) ;")
+            self.lines.append("\t] ;")
+        elif class_refs[0] != "":
+            self.lines.append("\trdfs:range " + class_refs[0] + " ;")
+        else:
+            self.lines.append("\t")
+
+    def property_end(self) -> None:
+        self.end_block()
+
+    def finish(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class CompactTtlSink(TtlSink):
+    def __init__(
+        self,
+        filepath: str = None,
+        compress_level: int = None,
+        shared_comments: dict = None,
+    ):
+        """Renders the TTL file in a compact layout, one line per class or property, without banners,
+            section headers or indentation, and with the objects of each predicate in one list.
+            The file parses to the same triples as that of TtlSink, except for shared comments.
+
+        Args:
+            filepath (str, optional): Filepath of the ttl file, as for TtlSink. Defaults to None,
+                to keep the rendered text in self.blocks.
+            compress_level (int, optional): Compression level of a compressed file, see open_compressed.
+                Defaults to None.
+            shared_comments (dict, optional): Comments written once, as shared annotation resources, mapped
+                to the name of their resource, as returned by shared_comment_resources. Classes and properties
+                link to them with SHARED_COMMENT_PROPERTY instead of rdfs:comment. Defaults to None.
+        """
+        super().__init__(filepath, compress_level)
+        self.shared_comments = shared_comments or {}
+        self.subject = None
+        # Objects of each predicate of the current block, in the order of first use
+        self.objects = {}
+
+    def render_header(self, open_ont_dict: dict) -> str:
+        lines = minify_ttl(
+            prefix_lines
+            + generate_open_ont_prefix_lines(open_ont_dict)
+            + annotation_lines
+        )
+        if self.shared_comments:
+            lines.append(SHARED_COMMENT_PROPERTY + " rdf:type owl:AnnotationProperty .")
+            for text, resource in sorted(
+                self.shared_comments.items(), key=lambda item: item[1]
+            ):
+                lines.append(resource + ' rdfs:comment "' + text + ' " .')
+        return join_lines(lines)
+
+    def add(self, predicate: str, obj: str) -> None:
+        # Missing classes are referenced as '', and left out
+        if obj != "":
+            self.objects.setdefault(predicate, []).append(obj)
+
+    def end_block(self) -> None:
+        self.write(
+            self.subject
+            + " "
+            + ";".join(
+                predicate + " " + ",".join(objs)
+                for predicate, objs in self.objects.items()
+            )
+            + " .\n"
+        )
+        self.objects = {}
+
+    def union(self, class_refs: list) -> str:
+        return (
+            "[a owl:Class;owl:unionOf("
+            + " ".join(class_ref for class_ref in class_refs if class_ref != "")
+            + ")]"
+        )
+
+    def class_start(self, class_key: str, class_name: str) -> None:
+        self.subject = add_prefix(class_name)
+        self.add("a", "owl:Class")
+
+    def pref_label(self, label: str) -> None:
+        self.add("skos:prefLabel", '"' + label + '"')
+
+    def comment(self, text: str) -> None:
+        if text in self.shared_comments:
+            self.add(SHARED_COMMENT_PROPERTY, self.shared_comments[text])
+        else:
+            self.add("rdfs:comment", '"' + text + ' "')
+
+    def superclass(self, class_ref: str) -> None:
+        self.add("rdfs:subClassOf", class_ref)
+
+    def restriction(
+        self, prop_ref: str, bound: str, cardinality, on_class_ref: str
+    ) -> None:
+        # e.g. [a owl:Restriction;owl:onProperty osdu:works_on;
+        #       owl:maxQualifiedCardinality "3"^^xsd:nonNegativeInteger;owl:onClass osdu:Project]
+        restriction = "[a owl:Restriction;owl:onProperty " + prop_ref
+        if on_class_ref is not None:
+            restriction += (
+                ';owl:{}QualifiedCardinality "{}"^^xsd:nonNegativeInteger'.format(
+                    bound, cardinality
+                )
+            )
+            restriction += ";owl:onClass " + on_class_ref
+        else:
+            restriction += ';owl:{}Cardinality "{}"^^xsd:nonNegativeInteger'.format(
+                bound, cardinality
+            )
+        self.add("rdfs:subClassOf", restriction + "]")
+
+    def sameas(self, link: str) -> None:
+        self.add("owl:sameAs", link)
+
+    def equivalent_class(self, class_ref: str) -> None:
+        self.add("owl:equivalentClass", class_ref)
+
+    def section_start(self, prop_type: PropType) -> None:
+        pass
+
+    def property_start(
+        self, prop_key: str, prop_name: str, prop_type: PropType
+    ) -> None:
+        self.subject = add_prefix(prop_name)
+        self.add("a", prop_type.value)
+
+    def property_domain(self, class_refs: list) -> None:
+        if len(class_refs) > 1:
+            self.add("rdfs:domain", self.union(class_refs))
+        else:
+            self.add("rdfs:domain", class_refs[0])
+
+    def pattern(self, text: str) -> None:
+        self.add("rdfs:pattern", '"' + text + '"')
+
+    def property_range(self, class_refs: list) -> None:
+        if len(class_refs) > 1:
+            self.add("rdfs:range", self.union(class_refs))
+        else:
+            self.add("rdfs:range", class_refs[0])
+
+
+def minify_ttl(text: str) -> list:
+    """Statements of a TTL text, one per line, without comments, blank lines or indentation.
+    Expects every line to end a statement with '.', or a term or list with ';' or ','.
+    """
+    statements = []
+    statement = ""
+    for line in text.splitlines():
+        line = line.strip()
+        if (line == "") or line.startswith("#"):
+            continue
+        statement += line
+        if line.endswith("."):
+            statements.append(statement)
+            statement = ""
+    return statements
+
+
+def shared_comment_resources(
+    class_ontology_dict: dict,
+    prop_ontology_dict: dict,
+    min_length: int = SHARED_COMMENT_MIN_LENGTH,
+) -> dict:
+    """Find the comments of at least min_length characters written on more than one class or property,
+        to write once as shared annotation resources. A resource is named by a digest of its comment,
+        so that its name does not change as other comments are added or removed.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        min_length (int, optional): Minimum length of a shared comment. Defaults to SHARED_COMMENT_MIN_LENGTH.
+
+    Returns:
+        dict: Mapping from comment text to the prefixed name of its resource.
+    """
+    counts = {}
+    for rep in list(class_ontology_dict.values()) + list(prop_ontology_dict.values()):
+        for comment in rep.comments:
+            if len(comment) >= min_length:
+                counts[comment] = counts.get(comment, 0) + 1
+    return {
+        text: add_prefix(
+            "comment_"
+            + hashlib.blake2b(text.encode("utf-8"), digest_size=4).hexdigest()
+        )
+        for text, count in counts.items()
+        if count > 1
+    }
 
 
 def create_System(
     class_ontology_dict,
     prop_ontology_dict,
+    array_properties_dict=None,
 ):
     replace_key = "AbstractSystemProperties"
     new_key = "System"
 
-    class_ontology_dict, prop_ontology_dict = replace_class(
-        replace_key, new_key, class_ontology_dict, prop_ontology_dict
+    return replace_class(
+        replace_key,
+        new_key,
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
     )
 
-    return class_ontology_dict, prop_ontology_dict
-
 
 def remove_links_to_grandparents(class_ontology_dict, prop_ontology_dict):
-    for potential_grandparent_key in class_ontology_dict.keys():
-        for class_name, class_rep in class_ontology_dict.items():
-            if potential_grandparent_key in class_rep.superclass_list:
-                for superclass_key in class_rep.superclass_list:
-                    if (superclass_key in class_ontology_dict) and (
-                        potential_grandparent_key
-                        in class_ontology_dict[superclass_key].superclass_list
-                    ):
-                        class_rep.superclass_list.remove(potential_grandparent_key)
-                        continue
+    """Remove direct superclass links that are implied by another superclass of the same class,
+    i.e. compute the transitive reduction of the inheritance graph. Inheritance cycles are reported.
+    """
+    dag = InheritanceDAG(class_ontology_dict, include_subclass_links=False)
+    for cycle in dag.cycles():
+        print("Inheritance cycle between classes:", cycle)
+
+    for class_name, redundant_list in dag.redundant_superclasses().items():
+        superclass_list = class_ontology_dict[class_name].superclass_list
+        class_ontology_dict[class_name].superclass_list = [
+            superclass
+            for superclass in superclass_list
+            if superclass not in redundant_list
+        ]
 
     return class_ontology_dict, prop_ontology_dict
 
@@ -345,41 +1385,35 @@ def remove_links_to_grandparents(class_ontology_dict, prop_ontology_dict):
 def create_ACL(
     class_ontology_dict,
     prop_ontology_dict,
+    array_properties_dict=None,
 ):
     replace_key = "AbstractAccessControlList"
     new_key = "ACL"
 
-    return replace_class(replace_key, new_key, class_ontology_dict, prop_ontology_dict)
-
-
-def replace_class(replace_key, new_key, class_ontology_dict, prop_ontology_dict):
-    # Everywhere the old key is mentioned, rename it to the new key
-    class_ontology_dict[new_key] = class_ontology_dict.pop(replace_key)
-    class_ontology_dict[new_key].name = new_key
-
-    for classname, class_rep in class_ontology_dict.items():
-        if replace_key in class_rep.superclass_list:
-            class_rep.superclass_list.remove(replace_key)
-            class_rep.add_superclass(new_key)
-
-    if ("has" + replace_key) in prop_ontology_dict:
-        prop_ontology_dict["has" + new_key] = prop_ontology_dict.pop(
-            "has" + replace_key
-        )
+    return replace_class(
+        replace_key,
+        new_key,
+        class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
+    )
 
-    for prop_name, prop_rep in prop_ontology_dict.items():
-        if replace_key in prop_rep.domain:
-            prop_rep.domain.append(new_key)
-            prop_rep.domain.remove(replace_key)
-        if replace_key in prop_rep.range:
-            prop_rep.range.append(new_key)
-            prop_rep.range.remove(replace_key)
 
-    # Add old class with sameAs property pointing to new class
-    class_ontology_dict = add_class_from_parameters(
-        replace_key,
-        class_ontology_dict[new_key].superclass_list.copy(),
+def replace_class(
+    replace_key,
+    new_key,
+    class_ontology_dict,
+    prop_ontology_dict,
+    array_properties_dict=None,
+):
+    # Everywhere the old key is mentioned, rename it to the new key,
+    # and add the old class back with the superclasses of the new class.
+    # Use rename_classes directly to apply several renames with one index.
+    rename_classes(
+        {replace_key: new_key},
         class_ontology_dict,
+        prop_ontology_dict,
+        array_properties_dict,
     )
 
     return class_ontology_dict, prop_ontology_dict
@@ -419,43 +1453,127 @@ def create_org_classes(
     return class_ontology_dict, prop_ontology_dict
 
 
-def link_to_open_onts(class_ontology_dict, prop_ontology_dict):
-    open_ont_dict = config_open_onts()
+def index_open_ont_alignments(open_ont_dict: dict) -> (dict, dict, dict):
+    """Invert a dictionary of open ontology alignments into per-target lookups,
+        keeping the order in which the alignments are listed.
 
-    # Go through each ontology key, insert them into the appropriate class or property dictionary
+    Args:
+        open_ont_dict (dict): Dictionary of alignments, keyed by ontology prefix, as returned by config_open_onts.
+
+    Returns:
+        dict: OSDU property name to list of prefixed open ontology range classes.
+        dict: OSDU class name to list of prefixed open ontology superclasses.
+        dict: OSDU class or property name to list of prefixed open ontology identifiers for owl:sameAs.
+    """
+    range_index = {}
+    superclass_index = {}
+    sameas_index = {}
     for ont_key, ont_links_dict in open_ont_dict.items():
-        ranges_dict = ont_links_dict["ranges_dict"]
-        for ont_class_name, prop_list in ranges_dict.items():
-            for prop in prop_list:
-                prop_ontology_dict[prop].change_range(ont_key + ":" + ont_class_name)
-
-        subclass_dict = ont_links_dict["subclass_dict"]
-        for ont_class_name, class_list in subclass_dict.items():
-            for class_name in class_list:
-                class_ontology_dict[class_name].add_superclass(
-                    ont_key + ":" + ont_class_name, process_name_flag=False
-                )
+        for index, links_dict in [
+            (range_index, ont_links_dict["ranges_dict"]),
+            (superclass_index, ont_links_dict["subclass_dict"]),
+            (sameas_index, ont_links_dict["sameas_dict"]),
+        ]:
+            for ont_identifier, target_list in links_dict.items():
+                for target in target_list:
+                    index.setdefault(target, []).append(ont_key + ":" + ont_identifier)
+    return range_index, superclass_index, sameas_index
+
+
+def apply_open_ont_alignments(
+    class_ontology_dict: dict, prop_ontology_dict: dict, open_ont_dict: dict
+) -> list:
+    """Link OSDU classes and properties to open ontologies, in a single pass over the alignment targets.
 
-        sameas_dict = ont_links_dict["sameas_dict"]
-        for ont_identifier, identifier_list in sameas_dict.items():
-            for identifier in identifier_list:
-                if identifier in class_ontology_dict:
-                    class_ontology_dict[identifier].add_sameas_link(
-                        ont_key + ":" + ont_identifier
-                    )
-                if identifier in prop_ontology_dict:
-                    prop_ontology_dict[identifier].add_sameas_link(
-                        ont_key + ":" + ont_identifier
-                    )
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        open_ont_dict (dict): Dictionary of alignments, keyed by ontology prefix, as returned by config_open_onts.
+
+    Returns:
+        list: (kind, prefixed open ontology identifier, OSDU name) for each alignment whose OSDU target was not found.
+    """
+    range_index, superclass_index, sameas_index = index_open_ont_alignments(
+        open_ont_dict
+    )
+    missing = []
+
+    for prop, ont_class_list in range_index.items():
+        if prop not in prop_ontology_dict:
+            missing.extend(("range", ont_class, prop) for ont_class in ont_class_list)
+            continue
+        for ont_class in ont_class_list:
+            prop_ontology_dict[prop].change_range(ont_class)
+
+    for class_name, ont_class_list in superclass_index.items():
+        if class_name not in class_ontology_dict:
+            missing.extend(
+                ("subclass", ont_class, class_name) for ont_class in ont_class_list
+            )
+            continue
+        for ont_class in ont_class_list:
+            class_ontology_dict[class_name].add_superclass(
+                ont_class, process_name_flag=False
+            )
+
+    for identifier, ont_identifier_list in sameas_index.items():
+        if (identifier not in class_ontology_dict) and (
+            identifier not in prop_ontology_dict
+        ):
+            missing.extend(
+                ("sameas", ont_identifier, identifier)
+                for ont_identifier in ont_identifier_list
+            )
+            continue
+        for ont_identifier in ont_identifier_list:
+            if identifier in class_ontology_dict:
+                class_ontology_dict[identifier].add_sameas_link(ont_identifier)
+            if identifier in prop_ontology_dict:
+                prop_ontology_dict[identifier].add_sameas_link(ont_identifier)
+
+    return missing
+
+
+def link_to_open_onts(class_ontology_dict, prop_ontology_dict, open_ont_dict=None):
+    """Link OSDU classes and properties to open ontologies, reporting alignments whose target is missing.
+
+    Args:
+        class_ontology_dict (dict): Dictionary mapping OSDU class names to ClassRep objects.
+        prop_ontology_dict (dict): Dictionary mapping explored OSDU property names to PropertyRep objects.
+        open_ont_dict (dict, optional): Dictionary of alignments. Defaults to None, for the bundled config.
+    """
+    if open_ont_dict is None:
+        open_ont_dict = config_open_onts()
+
+    missing = apply_open_ont_alignments(
+        class_ontology_dict, prop_ontology_dict, open_ont_dict
+    )
+    for kind, ont_identifier, target in missing:
+        print(
+            "Open ontology", kind, "alignment target not found:", ont_identifier, target
+        )
 
     return class_ontology_dict, prop_ontology_dict
 
 
+def generate_open_ont_prefix_lines(open_ont_dict: dict) -> str:
+    """Prefix declarations for open ontologies that are not declared in prefix_lines"""
+    declared_prefixes = set(re.findall(r"@prefix\s*(\w*):", prefix_lines))
+    lines = ""
+    for ont_key, ont_links_dict in open_ont_dict.items():
+        if (ont_key not in declared_prefixes) and (ont_links_dict["namespace"] != ""):
+            lines += "@prefix " + ont_key + ":<" + ont_links_dict["namespace"] + "> .\n"
+    return lines
+
+
 def process_subclasses(class_ontology_dict, prop_ontology_dict):
-    for classname, class_rep in class_ontology_dict.items():
-        if class_rep.subclass_list != []:
-            for subclass_name in class_rep.subclass_list:
-                class_ontology_dict[subclass_name].add_superclass(classname)
+    """Add each class listed in a subclass_list as a superclass link on the listed class"""
+    dag = InheritanceDAG(class_ontology_dict)
+    for class_name, subclass_name in dag.missing_subclasses:
+        print("Missing subclass", subclass_name, "of", class_name)
+
+    for subclass_name, class_name in dag.subclass_links:
+        class_ontology_dict[subclass_name].add_superclass(class_name)
 
     return class_ontology_dict, prop_ontology_dict
 